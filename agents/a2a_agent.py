@@ -1,5 +1,6 @@
 """A2A HTTP agent wrapper using shared Observation/Action types."""
 
+import copy
 import os
 from typing import Dict, Any, Union
 
@@ -49,5 +50,10 @@ class A2AAgent:
     def mark_dead(self) -> None:
         self.alive = False
 
+    def clone(self) -> "A2AAgent":
+        other = copy.copy(self)
+        other.seer_checks = list(self.seer_checks)
+        return other
+
     def update_seer_inspection(self, target: str, role: str) -> None:
         self.seer_checks.append({"target": target, "role": role})
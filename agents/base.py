@@ -5,6 +5,8 @@ from core.types import Action, Observation
 
 
 class AgentBase(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def speak(self, obs: Observation) -> Action:
         raise NotImplementedError
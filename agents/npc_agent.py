@@ -1,110 +1,181 @@
 """Deterministic NPC baseline agent (no LM calls)."""
 
-import random
+import copy
 import re
-from typing import Dict, List, Optional, Set
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
 
 from agents.base import AgentBase
-from core.types import Action, Observation
+from core.rng import RngStreams
+from core.types import Action, Observation, SeatTable
+
+ROLE_CLAIMS = {
+    "seer": ("i am the seer", "i'm the seer"),
+    "doctor": ("i am the doctor", "i'm the doctor"),
+    "villager": ("i am a villager", "just a villager"),
+    "werewolf": ("i am a werewolf", "i'm a werewolf"),
+}
+ACCUSE_KEYWORDS = ["suspect", "wolf", "werewolf", "not on our side", "vote"]
+DEFEND_KEYWORDS = ["trust", "innocent", "good", "not a wolf"]
+
+
+def mentions(target: str, speech_l: str) -> bool:
+    """Whole-word, case-folded match of a player's name in lower-cased speech."""
+    return re.search(rf"\b{re.escape(target.lower())}\b", speech_l) is not None
 
 
 class NpcAgent(AgentBase):
-    """Rule-based NPC agent for reproducible baselines."""
+    """Rule-based NPC agent for reproducible baselines.
+
+    Per-player state is kept in flat arrays indexed by seat number; `seats`
+    maps names to seats and is shared by every agent of a game.
+    """
 
-    def __init__(self, name: str, role: str, seed: int):
+    __slots__ = (
+        "name",
+        "role",
+        "alive",
+        "seed",
+        "rng",
+        "seats",
+        "me",
+        "known_wolf",
+        "known_good",
+        "beliefs",
+        "accused_by",
+        "defended_by",
+        "speech_count",
+        "tracked",
+        "role_claims",
+        "vote_similarity",
+        "last_votes",
+    )
+
+    def __init__(self, name: str, role: str, seed: int, seats: Optional[SeatTable] = None):
         self.name = name
         self.role = role
         self.alive = True
         self.seed = seed
-        self.rng = random.Random(seed + hash(name) % 1000)
+        self.rng = RngStreams(seed).seat(name, "npc")
+        self.seats = seats if seats is not None else SeatTable()
+        self.me = self.seats.seat(name)
         self.known_wolf: Optional[str] = None
         self.known_good: Set[str] = set()
         self._init_beliefs()
 
     def _init_beliefs(self):
-        self.beliefs: Dict[str, float] = {}
-        self.accused_by: Dict[str, int] = {}
-        self.defended_by: Dict[str, int] = {}
-        self.speech_count: Dict[str, int] = {}
-        self.role_claims: Dict[str, List[str]] = {"seer": [], "doctor": [], "villager": [], "werewolf": []}
-        self.vote_similarity: Dict[tuple[str, str], int] = {}
-        self.last_votes: Dict[str, str] = {}
+        n = len(self.seats)
+        self.beliefs = array("d", [0.3]) * n
+        self.accused_by = array("l", [0]) * n
+        self.defended_by = array("l", [0]) * n
+        self.speech_count = array("l", [0]) * n
+        # Seats seen alive (other than our own); only these get speech counted.
+        self.tracked = bytearray(n)
+        # claim -> seats that made it, in order; created on first claim.
+        self.role_claims: Dict[str, List[int]] = {}
+        self.vote_similarity: Optional[Dict[Tuple[int, int], int]] = None
+        self.last_votes: Optional[Dict[int, str]] = None
 
     def mark_dead(self):
         self.alive = False
 
-    def _ensure_beliefs(self, players: List[str]):
-        for p in players:
-            if p == self.name:
-                continue
-            self.beliefs.setdefault(p, 0.3)
-            self.accused_by.setdefault(p, 0)
-            self.defended_by.setdefault(p, 0)
-            self.speech_count.setdefault(p, 0)
+    def clone(self) -> "NpcAgent":
+        """Copy with its own state and RNG position; the seat table stays shared."""
+        other = copy.copy(self)
+        other.rng = copy.copy(self.rng)
+        other.known_good = set(self.known_good)
+        other.beliefs = self.beliefs[:]
+        other.accused_by = self.accused_by[:]
+        other.defended_by = self.defended_by[:]
+        other.speech_count = self.speech_count[:]
+        other.tracked = bytearray(self.tracked)
+        other.role_claims = {claim: list(seats) for claim, seats in self.role_claims.items()}
+        if self.vote_similarity is not None:
+            other.vote_similarity = dict(self.vote_similarity)
+            other.last_votes = dict(self.last_votes)
+        return other
+
+    def _seat(self, name: str) -> int:
+        seat = self.seats.seat(name)
+        grow = len(self.seats) - len(self.beliefs)
+        if grow > 0:
+            self.beliefs.extend([0.3] * grow)
+            self.accused_by.extend([0] * grow)
+            self.defended_by.extend([0] * grow)
+            self.speech_count.extend([0] * grow)
+            self.tracked.extend(bytes(grow))
+        return seat
+
+    def _ensure_beliefs(self, players: List[str]) -> List[int]:
+        seats = [self._seat(p) for p in players]
+        for seat in seats:
+            if seat != self.me:
+                self.tracked[seat] = 1
+        return seats
 
     def _analyze_debate_history(self, debate_history: List[str], alive_players: List[str]):
-        self._ensure_beliefs(alive_players)
+        alive = self._ensure_beliefs(alive_players)
         for line in debate_history[-50:]:
             if ":" not in line:
                 continue
             speaker, speech = line.split(":", 1)
             speaker = speaker.strip()
             speech_l = speech.lower()
-            if speaker and speaker in self.speech_count:
-                self.speech_count[speaker] += 1
+            speaker_seat = self.seats.index.get(speaker)
+            if speaker_seat is not None and self.tracked[speaker_seat]:
+                self.speech_count[speaker_seat] += 1
 
             # Role-claim tracking
             if speaker:
-                if "i am the seer" in speech_l or "i'm the seer" in speech_l:
-                    if speaker not in self.role_claims["seer"]:
-                        self.role_claims["seer"].append(speaker)
-                if "i am the doctor" in speech_l or "i'm the doctor" in speech_l:
-                    if speaker not in self.role_claims["doctor"]:
-                        self.role_claims["doctor"].append(speaker)
-                if "i am a villager" in speech_l or "just a villager" in speech_l:
-                    if speaker not in self.role_claims["villager"]:
-                        self.role_claims["villager"].append(speaker)
-                if "i am a werewolf" in speech_l or "i'm a werewolf" in speech_l:
-                    if speaker not in self.role_claims["werewolf"]:
-                        self.role_claims["werewolf"].append(speaker)
-
-            for target in alive_players:
+                for claim, phrases in ROLE_CLAIMS.items():
+                    if any(p in speech_l for p in phrases):
+                        claimants = self.role_claims.setdefault(claim, [])
+                        seat = self._seat(speaker)
+                        if seat not in claimants:
+                            claimants.append(seat)
+
+            for target, seat in zip(alive_players, alive):
                 if target == speaker:
                     continue
-                target_l = target.lower()
-                if re.search(rf"\\b{re.escape(target_l)}\\b", speech_l):
-                    if any(k in speech_l for k in ["suspect", "wolf", "werewolf", "not on our side", "vote"]):
-                        self.accused_by[target] = self.accused_by.get(target, 0) + 1
-                    if any(k in speech_l for k in ["trust", "innocent", "good", "not a wolf"]):
-                        self.defended_by[target] = self.defended_by.get(target, 0) + 1
-
-        for p in alive_players:
-            if p == self.name:
+                if mentions(target, speech_l):
+                    if any(k in speech_l for k in ACCUSE_KEYWORDS):
+                        self.accused_by[seat] += 1
+                    if any(k in speech_l for k in DEFEND_KEYWORDS):
+                        self.defended_by[seat] += 1
+
+        seer_claims = self.role_claims.get("seer", [])
+        for p, seat in zip(alive_players, alive):
+            if seat == self.me:
                 continue
-            score = self.beliefs.get(p, 0.3)
-            score += 0.08 * self.accused_by.get(p, 0)
-            score -= 0.05 * self.defended_by.get(p, 0)
-            if p in self.role_claims["seer"] and len(self.role_claims["seer"]) > 1:
+            score = self.beliefs[seat]
+            score += 0.08 * self.accused_by[seat]
+            score -= 0.05 * self.defended_by[seat]
+            if seat in seer_claims and len(seer_claims) > 1:
                 score += 0.12
             if p in self.known_good:
                 score = min(score, 0.1)
             if p == self.known_wolf:
                 score = 0.95
-            self.beliefs[p] = max(0.05, min(0.95, score))
+            self.beliefs[seat] = max(0.05, min(0.95, score))
+
+    def _candidates(self, players: List[str]) -> List[Tuple[str, int]]:
+        """(name, seat) for every player other than ourselves."""
+        seats = [self._seat(p) for p in players]
+        return [(p, seat) for p, seat in zip(players, seats) if seat != self.me]
 
     def _most_suspicious(self, alive_players: List[str]) -> Optional[str]:
         self._ensure_beliefs(alive_players)
-        candidates = [p for p in alive_players if p != self.name]
+        candidates = self._candidates(alive_players)
         if not candidates:
             return None
-        return max(candidates, key=lambda p: self.beliefs.get(p, 0.3))
+        return max(candidates, key=lambda c: self.beliefs[c[1]])[0]
 
     def _least_suspicious(self, alive_players: List[str]) -> Optional[str]:
         self._ensure_beliefs(alive_players)
-        candidates = [p for p in alive_players if p != self.name]
+        candidates = self._candidates(alive_players)
         if not candidates:
             return None
-        return min(candidates, key=lambda p: self.beliefs.get(p, 0.3))
+        return min(candidates, key=lambda c: self.beliefs[c[1]])[0]
 
     @staticmethod
     def _extract_utterances(debate_history: List[str]) -> Set[str]:
@@ -196,7 +267,7 @@ class NpcAgent(AgentBase):
         wolves: Optional[List[str]] = None,
         current_votes: Optional[Dict[str, str]] = None,
     ) -> Optional[str]:
-        candidates = [p for p in alive_players if p != self.name]
+        candidates = self._candidates(alive_players)
         if not candidates:
             return None
         if debate_history:
@@ -204,13 +275,14 @@ class NpcAgent(AgentBase):
         if current_votes:
             self._update_vote_similarity(current_votes)
         if self.role == "Werewolf":
-            non_wolves = [p for p in candidates if p != self.known_wolf]
+            non_wolves = [c for c in candidates if c[0] != self.known_wolf]
             pool = non_wolves or candidates
             # Prefer less suspicious targets to avoid coordinated wolf tells
-            return min(pool, key=lambda p: self.beliefs.get(p, 0.3))
+            return min(pool, key=lambda c: self.beliefs[c[1]])[0]
         else:
             target = self._most_suspicious(alive_players)
-            return target if target in candidates else self.rng.choice(candidates)
+            names = [p for p, _ in candidates]
+            return target if target in names else self.rng.choice(names)
 
     def _night_power_impl(
         self,
@@ -221,29 +293,28 @@ class NpcAgent(AgentBase):
     ) -> Optional[str]:
         if not self.alive:
             return None
-        self._ensure_beliefs(alive_players)
+        alive = self._ensure_beliefs(alive_players)
         if self.role == "Werewolf":
-            pool = [p for p in alive_players if p not in wolves]
+            pool = [(p, seat) for p, seat in zip(alive_players, alive) if p not in wolves]
             if not pool:
                 return None
             # Target low-suspicion, high-visibility players
-            return min(pool, key=lambda p: self.beliefs.get(p, 0.3) - 0.02 * self.speech_count.get(p, 0))
+            return min(pool, key=lambda c: self.beliefs[c[1]] - 0.02 * self.speech_count[c[1]])[0]
         if self.role == "Doctor":
             if not alive_players:
                 return None
             # Protect least suspicious, or self if under heat
-            if self.accused_by.get(self.name, 0) >= 2:
+            if self.accused_by[self.me] >= 2:
                 return self.name
             # If a single seer claimant exists, protect them
-            seer_claimants = [p for p in self.role_claims["seer"] if p in alive_players]
+            seer_claimants = [s for s in self.role_claims.get("seer", []) if s in alive]
             if len(seer_claimants) == 1:
-                return seer_claimants[0]
+                return self.seats.names[seer_claimants[0]]
             return self._least_suspicious(alive_players) or self.rng.choice(alive_players)
         if self.role == "Seer":
-            choices = [p for p in alive_players if p != self.name and p not in self.known_good and p != self.known_wolf]
-            if not choices:
-                choices = [p for p in alive_players if p != self.name]
-            return max(choices, key=lambda p: self.beliefs.get(p, 0.3)) if choices else None
+            others = self._candidates(alive_players)
+            choices = [c for c in others if c[0] not in self.known_good and c[0] != self.known_wolf] or others
+            return max(choices, key=lambda c: self.beliefs[c[1]])[0] if choices else None
         return None
 
     def speak(self, obs: Observation) -> Action:
@@ -283,20 +354,21 @@ class NpcAgent(AgentBase):
 
     def _update_vote_similarity(self, current_votes: Dict[str, str]):
         # Track repeat co-voting to flag coordination.
-        for voter, target in current_votes.items():
-            if voter == self.name:
-                continue
-            self.last_votes[voter] = target
+        if self.vote_similarity is None:
+            self.vote_similarity, self.last_votes = {}, {}
         voters = list(current_votes.keys())
+        seats = [self._seat(v) for v in voters]
+        for voter, seat in zip(voters, seats):
+            if seat != self.me:
+                self.last_votes[seat] = current_votes[voter]
         for i in range(len(voters)):
             for j in range(i + 1, len(voters)):
-                v1, v2 = voters[i], voters[j]
-                if current_votes.get(v1) == current_votes.get(v2) and v1 != v2:
-                    key = tuple(sorted((v1, v2)))
+                v1, v2 = seats[i], seats[j]
+                if current_votes.get(voters[i]) == current_votes.get(voters[j]) and v1 != v2:
+                    key = (min(v1, v2), max(v1, v2))
                     self.vote_similarity[key] = self.vote_similarity.get(key, 0) + 1
                     if self.vote_similarity[key] >= 2:
                         # Slightly raise suspicion on both for repeated alignment.
-                        if v1 in self.beliefs:
-                            self.beliefs[v1] = min(0.95, self.beliefs[v1] + 0.05)
-                        if v2 in self.beliefs:
-                            self.beliefs[v2] = min(0.95, self.beliefs[v2] + 0.05)
+                        for seat in (v1, v2):
+                            if self.tracked[seat]:
+                                self.beliefs[seat] = min(0.95, self.beliefs[seat] + 0.05)
@@ -0,0 +1,234 @@
+"""Array-backed NPC beliefs for a whole table (vectorized NpcAgent)."""
+
+import copy
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agents.npc_agent import ACCUSE_KEYWORDS, DEFEND_KEYWORDS, ROLE_CLAIMS, NpcAgent, mentions
+from core.types import Action, Observation, SeatTable
+
+CLAIMS = list(ROLE_CLAIMS)
+SEER_CLAIM = CLAIMS.index("seer")
+
+
+class NpcTable:
+    """Belief state of every NPC seat in seats x seats arrays.
+
+    Row i is what seat i believes about each seat (column). Evidence from a
+    debate is parsed once and added to all listening rows in one update, and
+    votes and night targets for many seats come from one masked argmax. The
+    arithmetic mirrors NpcAgent step for step, so table seats play exactly the
+    games per-agent NPCs play. Diagonal entries are kept but never read, except
+    accusations against oneself (the doctor's self-protect rule).
+    """
+
+    def __init__(self, player_names: Sequence[str]):
+        self.names = list(player_names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.beliefs = np.full((n, n), 0.3)
+        self.accused = np.zeros((n, n), dtype=np.int64)
+        self.defended = np.zeros((n, n), dtype=np.int64)
+        self.speech = np.zeros((n, n), dtype=np.int64)
+        # claims[c, listener, speaker]: listener heard speaker make claim c.
+        self.claims = np.zeros((len(CLAIMS), n, n), dtype=bool)
+        self.known_good = np.zeros((n, n), dtype=bool)
+        self.known_wolf = np.full(n, -1, dtype=np.int64)
+        self.is_wolf = np.zeros(n, dtype=bool)
+        self.seats: Dict[str, "NpcSeat"] = {}
+        self.seating = SeatTable(self.names)
+
+    def clone(self) -> "NpcTable":
+        """Copy of the table and its seats; seat order and roles stay shared."""
+        other = copy.copy(self)
+        for attr in ("beliefs", "accused", "defended", "speech", "claims", "known_good", "known_wolf"):
+            setattr(other, attr, getattr(self, attr).copy())
+        other.seats = {}
+        for name, seat in self.seats.items():
+            twin = seat.clone()
+            twin.table = other
+            other.seats[name] = twin
+        return other
+
+    def add_seat(self, name: str, role: str, seed: int) -> "NpcSeat":
+        seat = NpcSeat(self, name, role, seed)
+        self.seats[name] = seat
+        self.is_wolf[self.index[name]] = role == "Werewolf"
+        return seat
+
+    def _rows(self, names: Sequence[str]) -> np.ndarray:
+        return np.array([self.index[n] for n in names], dtype=np.int64)
+
+    def _mask(self, names: Sequence[str]) -> np.ndarray:
+        mask = np.zeros(len(self.names), dtype=bool)
+        mask[[self.index[n] for n in names if n in self.index]] = True
+        return mask
+
+    def _evidence(self, debate_history: List[str], alive_players: List[str]) -> Tuple[np.ndarray, ...]:
+        n = len(self.names)
+        speech = np.zeros(n, dtype=np.int64)
+        accused = np.zeros(n, dtype=np.int64)
+        defended = np.zeros(n, dtype=np.int64)
+        claims = np.zeros((len(CLAIMS), n), dtype=bool)
+        for line in debate_history[-50:]:
+            if ":" not in line:
+                continue
+            speaker, speech_text = line.split(":", 1)
+            speaker = speaker.strip()
+            speech_l = speech_text.lower()
+            col = self.index.get(speaker)
+            if col is not None:
+                speech[col] += 1
+                for c, claim in enumerate(CLAIMS):
+                    if any(p in speech_l for p in ROLE_CLAIMS[claim]):
+                        claims[c, col] = True
+            accuse = any(k in speech_l for k in ACCUSE_KEYWORDS)
+            defend = any(k in speech_l for k in DEFEND_KEYWORDS)
+            if not (accuse or defend):
+                continue
+            for target in alive_players:
+                if target != speaker and mentions(target, speech_l):
+                    accused[self.index[target]] += accuse
+                    defended[self.index[target]] += defend
+        return speech, accused, defended, claims
+
+    def observe(self, names: Sequence[str], debate_history: List[str], alive_players: List[str]) -> None:
+        """Applies the debate to the beliefs of `names` (NpcAgent._analyze_debate_history)."""
+        rows = self._rows(names)
+        speech, accused, defended, claims = self._evidence(debate_history, alive_players)
+        self.speech[rows] += speech
+        self.accused[rows] += accused
+        self.defended[rows] += defended
+        self.claims[:, rows] |= claims[:, None, :]
+
+        block = np.ix_(rows, np.flatnonzero(self._mask(alive_players)))
+        score = self.beliefs[block] + 0.08 * self.accused[block]
+        score = score - 0.05 * self.defended[block]
+        contested = self.claims[SEER_CLAIM, rows].sum(axis=1) > 1
+        score = np.where(self.claims[SEER_CLAIM][block] & contested[:, None], score + 0.12, score)
+        score = np.where(self.known_good[block], np.minimum(score, 0.1), score)
+        score = np.where(block[1] == self.known_wolf[rows][:, None], 0.95, score)
+        self.beliefs[block] = np.clip(score, 0.05, 0.95)
+
+    def inspect(self, name: str, target: str, role: str) -> None:
+        row, col = self.index[name], self.index[target]
+        if role == "Werewolf":
+            self.known_wolf[row] = col
+        else:
+            self.known_good[row, col] = True
+
+    def _others(self, rows: np.ndarray, alive_players: List[str]) -> np.ndarray:
+        mask = np.tile(self._mask(alive_players), (len(rows), 1))
+        mask[np.arange(len(rows)), rows] = False
+        return mask
+
+    def _argmax(self, scores: np.ndarray, mask: np.ndarray) -> List[Optional[str]]:
+        # argmax returns the first maximum, like max() over players in seat order.
+        picks = np.where(mask, scores, -np.inf).argmax(axis=1)
+        return [self.names[p] if mask[i].any() else None for i, p in enumerate(picks)]
+
+    def most_suspicious(self, name: str, alive_players: List[str]) -> Optional[str]:
+        rows = self._rows([name])
+        return self._argmax(self.beliefs[rows], self._others(rows, alive_players))[0]
+
+    def least_suspicious(self, name: str, alive_players: List[str]) -> Optional[str]:
+        rows = self._rows([name])
+        return self._argmax(-self.beliefs[rows], self._others(rows, alive_players))[0]
+
+    def vote(
+        self, names: Sequence[str], alive_players: List[str], debate_history: Optional[List[str]] = None
+    ) -> Dict[str, Optional[str]]:
+        """Day votes for `names`; wolves pick the least suspicious, others the most."""
+        if not names:
+            return {}
+        if debate_history:
+            self.observe(names, debate_history, alive_players)
+        rows = self._rows(names)
+        mask = self._others(rows, alive_players)
+        wolves = self.is_wolf[rows]
+        pool = mask & (np.arange(len(self.names)) != self.known_wolf[rows][:, None])
+        pool = np.where((wolves & pool.any(axis=1))[:, None], pool, mask)
+        scores = np.where(wolves[:, None], -self.beliefs[rows], self.beliefs[rows])
+        return dict(zip(names, self._argmax(scores, pool)))
+
+    def night_power(
+        self, names: Sequence[str], alive_players: List[str], wolves: List[str]
+    ) -> Dict[str, Optional[str]]:
+        """Night targets for `names` (NpcAgent._night_power_impl)."""
+        if not names:
+            return {}
+        rows = self._rows(names)
+        roles = [self.seats[n].role for n in names]
+        alive = self._mask(alive_players)
+        others = self._others(rows, alive_players)
+        beliefs = self.beliefs[rows]
+        scores = np.empty_like(beliefs)
+        mask = np.zeros_like(others)
+        for i, role in enumerate(roles):
+            if role == "Werewolf":
+                scores[i] = -(beliefs[i] - 0.02 * self.speech[rows[i]])
+                mask[i] = alive & ~self._mask(wolves)
+            elif role == "Doctor":
+                scores[i] = -beliefs[i]
+                mask[i] = others[i]
+            elif role == "Seer":
+                scores[i] = beliefs[i]
+                unknown = others[i] & ~self.known_good[rows[i]]
+                if self.known_wolf[rows[i]] >= 0:
+                    unknown[self.known_wolf[rows[i]]] = False
+                mask[i] = unknown if unknown.any() else others[i]
+        picks = self._argmax(scores, mask)
+
+        targets: Dict[str, Optional[str]] = {}
+        for i, (name, role) in enumerate(zip(names, roles)):
+            row = rows[i]
+            target = picks[i] if role in ("Werewolf", "Doctor", "Seer") else None
+            if not self.seats[name].alive:
+                target = None
+            elif role == "Doctor" and alive_players:
+                seer_claimants = np.flatnonzero(self.claims[SEER_CLAIM, row] & alive)
+                if self.accused[row, row] >= 2:
+                    target = name
+                elif len(seer_claimants) == 1:
+                    target = self.names[seer_claimants[0]]
+                elif target is None:
+                    target = self.seats[name].rng.choice(alive_players)
+            targets[name] = target
+        return targets
+
+
+class NpcSeat(NpcAgent):
+    """NpcAgent whose beliefs are a row of a shared NpcTable.
+
+    Speech lines (and their RNG draws) come from NpcAgent unchanged; belief
+    updates, votes and night targets go through the table.
+    """
+
+    __slots__ = ("table",)
+
+    def __init__(self, table: NpcTable, name: str, role: str, seed: int):
+        super().__init__(name, role, seed, seats=table.seating)
+        self.table = table
+
+    def _analyze_debate_history(self, debate_history: List[str], alive_players: List[str]):
+        self.table.observe([self.name], debate_history, alive_players)
+
+    def _most_suspicious(self, alive_players: List[str]) -> Optional[str]:
+        return self.table.most_suspicious(self.name, alive_players)
+
+    def _least_suspicious(self, alive_players: List[str]) -> Optional[str]:
+        return self.table.least_suspicious(self.name, alive_players)
+
+    def vote(self, obs: Observation) -> Action:
+        target = self.table.vote([self.name], obs.remaining_players, obs.public_debate)[self.name]
+        return Action(type="vote", target=target)
+
+    def night_power(self, obs: Observation) -> Action:
+        wolves = (obs.private or {}).get("wolves") or []
+        target = self.table.night_power([self.name], obs.remaining_players, wolves)[self.name]
+        return Action(type="night_power", target=target)
+
+    def update_seer_inspection(self, target: str, role: str):
+        super().update_seer_inspection(target, role)
+        self.table.inspect(self.name, target, role)
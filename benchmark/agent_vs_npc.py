@@ -6,8 +6,11 @@ import random
 from pathlib import Path
 from typing import List, Dict
 
+from agents.a2a_agent import A2AClient
+from agents.registry import get_agent
 from benchmark import game
 from benchmark import logging as log_utils
+from benchmark.trajectory_cache import DEFAULT_MAX_NODES, TrajectoryCache
 from scorer import score
 
 
@@ -111,10 +114,25 @@ def main():
     parser.add_argument("--output", type=str, default="", help="Optional path to write aggregate JSON")
     parser.add_argument("--log-dir", type=str, default="", help="Optional directory for per-game JSONL logs")
     parser.add_argument("--sanity-check", type=int, default=0, help="Print per-game metrics for first N games")
+    parser.add_argument("--npc-table", action="store_true", help="Run NPC seats through the array-backed NpcTable")
+    parser.add_argument(
+        "--trajectory-cache",
+        type=str,
+        default="",
+        help="Pickle file of cached NPC play per seed/seat/purple actions; reused and updated across runs (a2a only)",
+    )
+    parser.add_argument(
+        "--trajectory-cache-max-nodes",
+        type=int,
+        default=DEFAULT_MAX_NODES,
+        help="Max cached phases kept; least recently used leaves are dropped past this",
+    )
     args = parser.parse_args()
 
     if args.preset:
         args.num_games = args.preset
+    if args.trajectory_cache and args.agent_kind != "a2a":
+        raise SystemExit("--trajectory-cache only applies to --agent-kind a2a")
 
     seeds = _load_seeds(args.seeds_file, args.num_games, args.seed_start)
     if len(seeds) < args.num_games:
@@ -128,6 +146,11 @@ def main():
     games_survived = 0
     manifest = []
 
+    cache = None
+    if args.trajectory_cache:
+        cache = TrajectoryCache.load(args.trajectory_cache, max_nodes=args.trajectory_cache_max_nodes)
+        client = A2AClient(args.a2a_endpoint)
+
     log_dir = Path(args.log_dir) if args.log_dir else None
     if log_dir:
         log_dir.mkdir(parents=True, exist_ok=True)
@@ -136,16 +159,20 @@ def main():
         seed = seeds[idx]
         roles_map = game.assign_roles(DEFAULT_PLAYERS, seed)
         seat = _pick_seat_for_role(roles_map, role, _rng_for_game(args.shuffle_seed, seed))
-        result = game.run_game(
-            {
-                "seed": seed,
-                "max_debate_turns": args.max_turns,
-                "max_rounds": args.max_rounds,
-                "a2a_endpoint": args.a2a_endpoint if args.agent_kind == "a2a" else "",
-                "a2a_seats": [seat] if args.agent_kind == "a2a" else [],
-                "player_names": DEFAULT_PLAYERS,
-            }
-        )
+        config = {
+            "seed": seed,
+            "max_debate_turns": args.max_turns,
+            "max_rounds": args.max_rounds,
+            "a2a_endpoint": args.a2a_endpoint if args.agent_kind == "a2a" else "",
+            "a2a_seats": [seat] if args.agent_kind == "a2a" else [],
+            "player_names": DEFAULT_PLAYERS,
+            "npc_table": args.npc_table,
+        }
+        if cache is not None:
+            agent = get_agent("a2a", name=seat, role=roles_map[seat], seed=seed, client=client)
+            result = cache.run(config, seat, agent)
+        else:
+            result = game.run_game(config)
         agent_role = roles_map[seat]
         roles_played[agent_role.lower()] = roles_played.get(agent_role.lower(), 0) + 1
         if seat in result.get("survivors", []):
@@ -171,7 +198,13 @@ def main():
             )
 
         if log_dir:
-            meta = {"agent_seat": seat, "agent_role": agent_role, "game_index": idx, "seed": seed}
+            meta = {
+                "agent_seat": seat,
+                "agent_role": agent_role,
+                "game_index": idx,
+                "seed": seed,
+                "max_rounds": args.max_rounds,
+            }
             records = log_utils.game_log_to_records(result, meta=meta, metrics=scorecard.get("metrics"))
             log_utils.write_jsonl(str(log_dir / f"game_{idx:03d}.jsonl"), records)
             manifest.append(
@@ -219,6 +252,9 @@ def main():
             "safety_counts": aggregate.get("safety_counts"),
         },
     }
+    if cache is not None:
+        cache.save(args.trajectory_cache)
+        report["trajectory_cache"] = dict(cache.stats)
     if log_dir:
         Path(log_dir / "manifest.json").write_text(
             json.dumps(manifest, indent=2), encoding="utf-8"
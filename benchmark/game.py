@@ -1,12 +1,16 @@
 """Deterministic Werewolf game engine."""
 
+import copy
 import random
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
 from agents.base import AgentBase
 from agents.a2a_agent import A2AClient
 from agents.registry import get_agent
 from core.schema import build_observation
+from core.rng import RngStreams
+from core.types import Action, Event, Phase, SeatTable
 
 
 Role = str
@@ -40,8 +44,26 @@ def majority_vote(votes: Dict[str, Optional[str]], rng: random.Random) -> Option
     return rng.choice(top) if top else None
 
 
+@dataclass(frozen=True)
+class GameSnapshot:
+    """A game paused at a phase boundary; fork() it to play continuations."""
+
+    round: int
+    phase: Phase
+    events: int
+    game: "Game"
+
+    def fork(self) -> "Game":
+        return self.game.fork()
+
+
 class Game:
-    """Single deterministic Werewolf game."""
+    """Single deterministic Werewolf game.
+
+    The game advances one phase per step() (night, day, day_vote) and records
+    every state transition in `events`. fork() and snapshot() branch it at any
+    phase boundary without replaying the prefix.
+    """
 
     def __init__(
         self,
@@ -52,15 +74,30 @@ class Game:
         a2a_endpoint: str = "",
         a2a_seats: Optional[List[str]] = None,
         a2a_roles: Optional[List[str]] = None,
+        npc_table: bool = False,
+        roles: Optional[Dict[str, Role]] = None,
     ) -> None:
         self.seed = seed
-        self.rng = random.Random(seed)
+        # Independent counter-based streams, so e.g. a fallback draw never shifts speaker order.
+        self.rngs = RngStreams(seed)
+        self.speaker_rng = self.rngs.stream("game", "speaker_order")
+        self.vote_rng = self.rngs.stream("game", "vote_tiebreak")
+        self.night_rng = self.rngs.stream("game", "night_fallback")
         self.max_debate_turns = max_debate_turns
         self.max_rounds = max_rounds
-        self.roles = assign_roles(player_names, seed)
+        # Explicit roles (e.g. from a recorded log) also fix the seat order.
+        self.roles = dict(roles) if roles else assign_roles(player_names, seed)
         self.current_round_num = 0
         self.a2a_endpoint = a2a_endpoint
         self.agents: Dict[str, AgentBase] = {}
+        # One name table for the game; NPC agents index their state by seat.
+        self.seats = SeatTable(self.roles)
+        # Table mode keeps all NPC beliefs in one array-backed NpcTable.
+        self.npc_table = None
+        if npc_table:
+            from agents.npc_table import NpcTable
+
+            self.npc_table = NpcTable(list(self.roles))
         client = A2AClient(a2a_endpoint) if a2a_endpoint else None
         seat_filter = set(a2a_seats or [])
         role_filter = set(r.lower() for r in (a2a_roles or []))
@@ -80,14 +117,104 @@ class Game:
                     client=client,
                     url=a2a_endpoint,
                 )
+            elif self.npc_table is not None:
+                self.agents[name] = self.npc_table.add_seat(name, role, seed)
             else:
-                self.agents[name] = get_agent("npc", name=name, role=role, seed=seed)
+                self.agents[name] = get_agent("npc", name=name, role=role, seed=seed, seats=self.seats)
         self.log = {
             "seed": seed,
             "roles": self.roles,
             "rounds": [],
             "winner": None,
         }
+        self.phase: Phase = "night"
+        self.events: List[Event] = []
+        # Forced actions for a seat's next turn (see override()).
+        self.overrides: Dict[str, Action] = {}
+        # Forced speaker order / elimination for the next day or vote (see override_phase()).
+        self.phase_overrides: Dict[str, object] = {}
+        self._round_log: Optional[Dict] = None
+
+    def fork(self) -> "Game":
+        """Independent copy that continues from the current phase.
+
+        Completed rounds and events are never mutated, so the fork shares them
+        with this game; agents and RNG streams are copied (flat array and
+        counter copies), so either game can be advanced or overridden alone.
+        """
+        other = copy.copy(self)
+        other.speaker_rng = copy.copy(self.speaker_rng)
+        other.vote_rng = copy.copy(self.vote_rng)
+        other.night_rng = copy.copy(self.night_rng)
+        if self.npc_table is not None:
+            other.npc_table = self.npc_table.clone()
+        other.agents = {
+            name: other.npc_table.seats[name] if name in other._table_seats([name]) else agent.clone()
+            for name, agent in self.agents.items()
+        }
+        other.log = dict(self.log, rounds=list(self.log["rounds"]))
+        other.events = list(self.events)
+        other.overrides = dict(self.overrides)
+        other.phase_overrides = dict(self.phase_overrides)
+        other._round_log = dict(self._round_log) if self._round_log is not None else None
+        return other
+
+    def snapshot(self) -> GameSnapshot:
+        return GameSnapshot(round=self.current_round_num, phase=self.phase, events=len(self.events), game=self.fork())
+
+    def override(self, name: str, target: Optional[str] = None, content: Optional[str] = None) -> None:
+        """Forces the target (night/vote) or utterance (day) of `name`'s next action.
+
+        The agent is still asked to act, so its own state advances as usual;
+        only the action the engine applies is replaced.
+        """
+        self.overrides[name] = Action(type="noop", content=content, target=target)
+
+    def override_phase(self, speakers: Optional[List[str]] = None, eliminated: Optional[str] = None) -> None:
+        """Forces the speaker order of the next debate and/or who the next vote eliminates.
+
+        The speaker order and tie-break are still drawn, so the RNG streams
+        advance exactly as in an unforced game.
+        """
+        if speakers is not None:
+            self.phase_overrides["speakers"] = list(speakers)
+        if eliminated is not None:
+            self.phase_overrides["eliminated"] = eliminated
+
+    def seat_agent(self, name: str, agent) -> None:
+        """Hands seat `name` to `agent` (e.g. a purple agent), replacing its NPC.
+
+        The new agent takes over the seat as it stands: dead if the seat is
+        dead, and with the seer results the seat has received so far.
+        """
+        if self.npc_table is not None:
+            self.npc_table.seats.pop(name, None)
+        previous = self.agents.get(name)
+        if previous is not None and not previous.alive:
+            agent.mark_dead()
+        for event in self.events:
+            if event.kind == "reveal" and event.actor == name:
+                agent.update_seer_inspection(event.target, event.content)
+        self.agents[name] = agent
+
+    def night_actors(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Seats that act tonight: (wolf controller, doctor, seer); None where there is none."""
+        alive = self.alive_players()
+        wolves = self.living_wolves()
+        doctors = [p for p in alive if self.agents[p].role == "Doctor"]
+        seers = [p for p in alive if self.agents[p].role == "Seer"]
+        return (
+            sorted(wolves)[0] if wolves else None,
+            doctors[0] if doctors else None,
+            seers[0] if seers else None,
+        )
+
+    def _forced_target(self, name: str, target: Optional[str]) -> Optional[str]:
+        forced = self.overrides.pop(name, None)
+        return forced.target if forced is not None else target
+
+    def _record(self, kind: str, actor: Optional[str] = None, target: Optional[str] = None, content: Optional[str] = None):
+        self.events.append(Event(self.current_round_num, self.phase, kind, actor, target, content))
 
     def _private_obs(self, name: str, wolves: List[str]) -> Dict:
         role = self.roles.get(name)
@@ -105,6 +232,29 @@ class Game:
     def living_wolves(self) -> List[str]:
         return [name for name, agent in self.agents.items() if agent.alive and agent.role == "Werewolf"]
 
+    def _table_seats(self, names: List[Optional[str]]) -> List[str]:
+        if self.npc_table is None:
+            return []
+        return [n for n in names if n in self.npc_table.seats]
+
+    def _night_target(
+        self, name: str, alive: List[str], wolves: List[str], graveyard: List[str], batched: Dict[str, Optional[str]]
+    ) -> Optional[str]:
+        if name in batched:
+            return self._forced_target(name, batched[name])
+        obs = build_observation(
+            round_num=self.current_round_num,
+            phase="night",
+            role=self.roles[name],
+            name=name,
+            seed=self.seed,
+            remaining_players=alive,
+            graveyard=graveyard,
+            public_debate=[],
+            private=self._private_obs(name, wolves),
+        )
+        return self._forced_target(name, self.agents[name].night_power(obs).target)
+
     def night_phase(self) -> Dict:
         alive = self.alive_players()
         wolves = self.living_wolves()
@@ -114,61 +264,34 @@ class Game:
         seer_reveal = None
         graveyard = [p for p in self.roles if p not in alive]
 
-        if wolves:
-            wolf_controller = sorted(wolves)[0]
-            obs = build_observation(
-                round_num=self.current_round_num,
-                phase="night",
-                role=self.roles[wolf_controller],
-                name=wolf_controller,
-                seed=self.seed,
-                remaining_players=alive,
-                graveyard=graveyard,
-                public_debate=[],
-                private=self._private_obs(wolf_controller, wolves),
-            )
-            wolf_target = self.agents[wolf_controller].night_power(obs).target
+        wolf_controller, doctor, seer = actors = self.night_actors()
+        batched: Dict[str, Optional[str]] = {}
+        table_actors = self._table_seats(list(actors))
+        if table_actors:
+            batched = self.npc_table.night_power(table_actors, alive, wolves)
+
+        if wolf_controller:
+            wolf_target = self._night_target(wolf_controller, alive, wolves, graveyard, batched)
             if wolf_target not in alive or wolf_target in wolves:
                 choices = [p for p in alive if p not in wolves]
-                wolf_target = self.rng.choice(choices) if choices else None
+                wolf_target = self.night_rng.choice(choices) if choices else None
+            if wolf_target:
+                self._record("attack", wolf_controller, wolf_target)
 
-        doctors = [p for p in alive if self.agents[p].role == "Doctor"]
-        if doctors:
-            doc = doctors[0]
-            obs = build_observation(
-                round_num=self.current_round_num,
-                phase="night",
-                role=self.roles[doc],
-                name=doc,
-                seed=self.seed,
-                remaining_players=alive,
-                graveyard=graveyard,
-                public_debate=[],
-                private=self._private_obs(doc, wolves),
-            )
-            doctor_target = self.agents[doc].night_power(obs).target
+        if doctor:
+            doctor_target = self._night_target(doctor, alive, wolves, graveyard, batched)
+            self._record("protect", doctor, doctor_target)
 
-        seers = [p for p in alive if self.agents[p].role == "Seer"]
-        if seers:
-            seer = seers[0]
-            obs = build_observation(
-                round_num=self.current_round_num,
-                phase="night",
-                role=self.roles[seer],
-                name=seer,
-                seed=self.seed,
-                remaining_players=alive,
-                graveyard=graveyard,
-                public_debate=[],
-                private=self._private_obs(seer, wolves),
-            )
-            seer_target = self.agents[seer].night_power(obs).target
+        if seer:
+            seer_target = self._night_target(seer, alive, wolves, graveyard, batched)
             if seer_target:
                 seer_reveal = self.roles[seer_target]
                 self.agents[seer].update_seer_inspection(seer_target, seer_reveal)
+                self._record("reveal", seer, seer_target, seer_reveal)
 
         if wolf_target and wolf_target != doctor_target:
             self.agents[wolf_target].mark_dead()
+            self._record("kill", target=wolf_target)
 
         return {
             "wolves": wolf_target,
@@ -183,7 +306,12 @@ class Game:
         if not alive:
             return debate
         # Avoid duplicate speakers within the same round to reduce repeated outputs.
-        speaker_order = self.rng.sample(alive, k=min(self.max_debate_turns, len(alive)))
+        speaker_order = self.speaker_rng.sample(alive, k=min(self.max_debate_turns, len(alive)))
+        speaker_order = self.phase_overrides.pop("speakers", speaker_order)
+        # Shared per phase by every observation; lines are formatted once.
+        graveyard = [p for p in self.roles if p not in alive]
+        wolves = self.living_wolves()
+        history: List[str] = []
         for speaker in speaker_order:
             obs = build_observation(
                 round_num=round_num,
@@ -192,19 +320,32 @@ class Game:
                 name=speaker,
                 seed=self.seed,
                 remaining_players=alive,
-                graveyard=[p for p in self.roles if p not in alive],
-                public_debate=[f"{a}:{t}" for a, t in debate],
-                private=self._private_obs(speaker, self.living_wolves()),
+                graveyard=graveyard,
+                public_debate=history[:],
+                private=self._private_obs(speaker, wolves),
             )
             utterance = self.agents[speaker].speak(obs).content or ""
+            forced = self.overrides.pop(speaker, None)
+            if forced is not None:
+                utterance = forced.content or ""
             debate.append((speaker, utterance))
+            self._record("utterance", speaker, content=utterance)
+            history.append(f"{speaker}:{utterance}")
         return debate
 
     def vote_phase(self, debate: List[Tuple[str, str]]) -> Dict[str, Optional[str]]:
         alive = self.alive_players()
         debate_history = [f"{a}:{t}" for a, t in debate]
+        graveyard = [p for p in self.roles if p not in alive]
+        wolves = self.living_wolves()
         votes: Dict[str, Optional[str]] = {}
+        table_voters = self._table_seats(alive)
+        batched = self.npc_table.vote(table_voters, alive, debate_history) if table_voters else {}
         for name in alive:
+            if name in batched:
+                votes[name] = self._forced_target(name, batched[name])
+                self._record("vote", name, votes[name])
+                continue
             obs = build_observation(
                 round_num=self.current_round_num,
                 phase="day_vote",
@@ -212,14 +353,17 @@ class Game:
                 name=name,
                 seed=self.seed,
                 remaining_players=alive,
-                graveyard=[p for p in self.roles if p not in alive],
+                graveyard=graveyard,
                 public_debate=debate_history,
-                private=self._private_obs(name, self.living_wolves()),
+                private=self._private_obs(name, wolves),
             )
-            votes[name] = self.agents[name].vote(obs).target
-        choice = majority_vote(votes, self.rng)
+            votes[name] = self._forced_target(name, self.agents[name].vote(obs).target)
+            self._record("vote", name, votes[name])
+        choice = majority_vote(votes, self.vote_rng)
+        choice = self.phase_overrides.pop("eliminated", choice)
         if choice:
             self.agents[choice].mark_dead()
+            self._record("eliminate", target=choice)
         return votes
 
     def check_winner(self) -> Optional[str]:
@@ -231,40 +375,67 @@ class Game:
             return "Werewolves"
         return None
 
-    def run(self) -> Dict:
-        for round_idx in range(self.max_rounds):
-            round_log = {"round": round_idx, "players": list(self.alive_players()), "night": None, "debate": [], "votes": {}}
-            night = self.night_phase()
-            round_log["night"] = night
+    def _finish(self, winner: str) -> str:
+        self.log["winner"] = winner
+        self.log["survivors"] = self.alive_players()
+        return winner
+
+    def step(self) -> Optional[str]:
+        """Plays the next phase; returns the winner once the game is over."""
+        if self.log["winner"] is not None:
+            return self.log["winner"]
+        if self.phase == "night":
+            if self.current_round_num >= self.max_rounds:
+                return self._finish(self.check_winner() or "Timeout")
+            self._round_log = {
+                "round": self.current_round_num,
+                "players": list(self.alive_players()),
+                "night": None,
+                "debate": [],
+                "votes": {},
+            }
+            self._round_log["night"] = self.night_phase()
             winner = self.check_winner()
             if winner:
-                self.log["rounds"].append(round_log)
-                self.log["winner"] = winner
-                self.log["survivors"] = self.alive_players()
-                return self.log
-            debate = self.debate_phase(round_idx)
-            round_log["debate"] = debate
-            votes = self.vote_phase(debate)
-            round_log["votes"] = votes
+                self.log["rounds"].append(self._round_log)
+                return self._finish(winner)
+            self.phase = "day"
+        elif self.phase == "day":
+            self._round_log["debate"] = self.debate_phase(self.current_round_num)
+            self.phase = "day_vote"
+        else:
+            self._round_log["votes"] = self.vote_phase(self._round_log["debate"])
+            self.log["rounds"].append(self._round_log)
+            self._round_log = None
             winner = self.check_winner()
-            self.log["rounds"].append(round_log)
             if winner:
-                self.log["winner"] = winner
-                self.log["survivors"] = self.alive_players()
-                return self.log
+                return self._finish(winner)
             self.current_round_num += 1
-        self.log["winner"] = self.check_winner() or "Timeout"
-        self.log["survivors"] = self.alive_players()
+            self.phase = "night"
+        return None
+
+    def play_until(self, round_num: int, phase: Phase = "night") -> bool:
+        """Steps until the next phase to play is (round_num, phase); False if the game ended first."""
+        order = ("night", "day", "day_vote")
+        goal = (round_num, order.index(phase))
+        while self.log["winner"] is None and (self.current_round_num, order.index(self.phase)) < goal:
+            self.step()
+        return self.log["winner"] is None and (self.current_round_num, self.phase) == (round_num, phase)
+
+    def run(self) -> Dict:
+        while self.step() is None:
+            pass
         return self.log
 
 
-def run_game(config: Dict) -> Dict:
+def new_game(config: Dict) -> Game:
     seed = config.get("seed", 123)
     max_turns = config.get("max_debate_turns", 8)
     max_rounds = config.get("max_rounds", 10)
     a2a_endpoint = config.get("a2a_endpoint", "")
     a2a_seats = config.get("a2a_seats", [])
     a2a_roles = config.get("a2a_roles", [])
+    npc_table = config.get("npc_table", False)
     player_names = config.get(
         "player_names",
         [
@@ -278,7 +449,7 @@ def run_game(config: Dict) -> Dict:
             "Ginger",
         ],
     )
-    game = Game(
+    return Game(
         seed=seed,
         player_names=player_names,
         max_debate_turns=max_turns,
@@ -286,5 +457,9 @@ def run_game(config: Dict) -> Dict:
         a2a_endpoint=a2a_endpoint,
         a2a_seats=a2a_seats,
         a2a_roles=a2a_roles,
+        npc_table=npc_table,
     )
-    return game.run()
+
+
+def run_game(config: Dict) -> Dict:
+    return new_game(config).run()
@@ -2,8 +2,9 @@
 
 import argparse
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from benchmark import game
 from scorer import score
@@ -23,6 +24,14 @@ def load_seeds(path: str) -> List[int]:
     return seeds
 
 
+def run_games(configs: List[Dict], workers: int = 1) -> List[Dict]:
+    """Runs games in order, or across a process pool; results are identical either way."""
+    if workers <= 1:
+        return [game.run_game(c) for c in configs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(game.run_game, configs))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run multiple seeds and aggregate scores.")
     parser.add_argument("--seeds-file", type=str, default="configs/seeds.txt", help="Path to seeds list.")
@@ -30,20 +39,20 @@ def main():
     parser.add_argument("--max-rounds", type=int, default=10, help="Max rounds before timeout.")
     parser.add_argument("--output", type=str, default="", help="Optional path to write aggregate JSON.")
     parser.add_argument("--a2a-endpoint", type=str, default="", help="Optional A2A endpoint (delegate actions).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; results do not depend on it.")
     args = parser.parse_args()
 
     seeds = load_seeds(args.seeds_file)
-    scores = []
-    for s in seeds:
-        log = game.run_game(
-            {
-                "seed": s,
-                "max_debate_turns": args.max_turns,
-                "max_rounds": args.max_rounds,
-                "a2a_endpoint": args.a2a_endpoint,
-            }
-        )
-        scores.append(score.score_game(log))
+    configs = [
+        {
+            "seed": s,
+            "max_debate_turns": args.max_turns,
+            "max_rounds": args.max_rounds,
+            "a2a_endpoint": args.a2a_endpoint,
+        }
+        for s in seeds
+    ]
+    scores = [score.score_game(log) for log in run_games(configs, args.workers)]
     agg = score.aggregate(scores)
 
     if args.output:
@@ -0,0 +1,303 @@
+"""Rebuild games from recorded per-game JSONL logs and replay counterfactuals.
+
+`load_log()` reads a log written by `benchmark.logging` (agent_vs_npc
+`--log-dir`, AgentBeats runs). `Replay` plays the recording through the
+engine with every recorded action forced, so the engine state at any (round,
+phase) of the log is available as a paused `Game` without asking the original
+agents anything. `counterfactual()` hands the purple seat to another agent from
+that point on and plays the game out.
+
+Usage:
+  python -m benchmark.replay fixtures/agent_vs_npc_logs --round 1 --phase day
+  python -m benchmark.replay results/agentbeats_logs/game_003.jsonl --round 0 --a2a-endpoint http://localhost:8000
+"""
+
+import argparse
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.registry import get_agent
+from benchmark import game
+from benchmark import logging as log_utils
+from core.types import Phase
+from scorer import score
+
+NIGHT_KEYS = ("wolves", "doctor", "seer_target", "seer_reveal")
+PHASES: Tuple[Phase, ...] = ("night", "day", "day_vote")
+
+
+@dataclass
+class RecordedGame:
+    """A game as stored in a JSONL log: rounds in `Game.log` form plus the run metadata."""
+
+    seed: int
+    roles: Dict[str, str]
+    rounds: List[Dict[str, Any]]
+    winner: Optional[str]
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def agent_seat(self) -> Optional[str]:
+        return self.meta.get("agent_seat")
+
+
+def records_to_game(records: List[Dict[str, Any]]) -> RecordedGame:
+    """Inverse of logging.game_log_to_records()."""
+    summary = next((r for r in records if r.get("type") == "summary"), None)
+    if summary is None:
+        raise ValueError("log has no summary record")
+    meta = {k: v for k, v in summary.items() if k not in ("type", "winner", "roles", "metrics")}
+    rounds: List[Dict[str, Any]] = []
+    for record in records:
+        kind = record.get("type")
+        if kind == "night":
+            night = {key: record.get(key) for key in NIGHT_KEYS}
+            rounds.append({"round": record["round"], "night": night, "debate": [], "votes": {}})
+        elif kind == "debate":
+            rounds[-1]["debate"].append((record["speaker"], record["utterance"]))
+        elif kind == "votes":
+            rounds[-1]["votes"] = record.get("votes") or {}
+    return RecordedGame(
+        seed=summary["seed"], roles=summary["roles"], rounds=rounds, winner=summary.get("winner"), meta=meta
+    )
+
+
+def load_log(path: str) -> RecordedGame:
+    with open(path, "r", encoding="utf-8") as f:
+        return records_to_game([json.loads(line) for line in f if line.strip()])
+
+
+def _played_round(g: game.Game) -> Dict[str, Any]:
+    played = g.log["rounds"][-1]
+    return {
+        "round": played["round"],
+        "night": {key: played["night"].get(key) for key in NIGHT_KEYS},
+        "debate": [tuple(turn) for turn in played["debate"]],
+        "votes": played["votes"],
+    }
+
+
+def _tied(votes: Dict[str, Optional[str]]) -> List[str]:
+    tally: Dict[str, int] = {}
+    for target in votes.values():
+        if target is not None:
+            tally[target] = tally.get(target, 0) + 1
+    top = max(tally.values(), default=0)
+    return [t for t, c in tally.items() if c == top] if top else []
+
+
+class Replay:
+    """Engine states along a recorded game, built once by forcing the recorded actions.
+
+    NPC seats are re-run on the recorded history (they are cheap), so their
+    beliefs at each phase are those they would have had; the purple seat is
+    played by a stand-in NPC whose actions are replaced by the recorded ones.
+    Vote ties are not in the log, so a tied elimination is whichever choice
+    makes the rest of the recording replay; the engine's own tie-break is
+    tried first. A log the engine cannot reproduce raises ValueError.
+
+    `max_rounds` must be the round limit the game was recorded under, since a
+    "Timeout" winner depends on it. By default it is read from the log (its
+    max_rounds, or the rounds a Timeout game ran), else 10.
+    """
+
+    def __init__(
+        self,
+        recorded: RecordedGame,
+        max_debate_turns: int = 8,
+        max_rounds: Optional[int] = None,
+        npc_table: bool = False,
+    ):
+        self.recorded = recorded
+        max_rounds = self._round_limit(recorded, max_rounds)
+        self.max_rounds = max_rounds
+        start = game.Game(
+            seed=recorded.seed,
+            player_names=list(recorded.roles),
+            max_debate_turns=max_debate_turns,
+            max_rounds=max_rounds,
+            npc_table=npc_table,
+            roles=recorded.roles,
+        )
+        paused = self._follow(start, 0)
+        if paused is None:
+            raise ValueError(f"engine cannot reproduce the recorded game (seed {recorded.seed})")
+        self.paused: Dict[Tuple[int, Phase], game.Game] = paused
+
+    @classmethod
+    def from_log(cls, path: str, **kwargs: Any) -> "Replay":
+        return cls(load_log(path), **kwargs)
+
+    @staticmethod
+    def _round_limit(recorded: RecordedGame, max_rounds: Optional[int]) -> int:
+        played = recorded.rounds[-1]["round"] + 1 if recorded.rounds else 0
+        if max_rounds is None:
+            max_rounds = recorded.meta.get("max_rounds")
+        if max_rounds is None:
+            max_rounds = played if recorded.winner == "Timeout" else 10
+        if recorded.winner == "Timeout" and played != max_rounds:
+            raise ValueError(
+                f"recorded game timed out after {played} rounds but max_rounds is {max_rounds} (seed {recorded.seed})"
+            )
+        if played > max_rounds:
+            raise ValueError(
+                f"recorded game played {played} rounds, past max_rounds {max_rounds} (seed {recorded.seed})"
+            )
+        return max_rounds
+
+    def _force(self, g: game.Game, recorded: Dict[str, Any]) -> None:
+        if g.phase == "night":
+            wolf, doctor, seer = g.night_actors()
+            night = recorded["night"]
+            for name, key in ((wolf, "wolves"), (doctor, "doctor"), (seer, "seer_target")):
+                if name:
+                    g.override(name, target=night[key])
+        elif g.phase == "day":
+            g.override_phase(speakers=[speaker for speaker, _ in recorded["debate"]])
+            for speaker, utterance in recorded["debate"]:
+                g.override(speaker, content=utterance)
+        else:
+            for voter, target in recorded["votes"].items():
+                g.override(voter, target=target)
+
+    def _follow(self, g: game.Game, index: int) -> Optional[Dict[Tuple[int, Phase], game.Game]]:
+        """Plays recorded rounds index.. on `g`; the paused game before each phase, or None on divergence."""
+        rounds = self.recorded.rounds
+        paused: Dict[Tuple[int, Phase], game.Game] = {}
+        while index < len(rounds):
+            recorded = rounds[index]
+            if g.current_round_num != recorded["round"]:
+                return None
+            for phase in PHASES:
+                paused[(g.current_round_num, phase)] = g.fork()
+                if phase == "day_vote" and len(_tied(recorded["votes"])) > 1:
+                    return self._break_tie(g, index, paused)
+                self._force(g, recorded)
+                g.step()
+                if g.log["winner"] is not None:
+                    break
+            if _played_round(g) != recorded:
+                return None
+            if g.log["winner"] is not None:
+                ended = index == len(rounds) - 1 and g.log["winner"] == self.recorded.winner
+                return paused if ended else None
+            index += 1
+        # Recorded games end on a win or on the round limit at the next night.
+        paused[(g.current_round_num, "night")] = g.fork()
+        g.step()
+        return paused if g.log["winner"] == self.recorded.winner else None
+
+    def _break_tie(
+        self, g: game.Game, index: int, paused: Dict[Tuple[int, Phase], game.Game]
+    ) -> Optional[Dict[Tuple[int, Phase], game.Game]]:
+        recorded = self.recorded.rounds[index]
+        for eliminated in [None] + _tied(recorded["votes"]):
+            trial = g.fork()
+            self._force(trial, recorded)
+            trial.override_phase(eliminated=eliminated)
+            trial.step()
+            if _played_round(trial) != recorded:
+                continue
+            if trial.log["winner"] is not None:
+                if index == len(self.recorded.rounds) - 1 and trial.log["winner"] == self.recorded.winner:
+                    return paused
+                continue
+            rest = self._follow(trial, index + 1)
+            if rest is not None:
+                paused.update(rest)
+                return paused
+        return None
+
+    def game_at(self, round_num: int, phase: Phase = "night") -> game.Game:
+        """The recorded game paused before (round_num, phase); each call returns a fresh fork."""
+        paused = self.paused.get((round_num, phase))
+        if paused is None:
+            raise ValueError(f"recorded game never reaches round {round_num} {phase}")
+        return paused.fork()
+
+    def counterfactual(
+        self, agent: Any, round_num: int, phase: Phase = "night", seat: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Replays the recording up to (round_num, phase), then plays `seat` with `agent`; returns the game log."""
+        g = self.game_at(round_num, phase)
+        g.seat_agent(seat or self.recorded.agent_seat, agent)
+        return g.run()
+
+
+def log_paths(path: str) -> List[Path]:
+    target = Path(path)
+    return sorted(target.glob("game_*.jsonl")) if target.is_dir() else [target]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded games and hand the purple seat to a new agent")
+    parser.add_argument("logs", type=str, help="A per-game JSONL log or a directory of game_*.jsonl logs")
+    parser.add_argument("--round", type=int, default=0, help="Round to hand the seat over at")
+    parser.add_argument("--phase", type=str, choices=PHASES, default="night", help="Phase to hand the seat over at")
+    parser.add_argument("--a2a-endpoint", type=str, default="", help="A2A endpoint of the new agent (default: NPC)")
+    parser.add_argument("--max-turns", type=int, default=8, help="Max debate turns per round after the hand-over")
+    parser.add_argument(
+        "--max-rounds",
+        type=int,
+        default=None,
+        help="Round limit the games were recorded under; default: from each log (else 10)",
+    )
+    parser.add_argument("--npc-table", action="store_true", help="Run NPC seats through the array-backed NpcTable")
+    parser.add_argument("--output", type=str, default="", help="Optional path to write the report JSON")
+    parser.add_argument("--log-dir", type=str, default="", help="Optional directory for counterfactual JSONL logs")
+    args = parser.parse_args()
+
+    log_dir = Path(args.log_dir) if args.log_dir else None
+    if log_dir:
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+    games = []
+    for path in log_paths(args.logs):
+        recorded = load_log(str(path))
+        seat = recorded.agent_seat
+        if args.a2a_endpoint:
+            agent = get_agent("a2a", name=seat, role=recorded.roles[seat], seed=recorded.seed, url=args.a2a_endpoint)
+        else:
+            agent = get_agent("npc", name=seat, role=recorded.roles[seat], seed=recorded.seed)
+        try:
+            replay = Replay(
+                recorded, max_debate_turns=args.max_turns, max_rounds=args.max_rounds, npc_table=args.npc_table
+            )
+            result = replay.counterfactual(agent, args.round, args.phase)
+        except ValueError as exc:
+            games.append({"log": str(path), "skipped": str(exc)})
+            continue
+        scorecard = score.score_game(result)
+        games.append(
+            {
+                "log": str(path),
+                "seed": recorded.seed,
+                "agent_seat": seat,
+                "agent_role": recorded.roles[seat],
+                "recorded_winner": recorded.winner,
+                "winner": result.get("winner"),
+                "metrics": scorecard.get("metrics", {}),
+            }
+        )
+        if log_dir:
+            meta = dict(recorded.meta, max_rounds=replay.max_rounds, replay_round=args.round, replay_phase=args.phase)
+            records = log_utils.game_log_to_records(result, meta=meta, metrics=scorecard.get("metrics"))
+            log_utils.write_jsonl(str(log_dir / path.name), records)
+
+    played = [g for g in games if "skipped" not in g]
+    report = {
+        "round": args.round,
+        "phase": args.phase,
+        "games": games,
+        "games_replayed": len(played),
+        "winner_changed": sum(g["winner"] != g["recorded_winner"] for g in played),
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ def main():
     parser.add_argument("--a2a-endpoint", type=str, default="", help="Optional A2A agent endpoint (overrides scripted actions)")
     parser.add_argument("--a2a-seats", type=str, default="", help="Comma-separated player names to route to A2A (Agent vs NPC)")
     parser.add_argument("--a2a-roles", type=str, default="", help="Comma-separated role names to route to A2A (Agent vs NPC)")
+    parser.add_argument("--npc-table", action="store_true", help="Run NPC seats through the array-backed NpcTable")
     args = parser.parse_args()
 
     a2a_seats = [s.strip() for s in args.a2a_seats.split(",") if s.strip()]
@@ -29,6 +30,7 @@ def main():
         "a2a_endpoint": args.a2a_endpoint,
         "a2a_seats": a2a_seats,
         "a2a_roles": a2a_roles,
+        "npc_table": args.npc_table,
     })
     scorecard = score.score_game(result)
     if args.log_jsonl:
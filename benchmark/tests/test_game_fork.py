@@ -0,0 +1,31 @@
+from benchmark import game
+
+PLAYERS = ["Derek", "Scott", "Jacob", "Isaac", "Hayley", "David", "Tyler", "Ginger"]
+
+
+def test_forks_continue_like_the_original():
+    for npc_table in (False, True):
+        for seed in range(10):
+            full = game.Game(seed, PLAYERS, npc_table=npc_table)
+            expected = full.run()
+            g = game.Game(seed, PLAYERS, npc_table=npc_table)
+            forks = []
+            while g.step() is None:
+                forks.append(g.snapshot())
+            for snapshot in forks:
+                fork = snapshot.fork()
+                assert fork.run() == expected
+                assert fork.events == full.events
+            assert g.log == expected
+
+
+def test_override_replaces_next_action_and_is_recorded():
+    g = game.Game(0, PLAYERS)
+    assert g.play_until(1, "night")
+    doctor = next(n for n, r in g.roles.items() if r == "Doctor")
+    target = g.alive_players()[0]
+    fork = g.fork()
+    fork.override(doctor, target=target)
+    assert fork.run()["rounds"][1]["night"]["doctor"] == target
+    assert any(e.kind == "protect" and e.round == 1 and e.target == target for e in fork.events)
+    assert all(e.round == 0 for e in g.events)
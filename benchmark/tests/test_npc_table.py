@@ -0,0 +1,32 @@
+from agents.npc_agent import NpcAgent
+from agents.npc_table import NpcTable
+from benchmark import game
+
+
+def test_table_mode_matches_per_agent_games():
+    for seed in range(40):
+        config = {"seed": seed, "max_debate_turns": 6, "max_rounds": 6}
+        assert game.run_game(dict(config, npc_table=True)) == game.run_game(config)
+
+
+def test_batched_votes_match_npc_agents():
+    names = ["Derek", "Scott", "Jacob", "Isaac"]
+    roles = ["Werewolf", "Seer", "Doctor", "Villager"]
+    debate = [
+        "Scott:I am the Seer. I suspect Derek is a wolf.",
+        "Jacob:I'm the seer, Scott is lying. Vote Scott.",
+        "Isaac:I trust Jacob, he seems innocent.",
+    ]
+    agents = [NpcAgent(n, r, 7) for n, r in zip(names, roles)]
+    table = NpcTable(names)
+    for n, r in zip(names, roles):
+        table.add_seat(n, r, 7)
+    votes = table.vote(names, names, debate)
+    assert votes == {a.name: a._vote_impl(names, debate_history=debate) for a in agents}
+    # Names in plain speech reach the accused/defended evidence in both paths.
+    isaac = agents[3]
+    row = table.index["Isaac"]
+    assert list(table.accused[row]) == [isaac.accused_by[isaac._seat(n)] for n in names] == [1, 1, 0, 0]
+    assert list(table.defended[row]) == [isaac.defended_by[isaac._seat(n)] for n in names] == [0, 0, 1, 0]
+    night = table.night_power(names, names, ["Derek"])
+    assert night == {a.name: a._night_power_impl(names, ["Derek"]) for a in agents}
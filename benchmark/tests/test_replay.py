@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+from agents.npc_agent import NpcAgent
+from benchmark import game, replay
+from benchmark import logging as log_utils
+
+PLAYERS = ["Derek", "Scott", "Jacob", "Isaac", "Hayley", "David", "Tyler", "Ginger"]
+FIXTURES = Path(__file__).resolve().parents[2] / "fixtures" / "agent_vs_npc_logs"
+
+
+def _write_log(path, log, seat):
+    records = log_utils.game_log_to_records(log, meta={"agent_seat": seat, "seed": log["seed"]})
+    log_utils.write_jsonl(str(path), records)
+    return str(path)
+
+
+class CountingPurple(NpcAgent):
+    __slots__ = ("rounds_asked",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.rounds_asked = []
+
+    def speak(self, obs):
+        self.rounds_asked.append(obs.round)
+        return super().speak(obs)
+
+    def vote(self, obs):
+        self.rounds_asked.append(obs.round)
+        return super().vote(obs)
+
+    def night_power(self, obs):
+        self.rounds_asked.append(obs.round)
+        return super().night_power(obs)
+
+
+def test_replay_resumes_current_engine_logs_exactly(tmp_path):
+    for npc_table in (False, True):
+        for seed in range(8):
+            log = game.run_game({"seed": seed, "player_names": PLAYERS, "npc_table": npc_table})
+            expected = json.loads(json.dumps(log))
+            r = replay.Replay.from_log(_write_log(tmp_path / f"g{seed}.jsonl", log, PLAYERS[0]), npc_table=npc_table)
+            assert (0, "night") in r.paused
+            for round_num, phase in r.paused:
+                resumed = json.loads(json.dumps(r.game_at(round_num, phase).run()))
+                assert resumed == expected
+
+
+def test_tied_elimination_is_recovered_from_later_rounds(tmp_path):
+    g = game.Game(3, PLAYERS)
+    g.play_until(0, "day_vote")
+    alive = g.alive_players()
+    a, b = [p for p in alive if g.roles[p] != "Werewolf"][:2]
+    for i, voter in enumerate(alive):
+        g.override(voter, target=(a, b)[i % 2] if i < len(alive) // 2 * 2 else None)
+    probe = g.fork()
+    probe.step()
+    # Eliminate the tied player the engine's own tie-break does not pick.
+    other = a if a in probe.alive_players() else b
+    g.override_phase(eliminated=other)
+    log = g.run()
+    assert len(log["rounds"]) > 1
+    r = replay.Replay.from_log(_write_log(tmp_path / "tie.jsonl", log, PLAYERS[0]))
+    assert r.game_at(1, "night").alive_players() == log["rounds"][1]["players"]
+    assert other not in log["rounds"][1]["players"]
+
+
+def test_counterfactual_reuses_recorded_prefix():
+    path = sorted(FIXTURES.glob("game_*.jsonl"))[0]
+    r = replay.Replay.from_log(str(path))
+    recorded, seat = r.recorded, r.recorded.agent_seat
+    last = recorded.rounds[-1]["round"]
+    purple = CountingPurple(seat, recorded.roles[seat], recorded.seed)
+    log = r.counterfactual(purple, last, "day")
+    assert purple.rounds_asked and min(purple.rounds_asked) == last
+    prefix = [{k: played[k] for k in ("round", "night", "debate", "votes")} for played in log["rounds"][:last]]
+    assert json.loads(json.dumps(prefix)) == json.loads(json.dumps(recorded.rounds[:last]))
+    for path in sorted(FIXTURES.glob("game_*.jsonl")):
+        r = replay.Replay.from_log(str(path))
+        seat = r.recorded.agent_seat
+        g = r.game_at(0, "day")
+        g.seat_agent(seat, NpcAgent(seat, r.recorded.roles[seat], r.recorded.seed))
+        checks = [e for e in g.events if e.kind == "reveal" and e.actor == seat]
+        if checks:
+            assert g.agents[seat].known_wolf or g.agents[seat].known_good
+        assert g.run()["winner"] is not None
+
+
+def test_timeout_games_replay_under_their_round_limit(tmp_path):
+    log = game.run_game({"seed": 0, "player_names": PLAYERS, "max_rounds": 1})
+    assert log["winner"] == "Timeout"
+    path = _write_log(tmp_path / "timeout.jsonl", log, PLAYERS[0])
+    # Older logs carry no max_rounds; the limit is inferred from the timeout.
+    r = replay.Replay.from_log(path)
+    assert r.max_rounds == 1
+    assert json.loads(json.dumps(r.game_at(0, "day").run())) == json.loads(json.dumps(log))
+    try:
+        replay.Replay.from_log(path, max_rounds=10)
+    except ValueError as exc:
+        assert "timed out after 1 rounds but max_rounds is 10" in str(exc)
+    else:
+        raise AssertionError("round-limit mismatch was not reported")
+
+    records = log_utils.game_log_to_records(log, meta={"agent_seat": PLAYERS[0], "max_rounds": 1})
+    log_utils.write_jsonl(str(tmp_path / "meta.jsonl"), records)
+    assert replay.Replay.from_log(str(tmp_path / "meta.jsonl")).max_rounds == 1
@@ -0,0 +1,30 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+
+from benchmark import game
+from core.rng import RngStreams
+
+GAME = "import json; from benchmark import game; print(json.dumps(game.run_game({'seed': 7})))"
+
+
+def test_streams_are_keyed_and_resumable():
+    streams = RngStreams(7)
+    first = streams.stream("game", "speaker_order")
+    second = RngStreams(7).stream("game", "speaker_order")
+    assert [first.getrandbits(64) for _ in range(20)] == [second.getrandbits(64) for _ in range(20)]
+    assert streams.seat("Derek", "npc").random() != streams.seat("Scott", "npc").random()
+    assert streams.stream("game", "vote_tiebreak").random() != streams.stream("game", "speaker_order").random()
+    fork = copy.copy(first)
+    assert first.sample(range(100), 10) == fork.sample(range(100), 10)
+
+
+def test_game_is_identical_across_processes():
+    expected = json.loads(json.dumps(game.run_game({"seed": 7})))
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for hash_seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=hash_seed, PYTHONPATH=root)
+        out = subprocess.run([sys.executable, "-c", GAME], env=env, cwd=root, capture_output=True, text=True, check=True)
+        assert json.loads(out.stdout) == expected
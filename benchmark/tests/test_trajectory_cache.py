@@ -0,0 +1,101 @@
+import pickle
+
+from agents.npc_agent import NpcAgent
+from benchmark import game, trajectory_cache
+from benchmark.trajectory_cache import PurpleSeat, TrajectoryCache
+from core.types import Action
+
+PLAYERS = ["Derek", "Scott", "Jacob", "Isaac", "Hayley", "David", "Tyler", "Ginger"]
+
+
+class ScriptedPurple:
+    """Answers like the A2A fallback server: a fresh NPC per request."""
+
+    def __init__(self, salt: int):
+        self.salt = salt
+
+    def speak(self, obs):
+        return NpcAgent(obs.name, obs.role, obs.seed + self.salt).speak(obs)
+
+    def vote(self, obs):
+        return NpcAgent(obs.name, obs.role, obs.seed + self.salt).vote(obs)
+
+    def night_power(self, obs):
+        return NpcAgent(obs.name, obs.role, obs.seed + self.salt).night_power(obs)
+
+
+class FirstPlayerPurple(ScriptedPurple):
+    def vote(self, obs):
+        return Action(type="vote", target=next(p for p in obs.remaining_players if p != obs.name))
+
+
+def _uncached(config, seat, agent):
+    g = game.new_game(config)
+    purple = PurpleSeat(seat, g.roles[seat], g.seed)
+    purple.delegate = agent
+    g.seat_agent(seat, purple)
+    return g.run()
+
+
+def test_cached_runs_match_uncached_games():
+    cache = TrajectoryCache()
+    for seed in range(6):
+        config = {"seed": seed, "player_names": PLAYERS, "max_debate_turns": 6}
+        seat = PLAYERS[seed]
+        for agent in (ScriptedPurple(0), FirstPlayerPurple(0), ScriptedPurple(0), ScriptedPurple(3)):
+            assert cache.run(config, seat, agent) == _uncached(config, seat, agent)
+    assert cache.stats["phases_reused"] > cache.stats["phases_simulated"] / 2
+
+
+def test_repeat_run_simulates_nothing(tmp_path):
+    config = {"seed": 11, "player_names": PLAYERS}
+    cache = TrajectoryCache()
+    first = cache.run(config, "Scott", ScriptedPurple(0))
+    path = str(tmp_path / "cache.pkl")
+    cache.save(path)
+    reloaded = TrajectoryCache.load(path)
+    assert reloaded.run(config, "Scott", ScriptedPurple(0)) == first
+    assert reloaded.stats["phases_simulated"] == 0
+
+
+def test_other_version_caches_are_discarded(tmp_path, monkeypatch):
+    config = {"seed": 11, "player_names": PLAYERS}
+    cache = TrajectoryCache()
+    cache.run(config, "Scott", ScriptedPurple(0))
+    path = str(tmp_path / "cache.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(cache.roots, f)
+    assert not TrajectoryCache.load(path).roots
+    cache.save(path)
+    monkeypatch.setattr(trajectory_cache, "CACHE_VERSION", trajectory_cache.CACHE_VERSION + 1)
+    reloaded = TrajectoryCache.load(path)
+    assert not reloaded.roots
+    reloaded.run(config, "Scott", ScriptedPurple(0))
+    assert reloaded.stats["phases_reused"] == 0
+
+
+def test_least_recent_leaves_are_dropped_past_max_nodes(tmp_path):
+    cache = TrajectoryCache(max_nodes=15)
+    for seed in range(4):
+        cache.run({"seed": seed, "player_names": PLAYERS}, "Scott", ScriptedPurple(0))
+    cache.run({"seed": 3, "player_names": PLAYERS}, "Scott", ScriptedPurple(5))
+    keys = [TrajectoryCache.config_key({"seed": seed, "player_names": PLAYERS}, "Scott") for seed in range(4)]
+    assert cache.stats["nodes_evicted"] > 0
+    assert sum(cache.sizes.values()) == 15
+    assert cache.sizes == {key: trajectory_cache._count(root) for key, root in cache.roots.items()}
+    # Older tries lose their deepest phases first and keep their roots.
+    assert set(cache.roots) == set(keys)
+    assert cache.sizes[keys[0]] == cache.sizes[keys[1]] == 1
+    assert 1 < cache.sizes[keys[2]] < 7
+    path = str(tmp_path / "cache.pkl")
+    cache.save(path)
+    assert TrajectoryCache.load(path, max_nodes=15).sizes == cache.sizes
+    # Both branches of the most recent trie, and the shared prefix of the
+    # older seed 2, are still cached.
+    simulated = cache.stats["phases_simulated"]
+    cache.run({"seed": 3, "player_names": PLAYERS}, "Scott", ScriptedPurple(5))
+    cache.run({"seed": 3, "player_names": PLAYERS}, "Scott", ScriptedPurple(0))
+    assert cache.stats["phases_simulated"] == simulated
+    reused, kept = cache.stats["phases_reused"], cache.sizes[keys[2]]
+    cache.run({"seed": 2, "player_names": PLAYERS}, "Scott", ScriptedPurple(0))
+    assert cache.stats["phases_reused"] - reused == kept - 1
@@ -0,0 +1,246 @@
+"""Prefix-sharing cache of agent-vs-NPC trajectories.
+
+For a fixed seed and config, everything the NPCs do is a function of the
+purple seat's actions so far. `TrajectoryCache` keeps a trie per (seed,
+config): each node is the game paused at a phase boundary, together with the
+observation the purple seat receives in that phase, and each edge is the
+purple action taken there (or None when the seat does not act). A run asks the
+evaluated agent for its action on the cached observation and follows the
+matching edge. NPC play is only simulated from the first phase where the agent
+diverges from every earlier run.
+"""
+
+import copy
+import heapq
+import json
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmark import game
+from core.types import Action, Observation
+
+# Cached nodes hold pickled Game/agent objects and NPC decisions made by the
+# engine that wrote them. Bump when either changes; caches written under
+# another version are discarded on load.
+CACHE_VERSION = 3
+# About 4-5 KB of pickle per node; least recently used leaves are dropped past this.
+DEFAULT_MAX_NODES = 20000
+
+
+class PurpleSeat:
+    """Stand-in for the evaluated agent inside cached games.
+
+    Cached games must not hold a particular agent, so the seat forwards each
+    turn to `delegate`, which the cache swaps in per run, and records the turns
+    it forwarded. Actions in `script` are returned first without asking the
+    delegate (the cache already asked it on the cached observation).
+    """
+
+    def __init__(self, name: str, role: str, seed: int):
+        self.name = name
+        self.role = role
+        self.seed = seed
+        self.alive = True
+        self.seer_checks: List[Dict[str, str]] = []
+        self.delegate: Any = None
+        self.script: List[Action] = []
+        self.turns: List[Tuple[str, Observation, Action]] = []
+
+    def _act(self, method: str, obs: Observation) -> Action:
+        if self.script:
+            return self.script.pop(0)
+        action = getattr(self.delegate, method)(obs)
+        self.turns.append((method, obs, action))
+        return action
+
+    def speak(self, obs: Observation) -> Action:
+        return self._act("speak", obs)
+
+    def vote(self, obs: Observation) -> Action:
+        return self._act("vote", obs)
+
+    def night_power(self, obs: Observation) -> Action:
+        return self._act("night_power", obs)
+
+    def mark_dead(self) -> None:
+        self.alive = False
+
+    def update_seer_inspection(self, target: str, role: str) -> None:
+        self.seer_checks.append({"target": target, "role": role})
+
+    def clone(self) -> "PurpleSeat":
+        other = copy.copy(self)
+        other.seer_checks = list(self.seer_checks)
+        other.script = []
+        other.turns = []
+        return other
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return dict(self.__dict__, delegate=None, script=[], turns=[])
+
+
+class _Node:
+    """A game paused before a phase, plus what the purple seat sees in it."""
+
+    __slots__ = ("game", "explored", "turn", "children", "parent", "edge", "depth", "last_used")
+
+    def __init__(self, paused: game.Game, parent: Optional["_Node"] = None, edge: Optional[str] = None):
+        self.game = paused
+        self.explored = False
+        # (method, observation) of the purple turn in this phase, if any.
+        self.turn: Optional[Tuple[str, Observation]] = None
+        self.children: Dict[Optional[str], "_Node"] = {}
+        self.parent = parent
+        self.edge = edge
+        self.depth = parent.depth + 1 if parent is not None else 0
+        # Number of the last run that passed through this node.
+        self.last_used = 0
+
+
+def _action_key(action: Action) -> str:
+    return json.dumps(action.to_dict(), sort_keys=True)
+
+
+def _walk(node: _Node):
+    yield node
+    for child in node.children.values():
+        yield from _walk(child)
+
+
+def _count(node: _Node) -> int:
+    return sum(1 for _ in _walk(node))
+
+
+class TrajectoryCache:
+    """Trie of paused games keyed by (seed, config) and the purple actions so far.
+
+    At most `max_nodes` nodes are kept across tries. Past that, leaves are
+    dropped, least recently run first and deepest first among those, so the
+    early phases that many runs share are the last to go. A root is only
+    dropped once its trie is down to the root alone.
+    """
+
+    def __init__(self, max_nodes: int = DEFAULT_MAX_NODES):
+        self.max_nodes = max(1, max_nodes)
+        self.roots: "OrderedDict[str, _Node]" = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+        self.stats = {"phases_simulated": 0, "phases_reused": 0, "nodes_evicted": 0}
+        self._runs = 0
+
+    @staticmethod
+    def config_key(config: Dict[str, Any], seat: str) -> str:
+        fields = {k: v for k, v in config.items() if not k.startswith("a2a_")}
+        return json.dumps({"version": CACHE_VERSION, "seat": seat, **fields}, sort_keys=True)
+
+    def _root(self, key: str, config: Dict[str, Any], seat: str) -> _Node:
+        root = self.roots.get(key)
+        if root is None:
+            start = game.new_game({k: v for k, v in config.items() if not k.startswith("a2a_")})
+            start.seat_agent(seat, PurpleSeat(seat, start.roles[seat], start.seed))
+            root = self.roots[key] = _Node(start)
+            self.sizes[key] = 1
+        self.roots.move_to_end(key)
+        return root
+
+    def _trim(self) -> None:
+        excess = sum(self.sizes.values()) - self.max_nodes
+        if excess <= 0:
+            return
+        # (is root, last run, deeper first, tie-break, root key, node)
+        heap = []
+        for key, root in self.roots.items():
+            for node in _walk(root):
+                if not node.children:
+                    heap.append((node.parent is None, node.last_used, -node.depth, id(node), key, node))
+        heapq.heapify(heap)
+        while excess > 0 and heap:
+            _, _, _, _, key, node = heapq.heappop(heap)
+            parent = node.parent
+            if parent is None:
+                del self.roots[key]
+                del self.sizes[key]
+            else:
+                del parent.children[node.edge]
+                self.sizes[key] -= 1
+                if not parent.children:
+                    heapq.heappush(
+                        heap, (parent.parent is None, parent.last_used, -parent.depth, id(parent), key, parent)
+                    )
+            self.stats["nodes_evicted"] += 1
+            excess -= 1
+
+    def _simulate(self, node: _Node, seat: str, delegate: Any, script: List[Action]) -> Tuple[Optional[str], _Node]:
+        paused = node.game.fork()
+        purple = paused.agents[seat]
+        purple.delegate = delegate
+        purple.script = list(script)
+        paused.step()
+        if not node.explored:
+            node.explored = True
+            node.turn = (purple.turns[0][0], purple.turns[0][1]) if purple.turns else None
+        played = script[0] if script else (purple.turns[0][2] if purple.turns else None)
+        purple.delegate = None
+        key = _action_key(played) if played is not None else None
+        child = node.children[key] = _Node(paused, node, key)
+        self.stats["phases_simulated"] += 1
+        return key, child
+
+    def run(self, config: Dict[str, Any], seat: str, delegate: Any) -> Dict[str, Any]:
+        """Plays `config` with `delegate` in `seat`, reusing cached NPC play; returns the game log."""
+        root_key = self.config_key(config, seat)
+        node = self._root(root_key, config, seat)
+        simulated = self.stats["phases_simulated"]
+        self._runs += 1
+        while node.game.log["winner"] is None:
+            node.last_used = self._runs
+            if not node.explored:
+                _, node = self._simulate(node, seat, delegate, [])
+                continue
+            script: List[Action] = []
+            key = None
+            if node.turn is not None:
+                method, obs = node.turn
+                action = getattr(delegate, method)(obs)
+                script = [action]
+                key = _action_key(action)
+            child = node.children.get(key)
+            if child is None:
+                _, child = self._simulate(node, seat, delegate, script)
+            else:
+                self.stats["phases_reused"] += 1
+            node = child
+        node.last_used = self._runs
+        # Every simulated phase added one node to this trie.
+        self.sizes[root_key] += self.stats["phases_simulated"] - simulated
+        log = copy.deepcopy(node.game.log)
+        self._trim()
+        return log
+
+    def save(self, path: str) -> None:
+        self._trim()
+        with open(path, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "roots": self.roots}, f)
+
+    @classmethod
+    def load(cls, path: str, max_nodes: int = DEFAULT_MAX_NODES) -> "TrajectoryCache":
+        """Loads a cache written by save(); only load files you wrote (pickle).
+
+        A missing, unreadable or other-version file gives an empty cache.
+        """
+        cache = cls(max_nodes=max_nodes)
+        if not os.path.exists(path):
+            return cache
+        try:
+            with open(path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, EOFError, AttributeError, ImportError, pickle.UnpicklingError):
+            return cache
+        if not isinstance(saved, dict) or saved.get("version") != CACHE_VERSION:
+            return cache
+        cache.roots = OrderedDict(saved["roots"])
+        cache.sizes = {key: _count(root) for key, root in cache.roots.items()}
+        cache._runs = max((node.last_used for root in cache.roots.values() for node in _walk(root)), default=0)
+        cache._trim()
+        return cache
@@ -0,0 +1,86 @@
+"""Counter-based random streams for reproducible games.
+
+Each stream is keyed by (game seed, seat, purpose). Block n of a stream is
+BLAKE2b(n) under a key derived from that tuple, so the values a stream yields
+depend only on its key and on how much was drawn from it. They do not depend
+on str hash randomization, the process or worker, or how other streams were
+used, so games replay bit-for-bit anywhere and sweeps can be split freely.
+"""
+
+import hashlib
+import json
+import random
+from typing import Tuple, Union
+
+KeyPart = Union[int, str]
+
+_BLOCK_BYTES = 64
+_PERSON = b"werewolf-rng-v1"
+
+
+def stream_key(*parts: KeyPart) -> bytes:
+    """Stable 32-byte key for a tuple of ints/strs."""
+    text = json.dumps(list(parts), separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=32, person=_PERSON).digest()
+
+
+class CounterRandom(random.Random):
+    """random.Random whose bits come from a keyed BLAKE2b counter.
+
+    All of random.Random's methods (choice, sample, shuffle, uniform, ...) are
+    built on `getrandbits`/`random`, so they draw from the counter stream.
+    """
+
+    def __init__(self, key: bytes):
+        self._key = key
+        super().__init__()
+
+    def seed(self, a=None, version: int = 2) -> None:
+        if a is not None:
+            self._key = stream_key(a) if not isinstance(a, bytes) else a
+        self._counter = 0
+        self._pool = 0
+        self._pool_bits = 0
+        self.gauss_next = None
+
+    def getrandbits(self, k: int) -> int:
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        while self._pool_bits < k:
+            block = hashlib.blake2b(
+                self._counter.to_bytes(8, "little"), key=self._key, digest_size=_BLOCK_BYTES
+            ).digest()
+            self._pool |= int.from_bytes(block, "little") << self._pool_bits
+            self._pool_bits += 8 * _BLOCK_BYTES
+            self._counter += 1
+        value = self._pool & ((1 << k) - 1)
+        self._pool >>= k
+        self._pool_bits -= k
+        return value
+
+    def random(self) -> float:
+        return self.getrandbits(53) * 2.0**-53
+
+    def getstate(self) -> Tuple:
+        return (self._key, self._counter, self._pool, self._pool_bits, self.gauss_next)
+
+    def setstate(self, state: Tuple) -> None:
+        self._key, self._counter, self._pool, self._pool_bits, self.gauss_next = state
+
+    def __reduce__(self):
+        return (self.__class__, (self._key,), self.getstate())
+
+
+class RngStreams:
+    """Derives the independent random streams of one game from its seed."""
+
+    __slots__ = ("seed",)
+
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def stream(self, *purpose: KeyPart) -> CounterRandom:
+        return CounterRandom(stream_key(self.seed, *purpose))
+
+    def seat(self, name: str, purpose: str) -> CounterRandom:
+        return self.stream("seat", name, purpose)
@@ -1,14 +1,14 @@
 """Shared data types for observations and actions."""
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal, Optional
+from typing import Dict, Iterable, List, Literal, Optional
 
 Role = Literal["Werewolf", "Seer", "Doctor", "Villager"]
 Phase = Literal["day", "day_vote", "night"]
 ActionType = Literal["speak", "vote", "night_power", "noop"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Action:
     type: ActionType
     content: Optional[str] = None
@@ -23,7 +23,7 @@ class Action:
         return data
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Observation:
     round: int
     phase: Phase
@@ -47,3 +47,53 @@ class Observation:
             "public_debate": list(self.public_debate),
             "private": dict(self.private),
         }
+
+
+EventKind = Literal["attack", "protect", "reveal", "kill", "utterance", "vote", "eliminate"]
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """One engine state transition, in the order it happened."""
+
+    round: int
+    phase: Phase
+    kind: EventKind
+    actor: Optional[str] = None
+    target: Optional[str] = None
+    content: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        data: Dict[str, object] = {"round": self.round, "phase": self.phase, "kind": self.kind}
+        for key in ("actor", "target", "content"):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+
+class SeatTable:
+    """Name <-> seat index table shared by the agents of one game.
+
+    Seats are numbered in the order names are first seen, so per-seat state
+    can live in flat arrays indexed by seat instead of dicts keyed by name.
+    """
+
+    __slots__ = ("names", "index")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        for name in names:
+            self.seat(name)
+
+    def seat(self, name: str) -> int:
+        seat = self.index.get(name)
+        if seat is None:
+            seat = len(self.names)
+            self.names.append(name)
+            self.index[name] = seat
+        return seat
+
+    def __len__(self) -> int:
+        return len(self.names)
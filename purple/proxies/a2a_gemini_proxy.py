@@ -15,10 +15,15 @@ import datetime as dt
 import hashlib
 import json
 import os
+import signal
 import sys
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import re
-from typing import Dict
+from difflib import get_close_matches
+from typing import Callable, Dict, List, Optional
 
 import google.generativeai as genai
 
@@ -29,9 +34,133 @@ DEFAULT_TOP_P = float(os.environ.get("MODEL_TOP_P", "1.0"))
 DEFAULT_TOP_K = int(os.environ.get("MODEL_TOP_K", "1"))
 DEFAULT_CANDIDATE_COUNT = int(os.environ.get("MODEL_CANDIDATE_COUNT", "1"))
 DEFAULT_DETERMINISTIC = True
+DEFAULT_MAX_SESSIONS = int(os.environ.get("PROXY_MAX_SESSIONS", "256"))
+DEFAULT_SESSION_TTL = float(os.environ.get("PROXY_SESSION_TTL", "3600"))
+DEFAULT_PROMPT_LAYOUT = os.environ.get("PROMPT_LAYOUT", "legacy")
+# Gemini rejects explicit caches below this many tokens.
+DEFAULT_CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+QUIET_MARKERS = ("quiet", "silence", "not said much", "hasn't said much", "hasnt said much", "not talking much")
 
 
-def format_prompt(obs: Dict, strict: bool = False) -> str:
+class GameSession:
+    """Per-game proxy memory (speak de-dup and anti-repeat reasons) for one seed."""
+
+    def __init__(self, seed) -> None:
+        self.seed = seed
+        self.last_round = -1
+        self.last_speak: Dict[tuple, str] = {}  # {(name, round): content}
+        self.recent_reasons: deque = deque(maxlen=5)
+        self.last_prompts: Dict[str, str] = {}  # {name: last prompt}, for prefix-reuse stats
+        self.context_caches: Dict[str, object] = {}  # {name: CachedPrefix, or None once creation failed}
+        self.lock = threading.Lock()
+        self.touched = time.monotonic()
+
+
+class SessionStore:
+    """Bounded per-game session store with LRU and idle-TTL eviction.
+
+    Sessions are keyed by seed. Starting a new game on a seed (night of round 0
+    after a later round was seen) swaps in a fresh session instead of scanning
+    other games' entries.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl_seconds: float = DEFAULT_SESSION_TTL,
+        on_close: Optional[Callable[[GameSession], None]] = None,
+    ) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        # Called (outside the store lock) for every session dropped by eviction, expiry or reset.
+        self.on_close = on_close
+        self._sessions: "OrderedDict[object, GameSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+        self.resets = 0
+
+    def _expire(self, now: float, closed: List[GameSession]) -> None:
+        # Oldest-touched sessions sit at the front, so stop at the first live one.
+        if self.ttl_seconds <= 0:
+            return
+        while self._sessions:
+            seed, session = next(iter(self._sessions.items()))
+            if now - session.touched < self.ttl_seconds:
+                return
+            closed.append(self._sessions.pop(seed))
+            self.expired += 1
+
+    def observe(self, seed, round_num, phase) -> GameSession:
+        """Return the session for seed, tracking round progress and game restarts."""
+        now = time.monotonic()
+        closed: List[GameSession] = []
+        with self._lock:
+            self._expire(now, closed)
+            session = self._sessions.get(seed)
+            if session is None:
+                session = GameSession(seed)
+                self._sessions[seed] = session
+                while len(self._sessions) > self.max_sessions:
+                    closed.append(self._sessions.popitem(last=False)[1])
+                    self.evicted += 1
+            elif phase == "night" and round_num == 0 and session.last_round > 0:
+                closed.append(session)
+                session = GameSession(seed)
+                self._sessions[seed] = session
+                self.resets += 1
+            self._sessions.move_to_end(seed)
+            session.touched = now
+        if self.on_close is not None:
+            for old in closed:
+                self.on_close(old)
+        with session.lock:
+            if isinstance(round_num, int) and round_num > session.last_round:
+                # Only the current round is consulted for de-dup.
+                session.last_speak.clear()
+                session.last_round = round_num
+        return session
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "resets": self.resets,
+            }
+
+
+def format_prompt(obs: Dict, strict: bool = False, layout: str = "legacy") -> str:
+    """Render the prompt; layout="stable" orders content from most to least stable."""
+    if layout == "stable":
+        prefix, rest = split_prompt(obs, strict=strict)
+        return f"{prefix}\n{rest}"
+    return "\n".join(_prompt_lines(obs, strict)["legacy"])
+
+
+def split_prompt(obs: Dict, strict: bool = False) -> tuple[str, str]:
+    """Return (stable prefix, volatile remainder) for the prefix-stable layout.
+
+    The prefix (schema/system rules, then role guidance) is fixed for a seat for
+    the whole game; the remainder holds game history followed by the current delta.
+    """
+    parts = _prompt_lines(obs, strict)
+    return "\n".join(parts["system"] + parts["role"]), "\n".join(parts["history"] + parts["delta"])
+
+
+def cache_split(obs: Dict, strict: bool = False) -> tuple[str, str]:
+    """Return (cacheable text, current delta) of the stable layout: seat prefix plus game history, then the rest.
+
+    Joined with a newline they give format_prompt(obs, layout="stable").
+    """
+    parts = _prompt_lines(obs, strict)
+    return "\n".join(parts["system"] + parts["role"] + parts["history"]), "\n".join(parts["delta"])
+
+
+def _prompt_lines(obs: Dict, strict: bool) -> Dict[str, List[str]]:
     role = obs.get("role")
     phase = obs.get("phase")
     public = obs.get("public_debate", [])
@@ -65,6 +194,9 @@ def format_prompt(obs: Dict, strict: bool = False) -> str:
 
     strict_hint = "Return ONLY the JSON object, no prose, no code fences." if strict else "Return JSON only; no leading/trailing prose."
 
+    schema_line = 'Schema: {"type": "speak|vote|night_power|noop", "content": str?, "target": str?}.'
+    constraint_line = "Constraint: do not assert certainty about roles unless supported by private info."
+    misdirection_line = "If you are a Werewolf: use light misdirection (agree/deflect, ask a question, offer an alternative suspect) to avoid looking too cooperative."
     lines = [
         f"You are {obs.get('name')} playing role {role}.",
         f"Round: {obs.get('round')} Phase: {phase}.",
@@ -73,22 +205,33 @@ def format_prompt(obs: Dict, strict: bool = False) -> str:
         f"Graveyard: {graveyard}",
         f"Debate so far: {public}",
         f"Private info: {private}",
-        "Constraint: do not assert certainty about roles unless supported by private info.",
+        constraint_line,
         style_hint,
-        "If you are a Werewolf: use light misdirection (agree/deflect, ask a question, offer an alternative suspect) to avoid looking too cooperative.",
+        misdirection_line,
         action_hint,
         f"Example: {exemplar}",
         role_hint,
         strict_hint,
-        'Schema: {"type": "speak|vote|night_power|noop", "content": str?, "target": str?}.',
+        schema_line,
     ]
-    return "\n".join(lines)
+    return {
+        "legacy": lines,
+        "system": [schema_line, constraint_line, misdirection_line],
+        "role": [line for line in (f"You are {obs.get('name')} playing role {role}.", style_hint, role_hint) if line],
+        "history": [f"Graveyard: {graveyard}", "Debate so far:"] + [f"- {line}" for line in public],
+        "delta": [
+            f"Round: {obs.get('round')} Phase: {phase}.",
+            f"Remaining players: {remaining}",
+            f"Allowed targets (use exact spelling): {remaining}",
+            f"Private info: {private}",
+            action_hint,
+            f"Example: {exemplar}",
+            strict_hint,
+        ],
+    }
 
 
-def call_model(
-    model: str, temperature: float, max_tokens: int, obs: Dict, *, strict: bool = False
-) -> tuple[Dict, str, str]:
-    prompt = format_prompt(obs, strict=strict)
+def build_generation_config(temperature: float, max_tokens: int) -> Dict:
     # Deterministic-ish settings for Gemini: clamp sampling and candidates.
     if DEFAULT_DETERMINISTIC:
         temperature = 0.0
@@ -99,31 +242,601 @@ def call_model(
         top_p = DEFAULT_TOP_P
         top_k = DEFAULT_TOP_K
         candidate_count = DEFAULT_CANDIDATE_COUNT
-    response = genai.GenerativeModel(model).generate_content(
-        prompt,
-        generation_config={
-            "temperature": temperature,
-            "max_output_tokens": max_tokens,
-            "top_p": top_p,
-            "top_k": top_k,
-            "candidate_count": candidate_count,
-        },
-    )
+    return {
+        "temperature": temperature,
+        "max_output_tokens": max_tokens,
+        "top_p": top_p,
+        "top_k": top_k,
+        "candidate_count": candidate_count,
+    }
+
+
+class ResponseCache:
+    """Disk-backed prompt -> raw response cache for greedy (deterministic) generations.
+
+    Entries are keyed by model id, generation config and the prompt's SHA-256 and
+    stored one file per key. The least recently used entries are evicted once the
+    total size exceeds max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # {key: size_bytes}, oldest first
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        files = []
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(directory, name)
+            st = os.stat(path)
+            files.append((st.st_mtime, name[: -len(".json")], st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+
+    @staticmethod
+    def cacheable(config: Dict) -> bool:
+        return config.get("temperature") == 0.0 or config.get("top_k") == 1
+
+    @staticmethod
+    def key(model: str, config: Dict, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps({"model": model, "config": config, "prompt_sha256": digest}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            os.utime(self._path(key))
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._bytes -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, model: str, config: Dict, text: str) -> None:
+        body = json.dumps({"model": model, "config": config, "text": text}).encode("utf-8")
+        tmp = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._bytes += len(body) - self._entries.pop(key, 0)
+            self._entries[key] = len(body)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class PromptStats:
+    """Prompt-side counters: provider cached-token ratio and local prefix reuse."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.prompt_chars = 0
+        self.shared_prefix_chars = 0
+
+    def record(self, session: Optional[GameSession], name: str, prompt: str, usage=None) -> None:
+        shared = 0
+        if session is not None:
+            with session.lock:
+                previous = session.last_prompts.get(name)
+                session.last_prompts[name] = prompt
+            if previous:
+                shared = len(os.path.commonprefix([previous, prompt]))
+        with self._lock:
+            self.requests += 1
+            self.prompt_chars += len(prompt)
+            self.shared_prefix_chars += shared
+            if usage is not None:
+                self.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+                self.cached_tokens += getattr(usage, "cached_content_token_count", 0) or 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_token_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+                "prefix_reuse_ratio": self.shared_prefix_chars / self.prompt_chars if self.prompt_chars else 0.0,
+            }
+
+
+PHASE_ACTIONS = {"day": "speak", "day_vote": "vote", "night": "night"}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class UsageStats:
+    """Per-call token/latency records aggregated overall, per action type, per model and per game (seed).
+
+    Per-game totals are kept for the `max_games` most recently active seeds; older games stay in the
+    overall, per-action and per-model totals (and in the [USAGE] log lines) and are counted in `games_evicted`.
+    """
+
+    def __init__(self, max_games: int = DEFAULT_MAX_SESSIONS) -> None:
+        self._lock = threading.Lock()
+        self.max_games = max(1, max_games)
+        self.total = self._empty()
+        self.by_action: Dict[str, Dict] = {}
+        self.by_model: Dict[str, Dict] = {}
+        self.by_game: "OrderedDict[str, Dict]" = OrderedDict()
+        self.games_evicted = 0
+
+    @staticmethod
+    def _empty() -> Dict:
+        return {
+            "calls": 0,
+            "retries": 0,
+            "cached_calls": 0,
+            "estimated_calls": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "latency_s": 0.0,
+        }
+
+    def _game(self, seed: str) -> Dict:
+        totals = self.by_game.get(seed)
+        if totals is None:
+            totals = self.by_game[seed] = self._empty()
+            while len(self.by_game) > self.max_games:
+                self.by_game.popitem(last=False)
+                self.games_evicted += 1
+        self.by_game.move_to_end(seed)
+        return totals
+
+    def record(self, record: Dict) -> None:
+        with self._lock:
+            for totals in (
+                self.total,
+                self.by_action.setdefault(record["action"], self._empty()),
+                self.by_model.setdefault(record["model"], self._empty()),
+                self._game(str(record["seed"])),
+            ):
+                totals["calls"] += 1
+                totals["retries"] += int(record["retry"])
+                totals["cached_calls"] += int(record["source"] == "cache")
+                totals["estimated_calls"] += int(record["source"] == "estimate")
+                totals["input_tokens"] += record["input_tokens"]
+                totals["output_tokens"] += record["output_tokens"]
+                totals["latency_s"] += record["latency_s"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "total": dict(self.total),
+                "by_action": {k: dict(v) for k, v in self.by_action.items()},
+                "by_model": {k: dict(v) for k, v in self.by_model.items()},
+                "by_game": {k: dict(v) for k, v in self.by_game.items()},
+                "max_games": self.max_games,
+                "games_evicted": self.games_evicted,
+            }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.stats(), f, indent=2)
+
+
+def usage_record(obs: Dict, model: str, prompt: str, text: str, usage, latency: float, cached: bool, retry: bool) -> Dict:
+    """One call's usage: provider usage metadata when present, otherwise a local estimate (0 tokens on cache hits)."""
+    if cached:
+        source, input_tokens, output_tokens = "cache", 0, 0
+    elif usage is not None and getattr(usage, "prompt_token_count", None) is not None:
+        source = "provider"
+        input_tokens = usage.prompt_token_count or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    else:
+        source, input_tokens, output_tokens = "estimate", estimate_tokens(prompt), estimate_tokens(text)
+    phase = obs.get("phase", "")
+    return {
+        "seed": obs.get("seed", -1),
+        "round": obs.get("round"),
+        "name": obs.get("name", ""),
+        "action": PHASE_ACTIONS.get(phase, phase),
+        "model": model,
+        "source": source,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "latency_s": round(latency, 4),
+        "retry": retry,
+    }
+
+
+class CachedPrefix:
+    """One seat's explicit cached content: the text it holds, the provider object and a model bound to it."""
+
+    __slots__ = ("text", "cached", "handle")
+
+    def __init__(self, text: str, cached, handle) -> None:
+        self.text = text
+        self.cached = cached
+        self.handle = handle
+
+
+class ContextCacheManager:
+    """Explicit Gemini context caches holding each seat's stable prefix and game history.
+
+    A seat's cache is reused while its prompt still starts with the cached text
+    and the uncached tail stays below the provider minimum; once the history has
+    grown past that, a longer cache replaces it and the old one is deleted.
+    Prompts below the minimum are sent inline without trying to create a cache.
+    Caches belong to the game session: release() deletes them when the session
+    store evicts, expires or resets it.
+    """
+
+    def __init__(self, ttl_seconds: float, min_tokens: int = DEFAULT_CONTEXT_CACHE_MIN_TOKENS) -> None:
+        self.ttl_seconds = max(60.0, ttl_seconds)
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.skipped = 0
+        self.failed = 0
+        self.deleted = 0
+        self.last_error = ""
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _delete(self, entry: Optional[CachedPrefix]) -> None:
+        if entry is None:
+            return
+        try:
+            entry.cached.delete()
+            self._count("deleted")
+        except Exception as e:
+            print(f"[CTX] could not delete context cache: {str(e)[:200]}")
+
+    def model_for(self, session: GameSession, model: str, name: str, text: str) -> tuple[object, str]:
+        """Return (model bound to a cached prefix of text, text after that prefix), or (None, text)."""
+        with session.lock:
+            if name in session.context_caches and session.context_caches[name] is None:
+                return None, text
+            entry = session.context_caches.get(name)
+        if entry is not None and text.startswith(entry.text):
+            tail = text[len(entry.text) :]
+            if (not tail or tail.startswith("\n")) and estimate_tokens(tail) < self.min_tokens:
+                self._count("reused")
+                return entry.handle, tail.lstrip("\n")
+        if estimate_tokens(text) < self.min_tokens:
+            self._count("skipped")
+            return None, text
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=model if model.startswith("models/") else f"models/{model}",
+                contents=[text],
+                ttl=dt.timedelta(seconds=self.ttl_seconds),
+            )
+            fresh = CachedPrefix(text, cached, genai.GenerativeModel.from_cached_content(cached_content=cached))
+            self._count("created")
+        except Exception as e:
+            fresh = None
+            with self._lock:
+                self.failed += 1
+                self.last_error = str(e)[:200]
+            print(f"[CTX] context cache unavailable, sending prefix inline: {self.last_error}")
+        with session.lock:
+            session.context_caches[name] = fresh
+        self._delete(entry)
+        return (fresh.handle, "") if fresh is not None else (None, text)
+
+    def release(self, session: GameSession) -> None:
+        """Deletes the session's cached contents (the session is gone)."""
+        with session.lock:
+            entries = list(session.context_caches.values())
+            session.context_caches.clear()
+        for entry in entries:
+            self._delete(entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "skipped_below_min": self.skipped,
+                "failed": self.failed,
+                "deleted": self.deleted,
+                "min_tokens": self.min_tokens,
+                "last_error": self.last_error,
+            }
+
+
+def call_model(
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    obs: Dict,
+    *,
+    strict: bool = False,
+    cache: Optional[ResponseCache] = None,
+    repairs: Optional["RepairStats"] = None,
+    layout: str = "legacy",
+    session: Optional[GameSession] = None,
+    context_caches: Optional[ContextCacheManager] = None,
+    prompt_stats: Optional[PromptStats] = None,
+    usage_stats: Optional[UsageStats] = None,
+) -> tuple[Dict, str, str]:
+    started = time.perf_counter()
+    prompt = format_prompt(obs, strict=strict, layout=layout)
+    config = build_generation_config(temperature, max_tokens)
+    text = None
+    cache_key = None
+    if cache is not None and ResponseCache.cacheable(config):
+        cache_key = ResponseCache.key(model, config, prompt)
+        text = cache.get(cache_key)
+        print(f"[CACHE] {'hit' if text is not None else 'miss'} key={cache_key[:12]}")
+    usage = None
+    cached = text is not None
+    if text is None:
+        handle = None
+        if layout == "stable" and context_caches is not None and session is not None:
+            cacheable, delta = cache_split(obs, strict=strict)
+            handle, uncached = context_caches.model_for(session, model, obs.get("name", ""), cacheable)
+        if handle is not None:
+            rest = f"{uncached}\n{delta}" if uncached else delta
+            response = handle.generate_content(rest, generation_config=config)
+        else:
+            response = genai.GenerativeModel(model).generate_content(prompt, generation_config=config)
+        text = response.text or "{}"
+        usage = getattr(response, "usage_metadata", None)
+        if cache_key is not None:
+            cache.put(cache_key, model, config, text)
+    if prompt_stats is not None:
+        prompt_stats.record(session, obs.get("name", ""), prompt, usage)
+    # The strict requery is the proxy's only retry of a call.
+    record = usage_record(obs, model, prompt, text, usage, time.perf_counter() - started, cached, retry=strict)
+    print(f"[USAGE] {json.dumps(record)}")
+    if usage_stats is not None:
+        usage_stats.record(record)
     # Parse JSON action from text
-    text = response.text or "{}"
     try:
         action = json.loads(text)
-    except json.JSONDecodeError:
-        # fallback: try to extract JSON object
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            action = json.loads(text[start : end + 1])
-        else:
+        if not isinstance(action, dict):
+            raise ValueError("action must be an object")
+    except ValueError:
+        # fallback: tolerant extraction of the first JSON object
+        action = extract_json_object(text)
+        if repairs is not None:
+            repairs.record("json_extract", action is not None)
+        if action is None:
             action = {"type": "speak", "content": text.strip()[:200]}
     return action, text, prompt
 
 
+def _first_object_span(text: str) -> Optional[str]:
+    """Return the first balanced {...} span, skipping braces inside strings."""
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        quote = ""
+        escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if quote:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == quote:
+                    quote = ""
+            elif ch in ('"', "'"):
+                quote = ch
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start : i + 1]
+        start = text.find("{", start + 1)
+    return None
+
+
+def extract_json_object(text: str) -> Optional[Dict]:
+    """Tolerant JSON extraction: code fences, surrounding prose, single quotes, trailing commas."""
+    if not text:
+        return None
+    cleaned = re.sub(r"```(?:json|JSON)?", "", text)
+    span = _first_object_span(cleaned)
+    if span is None:
+        return None
+    candidates = [span]
+    fixed = re.sub(r",\s*([}\]])", r"\1", span)
+    candidates.append(fixed)
+    if '"' not in fixed:
+        candidates.append(fixed.replace("'", '"'))
+    candidates.append(re.sub(r"\b(None|True|False)\b", lambda m: {"None": "null", "True": "true", "False": "false"}[m.group(1)], fixed))
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def close_truncated_json(text: str) -> Optional[str]:
+    """Closes the open objects of output cut off by max_output_tokens, or None if nothing is left open.
+
+    Only output cut after a complete value (e.g. '{"type": "vote", "target": "Bob",') parses once closed;
+    a value cut off mid-string is not recovered.
+    """
+    cleaned = re.sub(r"```(?:json|JSON)?", "", text or "")
+    start = cleaned.find("{")
+    if start == -1 or _first_object_span(cleaned) is not None:
+        return None
+    tail = cleaned[start:].rstrip().rstrip(",")
+    return tail + "}" * max(1, tail.count("{") - tail.count("}"))
+
+
+def match_target(target: Optional[str], remaining: List[str]) -> Optional[str]:
+    """Fuzzy-match a model-provided name against remaining_players."""
+    if not target or not remaining:
+        return None
+    if target in remaining:
+        return target
+    norm = re.sub(r"\(.*?\)", "", str(target)).strip().strip(".,!?'\"").lower()
+    by_lower = {name.lower(): name for name in remaining}
+    if norm in by_lower:
+        return by_lower[norm]
+    contained = [name for name in remaining if re.search(rf"\b{re.escape(name.lower())}\b", norm)]
+    if len(contained) == 1:
+        return contained[0]
+    close = get_close_matches(norm, list(by_lower), n=1, cutoff=0.7)
+    return by_lower[close[0]] if close else None
+
+
+TYPE_ALIASES = {
+    "say": "speak",
+    "talk": "speak",
+    "speech": "speak",
+    "vote_out": "vote",
+    "exile": "vote",
+    "kill": "night_power",
+    "eliminate": "night_power",
+    "protect": "night_power",
+    "save": "night_power",
+    "investigate": "night_power",
+    "inspect": "night_power",
+    "night": "night_power",
+    "pass": "noop",
+    "skip": "noop",
+}
+CONTENT_KEYS = ("content", "say", "message", "text", "statement", "reason")
+TARGET_KEYS = ("target", "vote", "player", "name", "choice")
+
+
+class RepairStats:
+    """Attempt/success counters for each local repair path."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.paths: Dict[str, Dict[str, int]] = {}
+
+    def record(self, path: str, success: bool) -> None:
+        with self._lock:
+            counts = self.paths.setdefault(path, {"attempts": 0, "successes": 0})
+            counts["attempts"] += 1
+            if success:
+                counts["successes"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                path: dict(counts, success_rate=counts["successes"] / counts["attempts"] if counts["attempts"] else 0.0)
+                for path, counts in self.paths.items()
+            }
+
+
+def repair_action(obs: Dict, raw_text: str, action: Dict, repairs: Optional[RepairStats] = None) -> tuple[Optional[Dict], str]:
+    """Try to turn an invalid model action into a valid one without re-querying the model.
+
+    Returns (action, path) where path names the stage that produced a valid action,
+    or (None, "") if local repair failed. Targets are only ever taken from the
+    model's own output: an abstention or a missing target is left for the strict
+    re-query rather than filled in.
+    """
+    remaining = obs.get("remaining_players", [])
+
+    def finish(candidate: Dict) -> Dict:
+        candidate = normalize_target(candidate, remaining)
+        return force_phase_type(obs, candidate)
+
+    stages = []
+    extracted = extract_json_object(raw_text)
+    if extracted is None:
+        closed = close_truncated_json(raw_text)
+        extracted = extract_json_object(closed) if closed else None
+        if extracted is not None:
+            stages.append(("json_close", dict(extracted)))
+    elif extracted != action:
+        stages.append(("json_extract", dict(extracted)))
+
+    def phase_coerce(candidate: Dict) -> Dict:
+        candidate = dict(candidate)
+        raw_type = str(candidate.get("type") or candidate.get("action") or "").strip().lower()
+        candidate["type"] = TYPE_ALIASES.get(raw_type, raw_type)
+        if candidate["type"] == "noop" and obs.get("phase") != "night":
+            candidate["type"] = ""
+        if not candidate.get("content"):
+            for key in CONTENT_KEYS:
+                if isinstance(candidate.get(key), str) and candidate[key].strip():
+                    candidate["content"] = candidate[key].strip()
+                    break
+        if obs.get("phase") == "day" and not candidate.get("content") and extracted is None:
+            prose = re.sub(r"```.*?```", "", raw_text or "", flags=re.DOTALL).strip()
+            if prose and "{" not in prose:
+                candidate["content"] = prose[:200]
+        return candidate
+
+    def target_match(candidate: Dict) -> Dict:
+        candidate = dict(candidate)
+        for key in TARGET_KEYS:
+            matched = match_target(candidate.get(key), remaining)
+            if matched:
+                candidate["target"] = matched
+                break
+        return candidate
+
+    base = stages[0][1] if stages else dict(action)
+    stages.append(("phase_coerce", phase_coerce(base)))
+    stages.append(("target_match", target_match(stages[-1][1])))
+
+    for path, candidate in stages:
+        repaired = finish(candidate)
+        ok = not validate_action(obs, repaired)
+        if ok and repaired.get("type") in ("vote", "night_power"):
+            ok = match_target(repaired.get("target"), remaining) == repaired["target"]
+        if repairs is not None:
+            repairs.record(path, ok)
+        if ok:
+            return repaired, path
+    return None, ""
+
+
 def validate_action(obs: Dict, action: Dict) -> str:
     """Return empty string if valid, else error message."""
     phase = obs.get("phase")
@@ -270,6 +983,14 @@ class Handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(body)
             return
+        if self.path.rstrip("/") == "/stats":
+            body = json.dumps(self.server.stats()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
         self.send_response(404)
         self.end_headers()
 
@@ -288,19 +1009,22 @@ class Handler(BaseHTTPRequestHandler):
             seed = obs.get("seed", -1)
             round_num = obs.get("round")
             phase = obs.get("phase")
-            if phase == "night" and round_num == 0:
-                prev_round = self.server.last_round_by_seed.get(seed)
-                if prev_round is not None and prev_round > 0:
-                    self.server.last_speak = {k: v for k, v in self.server.last_speak.items() if k[0] != seed}
-                self.server.last_round_by_seed[seed] = 0
-            elif isinstance(round_num, int):
-                prev_round = self.server.last_round_by_seed.get(seed, -1)
-                self.server.last_round_by_seed[seed] = max(prev_round, round_num)
+            session = self.server.sessions.observe(seed, round_num, phase)
 
             print(f"[REQ] round={round_num} phase={phase} role={obs.get('role')} name={obs.get('name')}")
             print(f"[META] model={self.server.model} temp={self.server.temperature} max_tokens={self.server.max_tokens}")
             action, raw_text, prompt = call_model(
-                self.server.model, self.server.temperature, self.server.max_tokens, obs
+                self.server.model,
+                self.server.temperature,
+                self.server.max_tokens,
+                obs,
+                cache=self.server.cache,
+                repairs=self.server.repairs,
+                layout=self.server.prompt_layout,
+                session=session,
+                context_caches=self.server.context_caches,
+                prompt_stats=self.server.prompt_stats,
+                usage_stats=self.server.usage_stats,
             )
             if self.server.log_full_prompt:
                 print(f"[PROMPT] {prompt}")
@@ -312,12 +1036,28 @@ class Handler(BaseHTTPRequestHandler):
             action = ensure_target(obs, action)
             err = validate_action(obs, action)
             if err:
-                # one-shot repair with strict template
                 print(f"[WARN] validate failed '{err}', attempting repair")
                 print(f"[WARN] raw_model='{raw_text[:300]}'")
                 print(f"[WARN] parsed_action={action}")
+                repaired, path = repair_action(obs, raw_text, action, self.server.repairs)
+                if repaired is not None:
+                    print(f"[REPAIR] local path={path} action={repaired}")
+                    action, err = repaired, ""
+            if err:
+                # one-shot repair with strict template
                 action, raw_text, prompt = call_model(
-                    self.server.model, self.server.temperature, self.server.max_tokens, obs, strict=True
+                    self.server.model,
+                    self.server.temperature,
+                    self.server.max_tokens,
+                    obs,
+                    strict=True,
+                    cache=self.server.cache,
+                    repairs=self.server.repairs,
+                    layout=self.server.prompt_layout,
+                    session=session,
+                    context_caches=self.server.context_caches,
+                    prompt_stats=self.server.prompt_stats,
+                    usage_stats=self.server.usage_stats,
                 )
                 if self.server.log_full_prompt:
                     print(f"[PROMPT] {prompt}")
@@ -328,6 +1068,8 @@ class Handler(BaseHTTPRequestHandler):
                 action = force_phase_type(obs, action)
                 action = ensure_target(obs, action)
                 err = validate_action(obs, action)
+                # Counted like the local paths: one attempt, a success only if the re-queried action validates.
+                self.server.repairs.record("requery", not err)
             if err:
                 # last-chance target coercion before fallback
                 action = coerce_invalid_target(obs, action)
@@ -352,31 +1094,27 @@ class Handler(BaseHTTPRequestHandler):
             print(f"[RES] action={action}")
             # simple per-speaker de-dup for day speak; if dup, lightly adjust content
             if obs.get("phase") == "day" and action.get("type") == "speak":
-                key = (obs.get("seed", -1), obs.get("name"), obs.get("round"))
-                last = self.server.last_speak.get(key)
-                content = (action.get("content") or "")
-                seed = obs.get("seed", -1)
-                recent = self.server.recent_reasons.setdefault(seed, [])
-                content = reduce_quiet_repeat(content, recent)
-                if any(k in content.lower() for k in ("quiet", "silence", "not said much", "hasn't said much", "hasnt said much", "not talking much")):
-                    recent.append("quiet")
-                    self.server.recent_reasons[seed] = recent[-5:]
-                if last and last.strip().lower() == content.strip().lower():
-                    print("[WARN] duplicate speak content for same speaker/round; adjusting")
-                    # light paraphrase to avoid exact dup
-                    content = content + " Adding: want to hear from others before deciding."
-                    action["content"] = content
-                # mark low-signal quiet-only lines
-                if content.strip().lower() in ("quiet", "he is quiet", "she is quiet", "they are quiet"):
-                    action["content"] = "[low-signal] " + content
-                self.server.last_speak[key] = content
+                key = (obs.get("name"), obs.get("round"))
+                with session.lock:
+                    last = session.last_speak.get(key)
+                    content = (action.get("content") or "")
+                    content = reduce_quiet_repeat(content, session.recent_reasons)
+                    if any(k in content.lower() for k in QUIET_MARKERS):
+                        session.recent_reasons.append("quiet")
+                    if last and last.strip().lower() == content.strip().lower():
+                        print("[WARN] duplicate speak content for same speaker/round; adjusting")
+                        # light paraphrase to avoid exact dup
+                        content = content + " Adding: want to hear from others before deciding."
+                        action["content"] = content
+                    # mark low-signal quiet-only lines
+                    if content.strip().lower() in ("quiet", "he is quiet", "she is quiet", "they are quiet"):
+                        action["content"] = "[low-signal] " + content
+                    session.last_speak[key] = content
             if action.get("type") == "vote" and action.get("content"):
-                seed = obs.get("seed", -1)
-                recent = self.server.recent_reasons.setdefault(seed, [])
-                content = reduce_quiet_repeat(action.get("content") or "", recent)
-                if any(k in content.lower() for k in ("quiet", "silence", "not said much", "hasn't said much", "hasnt said much", "not talking much")):
-                    recent.append("quiet")
-                    self.server.recent_reasons[seed] = recent[-5:]
+                with session.lock:
+                    content = reduce_quiet_repeat(action.get("content") or "", session.recent_reasons)
+                    if any(k in content.lower() for k in QUIET_MARKERS):
+                        session.recent_reasons.append("quiet")
                 action["content"] = content
         except Exception as e:
             print(f"[ERR] {e}")
@@ -407,29 +1145,86 @@ def main():
     parser.add_argument("--max-output-tokens", type=int, default=DEFAULT_MAX_OUTPUT_TOKENS)
     parser.add_argument("--log-dir", default="", help="Optional directory to write a timestamped log file")
     parser.add_argument("--card-url", default="", help="Ignored (compat with AgentBeats compose)")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("RESPONSE_CACHE_DIR", ""),
+        help="Optional directory for the deterministic prompt->response cache",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.environ.get("RESPONSE_CACHE_MAX_MB", "256")),
+        help="Size cap for the response cache before LRU eviction",
+    )
+    parser.add_argument(
+        "--api-endpoint",
+        default=os.environ.get("GEMINI_API_ENDPOINT", ""),
+        help="Optional Gemini REST endpoint override (e.g. scripts/mock_model_server.py at http://localhost:8900)",
+    )
+    parser.add_argument(
+        "--prompt-layout",
+        choices=["legacy", "stable"],
+        default=DEFAULT_PROMPT_LAYOUT,
+        help="Prompt ordering; 'stable' puts schema/role first and the per-turn delta last for prefix caching",
+    )
+    parser.add_argument(
+        "--context-cache",
+        action="store_true",
+        help="With --prompt-layout stable, cache each seat's prefix and game history as explicit Gemini cached content",
+    )
+    parser.add_argument(
+        "--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="Max per-game sessions kept (LRU eviction)"
+    )
+    parser.add_argument(
+        "--session-ttl", type=float, default=DEFAULT_SESSION_TTL, help="Idle seconds before a game session expires (0 disables)"
+    )
     args = parser.parse_args()
 
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         raise SystemExit("GEMINI_API_KEY is required")
-    genai.configure(api_key=api_key)
+    if args.api_endpoint:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": args.api_endpoint})
+    else:
+        genai.configure(api_key=api_key)
 
+    usage_path = ""
     if args.log_dir:
         os.makedirs(args.log_dir, exist_ok=True)
         ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
         log_path = os.path.join(args.log_dir, f"gemini_proxy_{ts}.log")
+        usage_path = os.path.join(args.log_dir, f"gemini_proxy_{ts}_usage.json")
         log_file = open(log_path, "a", encoding="utf-8", buffering=1)
         sys.stdout = log_file
         sys.stderr = log_file
         print(f"[LOG] writing to {log_path}")
 
-    server = HTTPServer((args.host, args.port), Handler)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
     server.model = args.model
     server.temperature = args.temperature
     server.max_tokens = args.max_output_tokens
-    server.last_speak = {}  # {(name, round): content}
-    server.last_round_by_seed = {}  # {seed: last_round}
-    server.recent_reasons = {}  # {seed: [reason_keys]}
+    server.context_caches = ContextCacheManager(args.session_ttl) if args.context_cache else None
+    server.sessions = SessionStore(
+        max_sessions=args.max_sessions,
+        ttl_seconds=args.session_ttl,
+        on_close=server.context_caches.release if server.context_caches else None,
+    )
+    server.cache = (
+        ResponseCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024)) if args.cache_dir else None
+    )
+    server.repairs = RepairStats()
+    server.prompt_layout = args.prompt_layout
+    server.prompt_stats = PromptStats()
+    server.usage_stats = UsageStats(max_games=args.max_sessions)
+    server.stats = lambda: {
+        "sessions": server.sessions.stats(),
+        "cache": server.cache.stats() if server.cache else None,
+        "repairs": server.repairs.stats(),
+        "prompt": server.prompt_stats.stats(),
+        "context_cache": server.context_caches.stats() if server.context_caches else None,
+        "usage": server.usage_stats.stats(),
+    }
     server.log_full_prompt = os.environ.get("LOG_FULL_PROMPT") == "1"
     server.safe_fallback = safe_fallback_action
     server.agent_card = build_agent_card
@@ -437,9 +1232,18 @@ def main():
     print(
         f"Gemini proxy listening on {args.host}:{args.port} model={args.model} "
         f"temp={args.temperature} max_tokens={args.max_output_tokens} genai={genai_version} "
-        f"key_present={'yes' if api_key else 'no'}"
+        f"key_present={'yes' if api_key else 'no'} cache_dir={args.cache_dir or 'off'} "
+        f"prompt_layout={args.prompt_layout} context_cache={'on' if args.context_cache else 'off'} "
+        f"endpoint={args.api_endpoint or 'default'}"
     )
-    server.serve_forever()
+    # Container stops send SIGTERM; exit through the finally block so the usage summary is written.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        if usage_path:
+            server.usage_stats.write(usage_path)
+            print(f"[LOG] wrote usage summary to {usage_path}")
 
 
 def safe_fallback_action(obs: Dict) -> Dict:
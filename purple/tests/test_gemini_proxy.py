@@ -0,0 +1,173 @@
+import importlib.util
+from pathlib import Path
+
+_PROXY_PATH = Path(__file__).resolve().parents[1] / "proxies" / "a2a_gemini_proxy.py"
+_spec = importlib.util.spec_from_file_location("a2a_gemini_proxy", _PROXY_PATH)
+proxy = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(proxy)
+
+
+def test_session_store_resets_on_new_game():
+    store = proxy.SessionStore(max_sessions=4, ttl_seconds=0)
+    session = store.observe(7, 0, "night")
+    session.last_speak[("A", 0)] = "hi"
+    store.observe(7, 2, "day")
+    fresh = store.observe(7, 0, "night")
+    assert fresh is not session
+    assert fresh.last_speak == {}
+    assert store.stats()["resets"] == 1
+
+
+def test_session_store_evicts_least_recently_used():
+    store = proxy.SessionStore(max_sessions=2, ttl_seconds=0)
+    store.observe(1, 0, "night")
+    store.observe(2, 0, "night")
+    store.observe(1, 0, "day")
+    store.observe(3, 0, "night")
+    stats = store.stats()
+    assert stats["active"] == 2
+    assert stats["evicted"] == 1
+    assert 2 not in store._sessions
+
+
+def test_response_cache_roundtrip_and_eviction(tmp_path):
+    cache = proxy.ResponseCache(str(tmp_path), max_bytes=400)
+    config = proxy.build_generation_config(0.0, 64)
+    key = proxy.ResponseCache.key("m", config, "prompt-1")
+    assert cache.get(key) is None
+    cache.put(key, "m", config, '{"type": "noop"}')
+    assert cache.get(key) == '{"type": "noop"}'
+    for i in range(5):
+        other = proxy.ResponseCache.key("m", config, f"prompt-{i + 2}")
+        cache.put(other, "m", config, "x" * 100)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["evictions"] > 0
+    assert stats["bytes"] <= 400
+    assert proxy.ResponseCache(str(tmp_path), max_bytes=400).stats()["entries"] == stats["entries"]
+
+
+def test_local_repair_fixes_target_and_phase_type():
+    obs = {"phase": "day_vote", "name": "Alice", "role": "Villager", "remaining_players": ["Alice", "Bob", "Carol"]}
+    raw = 'I will vote now: {"action": "exile", "target": "bob.", "content": "too quiet",}'
+    stats = proxy.RepairStats()
+    action, path = proxy.repair_action(obs, raw, {"type": "speak", "content": raw}, stats)
+    assert action == {"action": "exile", "type": "vote", "target": "Bob", "content": "too quiet"}
+    assert path == "target_match"
+    assert stats.stats()["json_extract"] == {"attempts": 1, "successes": 0, "success_rate": 0.0}
+    assert stats.stats()["target_match"]["successes"] == 1
+
+
+def test_local_repair_gives_up_without_usable_target():
+    obs = {"phase": "night", "name": "Alice", "role": "Seer", "remaining_players": ["Alice", "Bob"]}
+    action, path = proxy.repair_action(obs, '{"type": "night_power", "target": "Zed"}', {"type": "night_power", "target": "Zed"})
+    assert action is None and path == ""
+
+
+def test_truncated_objects_are_closed_by_local_repair():
+    assert proxy.extract_json_object('Sure: {"type": "vote", "target": "Bob",') is None
+    assert proxy.close_truncated_json('{"type": "night_power", "args": {"target": "Bob"') == (
+        '{"type": "night_power", "args": {"target": "Bob"}}'
+    )
+    assert proxy.close_truncated_json('{"type": "vote", "target": "Bob"}') is None
+    obs = {"phase": "day_vote", "name": "Alice", "role": "Villager", "remaining_players": ["Alice", "Bob"]}
+    raw = 'Sure: {"type": "vote", "target": "Bob",'
+    fallback = {"type": "speak", "content": raw}
+    assert proxy.repair_action(obs, raw, fallback) == ({"type": "vote", "target": "Bob"}, "json_close")
+    cut = '{"type": "vote", "target": "Bo'
+    assert proxy.repair_action(obs, cut, {"type": "speak", "content": cut}) == (None, "")
+
+
+def test_local_repair_never_invents_a_target():
+    obs = {"phase": "day_vote", "name": "A", "role": "Villager", "remaining_players": ["A", "Bob", "Carl"]}
+    stats = proxy.RepairStats()
+    assert proxy.repair_action(obs, '{"type":"noop"}', {"type": "noop"}, stats) == (None, "")
+    raw = '{"type": "vote", "content": "not sure yet"}'
+    assert proxy.repair_action(obs, raw, {"type": "vote", "content": "not sure yet"}, stats) == (None, "")
+    assert all(counts["successes"] == 0 for counts in stats.stats().values())
+
+
+def test_stable_layout_keeps_seat_prefix_fixed():
+    base = {"role": "Seer", "name": "Alice", "remaining_players": ["Alice", "Bob"], "graveyard": [], "private": {}}
+    night = dict(base, round=0, phase="night", public_debate=[])
+    day = dict(base, round=1, phase="day", public_debate=["Bob: hi"])
+    prefix_night, _ = proxy.split_prompt(night)
+    prefix_day, rest_day = proxy.split_prompt(day)
+    assert prefix_night == prefix_day
+    assert proxy.format_prompt(day, layout="stable") == f"{prefix_day}\n{rest_day}"
+    assert rest_day.index("- Bob: hi") < rest_day.index("Round: 1")
+    assert proxy.format_prompt(day).startswith("You are Alice playing role Seer.\nRound: 1 Phase: day.")
+
+
+def test_context_cache_holds_history_and_is_deleted_with_the_session(monkeypatch):
+    created, deleted = [], []
+
+    class FakeCached:
+        def __init__(self, text):
+            self.text = text
+
+        def delete(self):
+            deleted.append(self.text)
+
+    def create(model, contents, ttl):
+        created.append(contents[0])
+        return FakeCached(contents[0])
+
+    monkeypatch.setattr(proxy.genai.caching.CachedContent, "create", staticmethod(create))
+    monkeypatch.setattr(proxy.genai.GenerativeModel, "from_cached_content", staticmethod(lambda cached_content: cached_content))
+    obs = {"role": "Seer", "name": "Alice", "round": 0, "phase": "day", "remaining_players": ["Alice", "Bob"]}
+    short, _ = proxy.cache_split(dict(obs, public_debate=[]))
+    manager = proxy.ContextCacheManager(600, min_tokens=proxy.estimate_tokens(short) + 50)
+    store = proxy.SessionStore(max_sessions=1, ttl_seconds=0, on_close=manager.release)
+    session = store.observe(1, 0, "day")
+    assert manager.model_for(session, "m", "Alice", short) == (None, short)
+    long_debate = [f"Bob: line {i} " + "x" * 40 for i in range(8)]
+    text, delta = proxy.cache_split(dict(obs, public_debate=long_debate))
+    assert "- Bob: line 7" in text and "- Bob" not in delta
+    handle, rest = manager.model_for(session, "m", "Alice", text)
+    assert handle.text == text and rest == ""
+    grown, _ = proxy.cache_split(dict(obs, public_debate=long_debate + ["Carl: hi"]))
+    handle, rest = manager.model_for(session, "m", "Alice", grown)
+    assert handle.text == text and rest == "- Carl: hi"
+    assert len(created) == 1 and manager.stats()["skipped_below_min"] == 1
+
+    store.observe(2, 0, "night")
+    assert deleted == [text]
+    assert session.context_caches == {}
+
+
+def test_usage_stats_aggregate_provider_estimate_and_cache():
+    class Meta:
+        prompt_token_count = 120
+        candidates_token_count = 30
+
+    day = {"seed": 3, "round": 1, "phase": "day", "name": "Alice"}
+    vote = dict(day, phase="day_vote")
+    stats = proxy.UsageStats()
+    stats.record(proxy.usage_record(day, "m", "p" * 40, "{}", Meta(), 0.5, cached=False, retry=False))
+    stats.record(proxy.usage_record(vote, "m", "p" * 40, "x" * 8, None, 0.25, cached=False, retry=True))
+    stats.record(proxy.usage_record(vote, "m", "p" * 40, "{}", None, 0.0, cached=True, retry=False))
+    summary = stats.stats()
+    assert summary["by_action"]["speak"]["input_tokens"] == 120
+    assert summary["by_action"]["vote"] == {
+        "calls": 2,
+        "retries": 1,
+        "cached_calls": 1,
+        "estimated_calls": 1,
+        "input_tokens": 10,
+        "output_tokens": 2,
+        "latency_s": 0.25,
+    }
+    assert summary["total"]["calls"] == summary["by_game"]["3"]["calls"] == 3
+
+
+def test_usage_stats_keep_only_recent_games():
+    stats = proxy.UsageStats(max_games=2)
+    for seed in (1, 2, 1, 3):
+        obs = {"seed": seed, "round": 0, "phase": "day", "name": "Alice"}
+        stats.record(proxy.usage_record(obs, "m", "p" * 40, "{}", None, 0.1, cached=False, retry=False))
+    summary = stats.stats()
+    assert list(summary["by_game"]) == ["1", "3"]
+    assert summary["by_game"]["1"]["calls"] == 2
+    assert summary["games_evicted"] == 1
+    assert summary["total"]["calls"] == 4
@@ -0,0 +1,116 @@
+"""Memory footprint of benchmark games, NPC agents and observation/action objects.
+
+Usage:
+  python -m scripts.benchmark_memory --games 50 --players 8
+  python -m scripts.benchmark_memory --games 20 --players 32 --npc-table --output mem.json
+
+Uses tracemalloc to report the peak memory traced while each seeded game runs, the
+bytes a finished game keeps alive (agents with their belief state, plus the log), the
+agents of a fresh game, and one Observation/Action.
+"""
+
+import argparse
+import json
+import statistics
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmark import game
+from core.schema import build_observation
+from core.types import Action
+
+PLAYERS = ["Derek", "Scott", "Jacob", "Isaac", "Hayley", "David", "Tyler", "Ginger"]
+
+
+def player_names(count: int) -> List[str]:
+    return PLAYERS[:count] if count <= len(PLAYERS) else [f"P{i}" for i in range(count)]
+
+
+def retained_bytes(build: Callable[[], object], copies: int = 200) -> float:
+    """Average bytes still allocated per object after building `copies` of them."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(copies)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / copies
+
+
+def game_peak_bytes(config: Dict) -> int:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    game.run_game(config)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - base
+
+
+def played_game(config: Dict) -> game.Game:
+    g = game.Game(
+        seed=config["seed"],
+        player_names=config["player_names"],
+        max_debate_turns=config["max_debate_turns"],
+        npc_table=config["npc_table"],
+    )
+    g.run()
+    return g
+
+
+def main() -> Dict:
+    parser = argparse.ArgumentParser(description="Memory footprint of benchmark games")
+    parser.add_argument("--games", type=int, default=20, help="Seeded games to measure")
+    parser.add_argument("--seed", type=int, default=0, help="First game seed")
+    parser.add_argument("--players", type=int, default=8, help="Seats per game")
+    parser.add_argument("--max-turns", type=int, default=8, help="Max debate turns per round")
+    parser.add_argument("--npc-table", action="store_true", help="Run NPC seats through the NpcTable")
+    parser.add_argument("--output", type=str, default="", help="Optional path to write the report JSON")
+    args = parser.parse_args()
+
+    names = player_names(args.players)
+    debate = [f"{n}:I'm not convinced yet; what made you suspicious?" for n in names]
+
+    def agents() -> object:
+        return game.Game(seed=args.seed, player_names=names, npc_table=args.npc_table).agents
+
+    def observation() -> object:
+        return build_observation(
+            round_num=1,
+            phase="day_vote",
+            role="Villager",
+            name=names[0],
+            seed=args.seed,
+            remaining_players=names,
+            graveyard=[],
+            public_debate=debate,
+            private={},
+        )
+
+    configs = [
+        {"seed": args.seed + i, "player_names": names, "max_debate_turns": args.max_turns, "npc_table": args.npc_table}
+        for i in range(args.games)
+    ]
+    # Warm-up: the first game also pays for imports and regex compilation.
+    game.run_game(dict(configs[0]))
+    peaks = [game_peak_bytes(config) for config in configs]
+    retained = [retained_bytes(lambda: played_game(config), copies=5) for config in configs]
+    report = {
+        "games": args.games,
+        "players": args.players,
+        "npc_table": args.npc_table,
+        "game_peak_kib_median": statistics.median(peaks) / 1024,
+        "game_peak_kib_max": max(peaks) / 1024,
+        "played_game_kib_median": statistics.median(retained) / 1024,
+        "npc_agents_bytes_per_game": retained_bytes(agents, copies=20),
+        "observation_bytes": retained_bytes(observation),
+        "action_bytes": retained_bytes(lambda: Action(type="vote", target=names[1])),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
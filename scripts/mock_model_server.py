@@ -0,0 +1,341 @@
+"""Offline stand-in for the generative model endpoints used by the purple side.
+
+Usage:
+  python scripts/mock_model_server.py --port 8900 --latency-dist lognormal --latency-ms 400 \
+      --error-rate 0.02 --malformed-rate 0.05 --seed 7
+
+  # Gemini proxy against the mock (any API key works):
+  GEMINI_API_KEY=mock python purple/proxies/a2a_gemini_proxy.py --port 8080 --api-endpoint http://localhost:8900
+  # werewolf_arena (OpenAI path) against the mock:
+  OPENAI_API_KEY=mock OPENAI_BASE_URL=http://localhost:8900/v1 python main.py --run --v_models=mock --w_models=mock
+
+Notes:
+- Serves Gemini REST `POST /v1beta/models/{model}:generateContent` and OpenAI `POST /v1/chat/completions`.
+- Answers are schema-valid actions derived from the prompt: proxy prompts (speak/vote/night_power with
+  targets from "Allowed targets") and werewolf_arena prompts (bid/debate/vote/remove/investigate/protect/summarize).
+- Malformed answers are one of MALFORMED_KINDS, so the proxy's local repair, strict re-query and fallback
+  paths (and werewolf_arena's retries) all get exercised.
+- Outcomes are seeded per (seed, prompt digest, repeat count), so reruns are reproducible regardless of
+  request interleaving, and a retried prompt can succeed after an injected failure.
+- `GET /stats` returns request/outcome counters.
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_DISTS = ("fixed", "uniform", "normal", "lognormal")
+# truncated: cut after a complete value (locally repairable); cut_string: cut inside a string value;
+# prose: no JSON at all; wrong_schema: the action nested under an unexpected key; bad_target: a name
+# (or bid) outside the allowed options.
+MALFORMED_KINDS = ("truncated", "cut_string", "prose", "wrong_schema", "bad_target")
+PROSE_LINES = [
+    "Let me think about who has been the most consistent before I commit.",
+    "Honestly I am torn here, there are arguments both ways.",
+]
+
+SPEAK_LINES = [
+    "I want to hear from the quieter players before I decide.",
+    "Something about the last accusation does not add up for me.",
+    "Let's compare who pushed which vote yesterday.",
+    "I'm not convinced yet; what made you suspicious?",
+]
+
+
+class MockConfig:
+    def __init__(
+        self,
+        seed: int = 0,
+        latency_dist: str = "fixed",
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        malformed_kinds: Sequence[str] = MALFORMED_KINDS,
+    ) -> None:
+        if latency_dist not in LATENCY_DISTS:
+            raise ValueError(f"Unknown latency distribution: {latency_dist}")
+        unknown = [kind for kind in malformed_kinds if kind not in MALFORMED_KINDS]
+        if unknown or not malformed_kinds:
+            raise ValueError(f"Unknown malformed kinds: {unknown or malformed_kinds}")
+        self.seed = seed
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.malformed_rate = malformed_rate
+        self.malformed_kinds = tuple(malformed_kinds)
+
+
+def sample_latency(cfg: MockConfig, rng: random.Random) -> float:
+    """Return a simulated latency in seconds."""
+    mean = max(0.0, cfg.latency_ms)
+    jitter = max(0.0, cfg.latency_jitter_ms)
+    if cfg.latency_dist == "uniform":
+        ms = rng.uniform(max(0.0, mean - jitter), mean + jitter)
+    elif cfg.latency_dist == "normal":
+        ms = rng.gauss(mean, jitter)
+    elif cfg.latency_dist == "lognormal":
+        # jitter is the spread in log space, relative to the mean (default 0.5).
+        sigma = jitter / mean if mean and jitter else 0.5
+        ms = rng.lognormvariate(0.0, sigma) * mean if mean else 0.0
+    else:
+        ms = mean
+    return max(0.0, ms) / 1000.0
+
+
+def _parse_name_list(text: str) -> List[str]:
+    text = text.strip()
+    if text.startswith("["):
+        try:
+            value = ast.literal_eval(text)
+            return [str(v) for v in value]
+        except (ValueError, SyntaxError):
+            return []
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
+def build_action(prompt: str, rng: random.Random) -> Dict:
+    """Return a schema-valid action for a proxy or werewolf_arena prompt."""
+    # werewolf_arena prompts end with a JSON template naming the result key.
+    options_match = re.search(r"Choose from: (.+)", prompt)
+    options = _parse_name_list(options_match.group(1)) if options_match else []
+    for key in ("vote", "remove", "investigate", "protect"):
+        if re.search(rf'"{key}": "string"', prompt):
+            return {"reasoning": "Mock reasoning.", key: rng.choice(options) if options else ""}
+    if re.search(r'"bid": "string"', prompt):
+        return {"reasoning": "Mock reasoning.", "bid": str(rng.randint(0, 4))}
+    if re.search(r'"say": "string"', prompt):
+        return {"reasoning": "Mock reasoning.", "say": rng.choice(SPEAK_LINES)}
+    if re.search(r'"summary": "string"', prompt):
+        return {"reasoning": "Mock reasoning.", "summary": "I noted who accused whom this round."}
+
+    # Gemini proxy prompts.
+    phase_match = re.search(r"Phase: (\w+)", prompt)
+    phase = phase_match.group(1) if phase_match else "day"
+    targets_match = re.search(r"Allowed targets \(use exact spelling\): (.+)", prompt)
+    targets = _parse_name_list(targets_match.group(1)) if targets_match else []
+    name_match = re.search(r"You are (.+?) playing role", prompt)
+    me = name_match.group(1) if name_match else ""
+    pool = [t for t in targets if t != me] or targets
+    target = rng.choice(pool) if pool else ""
+    if phase == "day_vote":
+        return {"type": "vote", "target": target, "content": f"Voting {target} because their story shifted."}
+    if phase == "night":
+        return {"type": "night_power", "target": target}
+    return {"type": "speak", "content": rng.choice(SPEAK_LINES)}
+
+
+def malform(action: Dict, kind: str, rng: random.Random) -> str:
+    """Return a broken rendering of `action` of the given MALFORMED_KINDS kind."""
+    text = json.dumps(action)
+    if kind == "truncated":
+        return f"Sure, here is my answer:\n{text[:-1]},"
+    if kind == "cut_string":
+        value = next(v for v in reversed(list(action.values())) if isinstance(v, str) and v)
+        start = text.rfind(json.dumps(value)) + 1
+        return text[: start + len(value) // 2]
+    if kind == "prose":
+        return rng.choice(PROSE_LINES)
+    if kind == "bad_target":
+        for key in ("target", "vote", "remove", "investigate", "protect", "bid"):
+            if key in action:
+                return json.dumps(dict(action, **{key: "9" if key == "bid" else "Moderator"}))
+    # wrong_schema, and bad_target for actions without a target (speech, summaries).
+    return json.dumps({"answer": action})
+
+
+class MockModel:
+    """Deterministic response generator with injected latency and failures."""
+
+    def __init__(self, cfg: MockConfig) -> None:
+        self.cfg = cfg
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self.counts = {"requests": 0, "ok": 0, "error": 0, "throttled": 0, "malformed": 0}
+        self.malformed = {kind: 0 for kind in cfg.malformed_kinds}
+
+    def respond(self, prompt: str) -> Tuple[int, str, float]:
+        """Return (http_status, text, latency_seconds) for a prompt."""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            nth = self._seen.get(digest, 0)
+            self._seen[digest] = nth + 1
+            self.counts["requests"] += 1
+        rng = random.Random(f"{self.cfg.seed}:{digest}:{nth}")
+        latency = sample_latency(self.cfg, rng)
+        roll = rng.random()
+        if roll < self.cfg.throttle_rate:
+            outcome, status, text = "throttled", 429, "Resource has been exhausted (mock)."
+        elif roll < self.cfg.throttle_rate + self.cfg.error_rate:
+            outcome, status, text = "error", 500, "Internal error (mock)."
+        else:
+            # Choices depend only on the prompt, like greedy decoding.
+            action = build_action(prompt, random.Random(f"{self.cfg.seed}:{digest}"))
+            text = json.dumps(action)
+            status = 200
+            outcome = "ok"
+            kind = ""
+            if rng.random() < self.cfg.malformed_rate:
+                outcome = "malformed"
+                kind = rng.choice(self.cfg.malformed_kinds)
+                text = malform(action, kind, rng)
+        with self._lock:
+            self.counts[outcome] += 1
+            if kind:
+                self.malformed[kind] += 1
+        return status, text, latency
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counts, malformed_kinds=dict(self.malformed), unique_prompts=len(self._seen))
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _gemini_prompt(body: Dict) -> str:
+    texts = []
+    for content in body.get("contents") or []:
+        for part in content.get("parts") or []:
+            if isinstance(part, dict) and part.get("text"):
+                texts.append(part["text"])
+    return "\n".join(texts)
+
+
+def _openai_prompt(body: Dict) -> str:
+    return "\n".join(str(m.get("content") or "") for m in body.get("messages") or [])
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.mock.stats())
+            return
+        self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"code": 400, "message": "invalid json"}})
+            return
+        path = self.path.split("?", 1)[0]
+        if ":generateContent" in path:
+            model = path.rsplit("/", 1)[-1].split(":", 1)[0]
+            prompt = _gemini_prompt(body)
+        elif path.endswith("/chat/completions"):
+            model = body.get("model", "")
+            prompt = _openai_prompt(body)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"unsupported path {path}"}})
+            return
+
+        status, text, latency = self.server.mock.respond(prompt)
+        time.sleep(latency)
+        if status != 200:
+            reason = "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL"
+            self._send_json(status, {"error": {"code": status, "message": text, "status": reason}})
+            return
+        prompt_tokens = _estimate_tokens(prompt)
+        output_tokens = _estimate_tokens(text)
+        if ":generateContent" in path:
+            payload = {
+                "candidates": [
+                    {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": output_tokens,
+                    "totalTokenCount": prompt_tokens + output_tokens,
+                },
+                "modelVersion": model,
+            }
+        else:
+            payload = {
+                "id": f"mock-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": output_tokens,
+                    "total_tokens": prompt_tokens + output_tokens,
+                },
+            }
+        self._send_json(200, payload)
+
+    def log_message(self, format, *args):
+        return
+
+
+def make_server(host: str, port: int, cfg: MockConfig) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.mock = MockModel(cfg)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock model server (Gemini/OpenAI compatible)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=0, help="Seed for choices, latency and injected failures")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean (or fixed) latency in milliseconds")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0, help="Half-width / std-dev of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of answers with broken JSON")
+    parser.add_argument(
+        "--malformed-kinds",
+        default=",".join(MALFORMED_KINDS),
+        help=f"Comma-separated kinds of malformed answers to draw from ({', '.join(MALFORMED_KINDS)})",
+    )
+    args = parser.parse_args()
+
+    cfg = MockConfig(
+        seed=args.seed,
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        malformed_rate=args.malformed_rate,
+        malformed_kinds=[kind.strip() for kind in args.malformed_kinds.split(",") if kind.strip()],
+    )
+    server = make_server(args.host, args.port, cfg)
+    print(
+        f"Mock model server listening on {args.host}:{args.port} latency={args.latency_dist}:{args.latency_ms}ms "
+        f"error_rate={args.error_rate} throttle_rate={args.throttle_rate} malformed_rate={args.malformed_rate}"
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
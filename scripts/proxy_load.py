@@ -0,0 +1,111 @@
+"""Concurrent load generator for an A2A player endpoint (e.g. the Gemini proxy).
+
+Usage:
+  python -m scripts.proxy_load --endpoint http://localhost:8080 --requests 400 --concurrency 16 --seed 3
+
+Observations are drawn from a seeded schedule of day/day_vote/night phases, so two runs against
+the same endpoint send identical traffic. Prints throughput, latency percentiles and status counts.
+"""
+
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+from core.schema import build_observation
+
+PLAYERS = ["Derek", "Scott", "Jacob", "Isaac", "Hayley", "David", "Tyler", "Ginger"]
+ROLES = ["Werewolf", "Seer", "Doctor", "Villager"]
+PHASES = ["day", "day_vote", "night"]
+
+
+def make_observations(count: int, seed: int, games: int) -> List[Dict]:
+    rng = random.Random(seed)
+    observations = []
+    for i in range(count):
+        alive = sorted(rng.sample(PLAYERS, k=rng.randint(3, len(PLAYERS))))
+        name = rng.choice(alive)
+        debate = [f"{p}:I have a question for {rng.choice(alive)}." for p in rng.sample(alive, k=rng.randint(0, len(alive)))]
+        obs = build_observation(
+            round_num=rng.randint(0, 4),
+            phase=rng.choice(PHASES),
+            role=rng.choice(ROLES),
+            name=name,
+            seed=seed * 1000 + i % max(1, games),
+            remaining_players=alive,
+            graveyard=[p for p in PLAYERS if p not in alive],
+            public_debate=debate,
+        )
+        observations.append(obs.to_dict())
+    return observations
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test an A2A player endpoint")
+    parser.add_argument("--endpoint", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--games", type=int, default=8, help="Distinct game seeds to spread requests over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=str, default="", help="Optional path to write the report JSON")
+    args = parser.parse_args()
+
+    observations = make_observations(args.requests, args.seed, args.games)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def send(obs: Dict):
+        start = time.perf_counter()
+        try:
+            resp = session.post(args.endpoint, json=obs, timeout=args.timeout)
+            status = str(resp.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return status, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(send, observations))
+    elapsed = time.perf_counter() - started
+
+    latencies = [lat for status, lat in results if status == "200"]
+    statuses: Dict[str, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    report = {
+        "endpoint": args.endpoint,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": args.requests / elapsed if elapsed else 0.0,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0.0,
+        },
+        "statuses": statuses,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
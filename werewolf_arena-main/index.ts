@@ -14,6 +14,24 @@
  * limitations under the License. 
  */
 
+/**
+ * Replaces every `prompt_ref` (a list of segment ids) with the prompt text
+ * rebuilt from prompts.json.
+ */
+function expand_prompts(node: any, store: any) {
+  if (Array.isArray(node)) {
+    for (const value of node) expand_prompts(value, store);
+  } else if (node && typeof node === 'object') {
+    if ('prompt_ref' in node) {
+      node['prompt'] = node['prompt_ref']
+        .map((s: number) => store['segments'][s].map((c: number) => store['chunks'][c]).join('\n'))
+        .join('\n\n');
+      delete node['prompt_ref'];
+    }
+    for (const key of Object.keys(node)) expand_prompts(node[key], store);
+  }
+}
+
 class Demo {
   url: URLSearchParams;
   session_id: string;
@@ -29,6 +47,12 @@ class Demo {
     // game log
     const logs_response = await fetch(`http://localhost:8080/logs/${this.session_id}/game_logs.json`);
     const logs = await logs_response.json();
+
+    // prompts, when the game was logged with a prompt store
+    const prompts_response = await fetch(`http://localhost:8080/logs/${this.session_id}/prompts.json`);
+    if (prompts_response.ok) {
+      expand_prompts(logs, await prompts_response.json());
+    }
     console.log("logs", logs)
 
 
@@ -0,0 +1,185 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times GameMaster orchestration with the model replaced by werewolf.fake_lm.
+
+Usage (from werewolf_arena-main):
+  python -m scripts.benchmark_orchestration --games 5 --threads 4
+  python -m scripts.benchmark_orchestration --games 5 --latency_ms 50 --speculative_bids
+
+Plays complete seeded games (game i uses seed + i) against the in-process
+fake backend, checkpointing and saving each one to a temporary directory as
+`--run` would. Reports, per phase, the number of calls and the wall time
+spent in it. Nested phases are included in their parents (bids and votes run
+inside the day phase). `render` and `parse` are summed over all threads, so
+with --threads > 1 they can exceed the wall time of the phases that use them.
+With the default zero latency every reported second is orchestration cost.
+"""
+
+import argparse
+import collections
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from werewolf import fake_lm
+from werewolf import game
+from werewolf import lm
+from werewolf import logging
+from werewolf import runner
+from werewolf import utils
+from werewolf.model import State
+from werewolf.prompt_store import PromptStore
+
+FAKE_MODEL = "fake-lm"
+
+# (object, attribute, phase) of the functions to time.
+PHASES = [
+    (game.GameMaster, "eliminate", "night: eliminate"),
+    (game.GameMaster, "protect", "night: protect"),
+    (game.GameMaster, "unmask", "night: investigate"),
+    (game.GameMaster, "run_day_phase", "day"),
+    (game.GameMaster, "get_next_speaker", "day: bids"),
+    (game.GameMaster, "_collect_votes", "day: votes"),
+    (game.GameMaster, "exile", "exile"),
+    (game.GameMaster, "run_summaries", "summaries"),
+    (logging.Checkpointer, "write_round", "checkpoint"),
+    (logging, "save_game", "save"),
+    (lm, "format_prompt", "render"),
+    (utils, "parse_json", "parse"),
+]
+
+
+class PhaseTimer:
+    """Accumulates call counts and wall time per phase across threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[str, int] = collections.Counter()
+        self.seconds: Dict[str, float] = collections.defaultdict(float)
+
+    def wrap(self, fn: Callable[..., Any], phase: str) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.calls[phase] += 1
+                    self.seconds[phase] += elapsed
+
+        return timed
+
+    def install(self) -> None:
+        for owner, name, phase in PHASES:
+            setattr(owner, name, self.wrap(getattr(owner, name), phase))
+
+
+def play(seed: int, directory: str, args: argparse.Namespace) -> str:
+    seer, doctor, villagers, werewolves = runner.initialize_players(
+        FAKE_MODEL, FAKE_MODEL, seed=seed
+    )
+    state = State(
+        villagers=villagers,
+        werewolves=werewolves,
+        seer=seer,
+        doctor=doctor,
+        session_id=os.path.basename(directory),
+        seed=seed,
+    )
+    store = PromptStore() if args.dedupe_prompts else None
+    checkpointer = logging.Checkpointer(directory, prompt_store=store)
+    checkpointer.start(state, [])
+    gamemaster = game.GameMaster(
+        state,
+        num_threads=args.threads,
+        speculative_bids=args.speculative_bids,
+        background_synthetic_votes=args.background_votes,
+        rng=runner.moderator_rng(seed),
+        checkpointer=checkpointer,
+    )
+    winner = gamemaster.run_game()
+    logging.save_game(state, gamemaster.logs, directory, checkpointer)
+    return winner
+
+
+def main(argv: List[str] | None = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--latency_ms", type=float, default=0.0)
+    parser.add_argument("--jitter_ms", type=float, default=0.0)
+    parser.add_argument("--speculative_bids", action="store_true")
+    parser.add_argument("--background_votes", action="store_true")
+    parser.add_argument("--no_dedupe_prompts", dest="dedupe_prompts", action="store_false")
+    parser.add_argument("--output", default="", help="Optional path for the report JSON.")
+    args = parser.parse_args(argv)
+
+    backend = fake_lm.install(
+        seed=args.seed, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000
+    )
+    timer = PhaseTimer()
+    timer.install()
+
+    winners = collections.Counter()
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(args.games):
+            directory = os.path.join(root, f"game_{i}")
+            winners[play(args.seed + i, directory, args)] += 1
+    elapsed = time.perf_counter() - started
+
+    model = backend.stats()
+    report = {
+        "games": args.games,
+        "winners": dict(winners),
+        "wall_seconds": elapsed,
+        "model_calls": model["calls"],
+        "simulated_latency_seconds": model["latency_seconds"],
+        "phases": {
+            phase: {
+                "calls": timer.calls[phase],
+                "seconds": timer.seconds[phase],
+                "ms_per_game": 1000 * timer.seconds[phase] / max(1, args.games),
+            }
+            for _, _, phase in PHASES
+        },
+    }
+
+    print(f"{'phase':<20} {'calls':>7} {'total s':>9} {'ms/game':>9}")
+    for phase, row in report["phases"].items():
+        print(
+            f"{phase:<20} {row['calls']:>7} {row['seconds']:>9.3f}"
+            f" {row['ms_per_game']:>9.1f}"
+        )
+    print(
+        f"{args.games} games, {model['calls']} model calls in {elapsed:.2f}s"
+        f" ({1000 * elapsed / max(1, model['calls']):.2f} ms/call;"
+        f" simulated latency {model['latency_seconds']:.2f}s summed over calls)"
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks utils.parse_json against the legacy parser on recorded responses.
+
+Usage (from werewolf_arena-main):
+  python -m scripts.compare_parse_json logs/
+
+Collects every `raw_resp` from the game_logs.json files under the given
+directories (failed retries are stored joined by "-------"), adds a set of
+known edge cases, and checks that both parsers return the same value or raise
+the same exception type. Prints tier counts and timings; exits with status 1
+on any mismatch.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Iterator, List
+
+from werewolf import utils
+
+EDGE_CASES = [
+    '{"vote": "Derek"}',
+    '  {"bid": "3", "reasoning": "x"}\n',
+    "```json\n{\"say\": \"hi\"}\n```",
+    "```JSON\n{\"say\": \"hi\"}\n```\nExtra text.",
+    "Here you go:\n```json\n{\"vote\": \"Scott\"}\n```",
+    "```json\n{\"vote\": \"Scott\",}\n```",
+    "```json\n{vote: Scott}\n```",
+    '{"a": 1e5, "b": 1.5E5, "c": 1.5e+5, "d": 2.50}',
+    '{"a": NaN}',
+    '{"a": "\\ud83d\\ude00"}',
+    '{"a": "tab\tinside"}',
+    '{"a": "x y"}',
+    '{"a": "x\x85y"}',
+    '{"a": "\\/\\b\\f\\n\\r\\t\\u00e9"}',
+    "{}",
+    "[1, 2]",
+    "",
+    "not json at all: {",
+    "```json\n{\"a\": 1}\r\n```",
+]
+
+
+def recorded_responses(directories: List[str]) -> Iterator[str]:
+    for directory in directories:
+        pattern = os.path.join(directory, "**", "game_logs.json")
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, "r") as file:
+                yield from _raw_responses(json.load(file))
+
+
+def _raw_responses(node: Any) -> Iterator[str]:
+    if isinstance(node, dict):
+        raw = node.get("raw_resp")
+        if isinstance(raw, str):
+            yield from (r for r in raw.split("-------") if r)
+        for value in node.values():
+            yield from _raw_responses(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _raw_responses(value)
+
+
+def _outcome(parser, text: str):
+    try:
+        return "ok", parser(text)
+    except Exception as e:
+        return "error", type(e).__name__
+
+
+def main(argv: List[str]) -> int:
+    corpus = EDGE_CASES + list(recorded_responses(argv[1:]))
+    mismatches = 0
+    timings = {"legacy": 0.0, "tiered": 0.0}
+    for text in corpus:
+        start = time.perf_counter()
+        legacy = _outcome(utils.parse_json_legacy, text)
+        timings["legacy"] += time.perf_counter() - start
+        start = time.perf_counter()
+        tiered = _outcome(utils.parse_json, text)
+        timings["tiered"] += time.perf_counter() - start
+        if legacy != tiered:
+            mismatches += 1
+            print(f"MISMATCH {text!r}\n  legacy={legacy!r}\n  tiered={tiered!r}")
+
+    print(f"responses: {len(corpus)}  mismatches: {mismatches}")
+    print(f"tiers: {utils.parse_stats()}")
+    print(
+        f"legacy: {timings['legacy'] * 1000:.1f} ms  "
+        f"tiered: {timings['tiered'] * 1000:.1f} ms"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
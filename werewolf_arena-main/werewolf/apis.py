@@ -12,28 +12,171 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from openai import OpenAI
+import functools
 import os
+import threading
+import time
 
-from typing import Any
-import google
-import vertexai
-from vertexai.preview import generative_models
-from anthropic import AnthropicVertex
+from typing import Any, Callable, Dict, Optional, Tuple
 
+from werewolf import limiter
+from werewolf.usage import Usage
 
-def generate(model, **kwargs):
+# Provider SDKs are imported the first time their provider is used, and the
+# authenticated clients / model handles below are cached for the process, so
+# a bid or vote no longer pays for client construction and auth every call.
+VERTEX_LOCATION = "us-central1"
+ANTHROPIC_REGION = "us-east5"
+
+
+@functools.lru_cache(maxsize=None)
+def _google_default_credentials():
+    import google.auth
+
+    return google.auth.default()
+
+
+@functools.lru_cache(maxsize=None)
+def _openai_client(api_key: str | None):
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=None)
+def _anthropic_client(region: str):
+    from anthropic import AnthropicVertex
+
+    _, project_id = _google_default_credentials()
+    return AnthropicVertex(region=region, project_id=project_id)
+
+
+@functools.lru_cache(maxsize=None)
+def _vertexai_init(location: str):
+    import vertexai
+
+    credentials, project_id = _google_default_credentials()
+    vertexai.init(
+        project=project_id,
+        location=location,
+        credentials=credentials,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _vertexai_model(model: str, location: str):
+    from vertexai.preview import generative_models
+
+    _vertexai_init(location)
+    return generative_models.GenerativeModel(model)
+
+
+@functools.lru_cache(maxsize=None)
+def _vertexai_safety_settings():
+    from vertexai.preview import generative_models
+
+    return [
+        generative_models.SafetySetting(
+            category=category,
+            threshold=generative_models.HarmBlockThreshold.BLOCK_NONE,
+        )
+        for category in (
+            generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+            generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT,
+            generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+            generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+        )
+    ]
+
+
+# Providers added with register_backend(), by the model id prefix they serve.
+_REGISTERED_PREFIXES: Dict[str, str] = {}
+
+
+def register_backend(
+    provider: str, generate_fn: Callable[..., str], model_prefix: str
+) -> None:
+    """Serves model ids starting with `model_prefix` with `generate_fn`.
+
+    `generate_fn` is called like the built-in providers, as
+    `generate_fn(model, prompt=..., response_schema=..., temperature=...,
+    **kwargs)`, and returns the response text. Calls still go through the
+    rate limiter under `provider`.
+    """
+    PROVIDERS[provider] = generate_fn
+    _REGISTERED_PREFIXES[model_prefix] = provider
+
+
+def provider_for(model: str) -> str:
+    """Maps a model id to the provider that serves it."""
+    for prefix, provider in _REGISTERED_PREFIXES.items():
+        if model.startswith(prefix):
+            return provider
     if "gpt" in model:
-        return generate_openai(model, **kwargs)
+        return "openai"
     elif "claude" in model:
-        return generate_authropic(model, **kwargs)
+        return "anthropic"
     else:
-        return generate_vertexai(model, **kwargs)
+        return "vertexai"
+
+
+# Usage reported by the provider function running on this thread.
+_reported = threading.local()
+
+
+def report_usage(input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+    """Records the token counts from a provider response for the current call.
+
+    Provider functions call this when the response carries usage metadata;
+    otherwise generate_with_usage() estimates the counts.
+    """
+    _reported.tokens = (input_tokens, output_tokens)
+
+
+def generate_with_usage(model, **kwargs) -> Tuple[str, Usage]:
+    """Like generate(), but also returns the call's Usage record."""
+    provider = provider_for(model)
+    generate_fn = PROVIDERS[provider]
+    prompt = kwargs.get("prompt", "")
+    attempts = 0
+
+    def attempt():
+        nonlocal attempts
+        attempts += 1
+        _reported.tokens = None
+        return generate_fn(model, **kwargs)
+
+    start = time.monotonic()
+    text = limiter.LIMITER.call(
+        provider, model, attempt, tokens=limiter.estimate_tokens(prompt)
+    )
+    latency = time.monotonic() - start
+    input_tokens, output_tokens = getattr(_reported, "tokens", None) or (None, None)
+    estimated = input_tokens is None or output_tokens is None
+    return text, Usage(
+        provider=provider,
+        model=model,
+        input_tokens=(
+            limiter.estimate_tokens(prompt) if input_tokens is None else input_tokens
+        ),
+        output_tokens=(
+            limiter.estimate_tokens(text or "")
+            if output_tokens is None
+            else output_tokens
+        ),
+        latency_seconds=latency,
+        retries=attempts - 1,
+        estimated=estimated,
+    )
+
+
+def generate(model, **kwargs):
+    return generate_with_usage(model, **kwargs)[0]
 
 
 # openai
 def generate_openai(model: str, prompt: str, json_mode: bool = True, **kwargs):
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = _openai_client(os.environ.get("OPENAI_API_KEY"))
 
     response_format = {"type": "text"}
     if json_mode:
@@ -44,6 +187,9 @@ def generate_openai(model: str, prompt: str, json_mode: bool = True, **kwargs):
         model=model,
     )
 
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        report_usage(usage.prompt_tokens, usage.completion_tokens)
     txt = response.choices[0].message.content
     return txt
 
@@ -53,12 +199,14 @@ def generate_authropic(model: str, prompt: str, **kwargs):
     # For local development, run `gcloud auth application-default login` first to
     # create the application default credentials, which will be picked up
     # automatically here.
-    _, project_id = google.auth.default()
-    client = AnthropicVertex(region="us-east5", project_id=project_id)
+    client = _anthropic_client(ANTHROPIC_REGION)
 
     response = client.messages.create(
         model=model, messages=[{"role": "user", "content": prompt}], max_tokens=1024
     )
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        report_usage(usage.input_tokens, usage.output_tokens)
 
     return response.content[0].text
 
@@ -77,14 +225,9 @@ def generate_vertexai(
     # For local development, run `gcloud auth application-default login` first to
     # create the application default credentials, which will be picked up
     # automatically here.
-    credentials, project_id = google.auth.default()
+    from vertexai.preview import generative_models
 
-    vertexai.init(
-        project=project_id,
-        location="us-central1",
-        credentials=credentials,
-    )
-    model_endpoint = generative_models.GenerativeModel(model)
+    model_endpoint = _vertexai_model(model, VERTEX_LOCATION)
 
     # 1.5 flash doesn't support constrained decoding as of 6/5/2024, so we
     # disable json_schema for it. Otherwise, the library will throw an unsupported
@@ -101,31 +244,22 @@ def generate_vertexai(
         response_schema=json_schema,
     )
 
-    # Safety config.
-    safety_config = [
-        generative_models.SafetySetting(
-            category=generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-            threshold=generative_models.HarmBlockThreshold.BLOCK_NONE,
-        ),
-        generative_models.SafetySetting(
-            category=generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT,
-            threshold=generative_models.HarmBlockThreshold.BLOCK_NONE,
-        ),
-        generative_models.SafetySetting(
-            category=generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-            threshold=generative_models.HarmBlockThreshold.BLOCK_NONE,
-        ),
-        generative_models.SafetySetting(
-            category=generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-            threshold=generative_models.HarmBlockThreshold.BLOCK_NONE,
-        ),
-    ]
     response = model_endpoint.generate_content(
         prompt,
         generation_config=config,
         stream=False,
-        safety_settings=safety_config,
+        safety_settings=_vertexai_safety_settings(),
     )
     assert isinstance(response, generative_models.GenerationResponse)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        report_usage(usage.prompt_token_count, usage.candidates_token_count)
 
     return response.text
+
+
+PROVIDERS = {
+    "openai": generate_openai,
+    "anthropic": generate_authropic,
+    "vertexai": generate_vertexai,
+}
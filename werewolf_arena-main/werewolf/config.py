@@ -24,5 +24,45 @@ RUN_SYNTHETIC_VOTES = True
 MAX_DEBATE_TURNS = 8
 NUM_PLAYERS = 8
 
-def get_player_names(): 
-    return random.sample(NAMES, NUM_PLAYERS)
\ No newline at end of file
+# Process-wide limits per provider, applied to each model separately (see
+# werewolf/limiter.py). rpm/tpm of None disables that bucket.
+RATE_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 300_000, "max_concurrency": 16},
+    "anthropic": {"rpm": 60, "tpm": 80_000, "max_concurrency": 8},
+    "vertexai": {"rpm": 300, "tpm": 2_000_000, "max_concurrency": 16},
+    # In-process backend from werewolf/fake_lm.py.
+    "fake": {"rpm": None, "tpm": None, "max_concurrency": 64},
+    "default": {"rpm": None, "tpm": None, "max_concurrency": 8},
+}
+THROTTLE_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+OUTPUT_TOKEN_ESTIMATE = 256  # budgeted per call on top of the prompt
+
+# Samples drawn at once for constrained choices (vote/remove/protect/
+# investigate/bid); 1 keeps the serial retry loop.
+NUM_CANDIDATES = 1
+CANDIDATE_THREADS = 32
+
+# Budget in estimated tokens (~4 characters each) for the private observations
+# in each action's prompt. Older rounds past the budget are condensed to their
+# key facts; the CONTEXT_RECENT_ROUNDS latest rounds are always verbatim.
+# None keeps every round verbatim.
+CONTEXT_BUDGETS = {
+    "bid": None,
+    "debate": None,
+    "vote": None,
+    "investigate": None,
+    "remove": None,
+    "protect": None,
+    "summarize": None,
+}
+CONTEXT_RECENT_ROUNDS = 1
+
+# Players list the remaining players in a fresh random order in every prompt
+# to counter position bias. True keeps one order per roster so consecutive
+# prompts share a longer prefix (better prompt caching, weaker mitigation).
+STABLE_PLAYER_ORDER = False
+
+def get_player_names(rng=None):
+    return (rng or random).sample(NAMES, NUM_PLAYERS)
\ No newline at end of file
@@ -0,0 +1,127 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic in-process model backend for orchestration benchmarks.
+
+`install()` registers a `FakeBackend` with `werewolf.apis`, after which every
+model id starting with "fake" (e.g. `--v_models=fake --w_models=fake`) is
+answered locally instead of by a provider.
+
+Answers are schema-valid for every action in ACTION_PROMPTS_AND_SCHEMAS: the
+result key comes from the response schema and names are picked from the
+options listed in the prompt. Choices and latency are drawn from an RNG
+seeded by (seed, prompt), so a seeded game replays identically no matter how
+calls interleave across threads.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from werewolf import apis
+
+PROVIDER = "fake"
+MODEL_PREFIX = "fake"
+
+_OPTIONS = re.compile(r"Choose from: (.+)")
+_NAME_KEYS = ("vote", "remove", "investigate", "protect")
+_BIDS = ["0", "1", "2", "3", "4"]
+_LINES = [
+    "I want to hear from the quieter players before I decide.",
+    "Something about the last accusation does not add up for me.",
+    "Let's compare who pushed which vote yesterday.",
+    "I'm not convinced yet; what made you suspicious?",
+]
+
+
+class FakeBackend:
+    """Answers prompts with seeded, schema-valid JSON after a simulated delay.
+
+    Args:
+      seed: Seed mixed into every per-prompt RNG.
+      latency: Mean simulated latency per call, in seconds.
+      jitter: Latency is drawn uniformly from latency +/- jitter.
+    """
+
+    def __init__(self, seed: int = 0, latency: float = 0.0, jitter: float = 0.0):
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._latency_seconds = 0.0
+
+    def __call__(
+        self,
+        model: str,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> str:
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+        rng = random.Random(f"{self.seed}:{digest}")
+        delay = max(
+            0.0, rng.uniform(self.latency - self.jitter, self.latency + self.jitter)
+        )
+        response = json.dumps(self.answer(prompt, response_schema, rng))
+        with self._lock:
+            self._calls += 1
+            self._latency_seconds += delay
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def answer(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]],
+        rng: random.Random,
+    ) -> Dict[str, Any]:
+        """Builds a response object matching `response_schema`."""
+        properties = (response_schema or {}).get("properties", {})
+        match = _OPTIONS.search(prompt)
+        options = _split_options(match.group(1)) if match else []
+        response = {}
+        for key in properties:
+            if key in _NAME_KEYS:
+                response[key] = rng.choice(options) if options else ""
+            elif key == "bid":
+                response[key] = rng.choice(_BIDS)
+            elif key == "say":
+                response[key] = rng.choice(_LINES)
+            elif key == "summary":
+                response[key] = "I noted who accused whom and how everyone voted."
+            else:
+                response[key] = f"Fake {key}."
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls served and the simulated latency they were charged."""
+        with self._lock:
+            return {"calls": self._calls, "latency_seconds": self._latency_seconds}
+
+
+def _split_options(text: str) -> List[str]:
+    return [option.strip() for option in text.split(",") if option.strip()]
+
+
+def install(seed: int = 0, latency: float = 0.0, jitter: float = 0.0) -> FakeBackend:
+    """Registers a new FakeBackend for model ids starting with "fake"."""
+    backend = FakeBackend(seed=seed, latency=latency, jitter=jitter)
+    apis.register_backend(PROVIDER, backend, MODEL_PREFIX)
+    return backend
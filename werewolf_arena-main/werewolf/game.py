@@ -15,12 +15,13 @@
 """Werewolf game."""
 
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 import random
-from typing import List
+from typing import Dict, List, Optional
 
 import tqdm
 
+from werewolf.logging import Checkpointer
 from werewolf.model import Round, RoundLog, State, VoteLog
 from werewolf.config import  MAX_DEBATE_TURNS, RUN_SYNTHETIC_VOTES
 
@@ -37,15 +38,48 @@ class GameMaster:
       self,
       state: State,
       num_threads: int = 1,
+      speculative_bids: bool = False,
+      background_synthetic_votes: bool = False,
+      rng: Optional[random.Random] = None,
+      checkpointer: Optional[Checkpointer] = None,
   ) -> None:
     """Initialize the Werewolf game.
 
     Args:
+      state: The game state to run.
+      num_threads: Size of the worker pool used for concurrent model calls.
+      speculative_bids: If True, next-turn bids are requested while the
+        current speaker is talking. Players named in the new dialogue bid
+        again once it is known; the others keep their speculative bid.
+      background_synthetic_votes: If True, the per-turn synthetic votes
+        (RUN_SYNTHETIC_VOTES) run on a separate pool from a snapshot of each
+        player's view while the debate continues. They are joined in turn
+        order before the final vote, which stays synchronous.
+      rng: Random number generator for the moderator's choices (which wolf
+        acts, speaker tie-breaks). Defaults to the global `random` module.
+      checkpointer: If given, a checkpoint is appended after every completed
+        round.
     """
     self.state = state
     self.current_round_num = len(self.state.rounds) if self.state.rounds else 0
     self.num_threads = num_threads
+    self.speculative_bids = speculative_bids
+    self.background_synthetic_votes = background_synthetic_votes
     self.logs: List[RoundLog] = []
+    self._rng = rng if rng is not None else random
+    self.checkpointer = checkpointer
+    self._executor = ThreadPoolExecutor(max_workers=num_threads)
+    self._background = (
+        ThreadPoolExecutor(max_workers=num_threads)
+        if background_synthetic_votes
+        else None
+    )
+
+  def close(self):
+    """Waits for outstanding model calls and releases the worker pools."""
+    self._executor.shutdown(wait=True)
+    if self._background is not None:
+      self._background.shutdown(wait=True)
 
   @property
   def this_round(self) -> Round:
@@ -60,7 +94,7 @@ class GameMaster:
     werewolves_alive = [
         w for w in self.state.werewolves if w.name in self.this_round.players
     ]
-    wolf = random.choice(werewolves_alive)
+    wolf = self._rng.choice(werewolves_alive)
     eliminated, log = wolf.eliminate()
     self.this_round_log.eliminate = log
     if eliminated is not None:
@@ -103,10 +137,10 @@ class GameMaster:
     else:
       raise ValueError("Unmask function did not return a valid player.")
 
-  def _get_bid(self, player_name):
+  def _get_bid(self, player_name, game_state=None):
     """Gets the bid for a specific player."""
     player = self.state.players[player_name]
-    bid, log = player.bid()
+    bid, log = player.bid(game_state)
     if bid is None:
       raise ValueError(
           f"{player_name} did not return a valid bid. Find the raw response"
@@ -116,29 +150,61 @@ class GameMaster:
       tqdm.tqdm.write(f"{player_name} bid: {bid}")
     return bid, log
 
-  def get_next_speaker(self):
-    """Determine the next speaker based on bids."""
+  def _submit_bids(self, speaker: Optional[str]) -> Dict[str, Future]:
+    """Requests bids from every remaining player except `speaker`."""
+    return {
+        player_name: self._executor.submit(self._get_bid, player_name)
+        for player_name in self.this_round.players
+        if player_name != speaker
+    }
+
+  def _submit_speculative_bids(self, speaker: str) -> Dict[str, Future]:
+    """Requests next-turn bids from the debate as it is before `speaker` talks.
+
+    The bids do not see the line being spoken; that staleness is the price
+    of overlapping them with the speech, and they are used as they are.
+    """
+    return {
+        player_name: self._executor.submit(
+            self._get_bid,
+            player_name,
+            self.state.players[player_name].bid_snapshot(),
+        )
+        for player_name in self.this_round.players
+        if player_name != speaker
+    }
+
+  def get_next_speaker(
+      self, player_bids: Optional[Dict[str, Future]] = None
+  ):
+    """Determine the next speaker based on bids.
+
+    Args:
+      player_bids: Bids already requested for this turn (speculative mode).
+        When omitted, bids are requested from everyone but the last speaker.
+        Speculative bids update the bidding rationale only here, so votes
+        taken while they ran saw the same rationale as without speculation.
+    """
     previous_speaker, previous_dialogue = (
         self.this_round.debate[-1] if self.this_round.debate else (None, None)
     )
 
-    with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-      player_bids = {
-          player_name: executor.submit(self._get_bid, player_name)
-          for player_name in self.this_round.players
-          if player_name != previous_speaker
-      }
-
-      bid_log = []
-      bids = {}
-      try:
-        for player_name, bid_task in player_bids.items():
-          bid, log = bid_task.result()
-          bids[player_name] = bid
-          bid_log.append((player_name, log))
-      except TypeError as e:
-        print(e)
-        raise e
+    speculative = player_bids is not None
+    if player_bids is None:
+      player_bids = self._submit_bids(previous_speaker)
+
+    bid_log = []
+    bids = {}
+    try:
+      for player_name, bid_task in player_bids.items():
+        bid, log = bid_task.result()
+        if speculative:
+          self.state.players[player_name].adopt_bid(log)
+        bids[player_name] = bid
+        bid_log.append((player_name, log))
+    except TypeError as e:
+      print(e)
+      raise e
 
     self.this_round.bids.append(bids)
     self.this_round_log.bid.append(bid_log)
@@ -150,32 +216,36 @@ class GameMaster:
           [name for name in potential_speakers if name in previous_dialogue]
       )
 
-    random.shuffle(potential_speakers)
-    return random.choice(potential_speakers)
+    self._rng.shuffle(potential_speakers)
+    return self._rng.choice(potential_speakers)
 
   def run_summaries(self):
     """Collect summaries from players after the debate."""
 
-    with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-      player_summaries = {
-          name: executor.submit(self.state.players[name].summarize)
-          for name in self.this_round.players
-      }
+    player_summaries = {
+        name: self._executor.submit(self.state.players[name].summarize)
+        for name in self.this_round.players
+    }
 
-      for player_name, summary_task in player_summaries.items():
-        summary, log = summary_task.result()
-        tqdm.tqdm.write(f"{player_name} summary: {summary}")
-        self.this_round_log.summaries.append((player_name, log))
+    for player_name, summary_task in player_summaries.items():
+      summary, log = summary_task.result()
+      tqdm.tqdm.write(f"{player_name} summary: {summary}")
+      self.this_round_log.summaries.append((player_name, log))
 
   def run_day_phase(self):
     """Run the day phase which consists of the debate and voting."""
 
+    next_bids = None
+    pending_votes: List[Dict[str, Future]] = []
     for idx in range(MAX_DEBATE_TURNS):
-      next_speaker = self.get_next_speaker()
+      next_speaker = self.get_next_speaker(next_bids)
       if not next_speaker:
         raise ValueError("get_next_speaker did not return a valid player.")
 
       player = self.state.players[next_speaker]
+      next_bids = None
+      if self.speculative_bids and idx < MAX_DEBATE_TURNS - 1:
+        next_bids = self._submit_speculative_bids(next_speaker)
       dialogue, log = player.debate()
       if dialogue is None:
         raise ValueError(
@@ -193,35 +263,58 @@ class GameMaster:
         else:
           raise ValueError(f"{name}.gamestate needs to be initialized.")
 
-      if idx == MAX_DEBATE_TURNS - 1 or RUN_SYNTHETIC_VOTES:
-        votes, vote_logs = self.run_voting()
-        self.this_round.votes.append(votes)
-        self.this_round_log.votes.append(vote_logs)
+      if idx < MAX_DEBATE_TURNS - 1 and RUN_SYNTHETIC_VOTES:
+        if self._background is not None:
+          pending_votes.append(self._submit_snapshot_votes())
+        else:
+          votes, vote_logs = self.run_voting()
+          self.this_round.votes.append(votes)
+          self.this_round_log.votes.append(vote_logs)
+
+    for player_votes in pending_votes:
+      votes, vote_logs = self._collect_votes(player_votes)
+      self.this_round.votes.append(votes)
+      self.this_round_log.votes.append(vote_logs)
+
+    votes, vote_logs = self.run_voting()
+    self.this_round.votes.append(votes)
+    self.this_round_log.votes.append(vote_logs)
 
     for player, vote in self.this_round.votes[-1].items():
       tqdm.tqdm.write(f"{player} voted to remove {vote}")
 
+  def _submit_snapshot_votes(self) -> Dict[str, Future]:
+    """Starts a background vote from each player's current view."""
+    player_votes = {}
+    for name in self.this_round.players:
+      player = self.state.players[name]
+      player_votes[name] = self._background.submit(
+          player.vote, player._get_game_state("vote"), player.vote_options()
+      )
+    return player_votes
+
   def run_voting(self):
     """Conduct a vote among players to exile someone."""
+    return self._collect_votes({
+        name: self._executor.submit(self.state.players[name].vote)
+        for name in self.this_round.players
+    })
+
+  def _collect_votes(self, player_votes: Dict[str, Future]):
+    """Waits for the votes in `player_votes` and builds the vote logs."""
     vote_log = []
     votes = {}
 
-    with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-      player_votes = {
-          name: executor.submit(self.state.players[name].vote)
-          for name in self.this_round.players
-      }
-
-      for player_name, vote_task in player_votes.items():
-        vote, log = vote_task.result()
-        vote_log.append(VoteLog(player_name, vote, log))
+    for player_name, vote_task in player_votes.items():
+      vote, log = vote_task.result()
+      vote_log.append(VoteLog(player_name, vote, log))
 
-        if vote is not None:
-          votes[player_name] = vote
-        else:
-          self.this_round.votes.append(votes)
-          self.this_round_log.votes.append(vote_log)
-          raise ValueError(f"{player_name} vote did not return a valid player.")
+      if vote is not None:
+        votes[player_name] = vote
+      else:
+        self.this_round.votes.append(votes)
+        self.this_round_log.votes.append(vote_log)
+        raise ValueError(f"{player_name} vote did not return a valid player.")
 
     return votes, vote_log
 
@@ -328,16 +421,23 @@ class GameMaster:
 
   def run_game(self) -> str:
     """Run the entire Werewolf game and return the winner."""
-    while not self.state.winner:
-      tqdm.tqdm.write(f"STARTING ROUND: {self.current_round_num}")
-      self.run_round()
-      for name in self.this_round.players:
-        if self.state.players[name].gamestate:
-          self.state.players[name].gamestate.round_number = (
-              self.current_round_num + 1
+    try:
+      while not self.state.winner:
+        tqdm.tqdm.write(f"STARTING ROUND: {self.current_round_num}")
+        self.run_round()
+        for name in self.this_round.players:
+          if self.state.players[name].gamestate:
+            self.state.players[name].gamestate.round_number = (
+                self.current_round_num + 1
+            )
+            self.state.players[name].gamestate.clear_debate()
+        if self.checkpointer is not None:
+          self.checkpointer.write_round(
+              self.state, self.this_round_log, self.current_round_num
           )
-          self.state.players[name].gamestate.clear_debate()
-      self.current_round_num += 1
+        self.current_round_num += 1
+    finally:
+      self.close()
 
     tqdm.tqdm.write("Game is complete!")
     return self.state.winner
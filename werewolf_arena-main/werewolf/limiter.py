@@ -0,0 +1,271 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide rate limiting for model calls.
+
+Every call in `werewolf.apis` goes through `LIMITER`, which keeps, per
+(provider, model):
+  - token buckets for requests per minute and tokens per minute,
+  - an adaptive concurrency limit (additive increase on success,
+    multiplicative decrease when the provider throttles),
+  - jittered exponential backoff before retrying a throttled call.
+
+Limits come from `config.RATE_LIMITS` and can be changed with `configure()`.
+`stats()` returns live counters for every (provider, model) seen so far.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from werewolf.config import (
+    BACKOFF_BASE_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    OUTPUT_TOKEN_ESTIMATE,
+    RATE_LIMITS,
+    THROTTLE_RETRIES,
+)
+
+# HTTP statuses providers answer throttled calls with (529: Anthropic overloaded).
+_THROTTLE_STATUSES = (429, 529)
+# Provider SDK exception classes for throttling (openai/anthropic RateLimitError,
+# google.api_core ResourceExhausted/TooManyRequests, anthropic OverloadedError),
+# matched by name so no SDK has to be imported here.
+_THROTTLE_TYPES = frozenset(
+    {"RateLimitError", "ResourceExhausted", "TooManyRequests", "OverloadedError"}
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def is_throttle_error(e: Exception) -> bool:
+    """True if the exception is a provider rate-limit response.
+
+    Only the HTTP status on the exception (or its response) and the exception
+    type are consulted; messages are not, since ids, ports or token counts in
+    them can contain "429".
+    """
+    response = getattr(e, "response", None)
+    for status in (
+        getattr(e, "status_code", None),
+        getattr(e, "code", None),
+        getattr(response, "status_code", None),
+    ):
+        if isinstance(status, int) and status in _THROTTLE_STATUSES:
+            return True
+    return any(cls.__name__ in _THROTTLE_TYPES for cls in type(e).__mro__)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: Optional[float]):
+        self.capacity = float(per_minute) if per_minute else 0.0
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Takes `amount` tokens, sleeping until they are available.
+
+        Requests larger than the bucket are clipped to its capacity so they
+        wait for a full bucket instead of forever. Returns the time waited.
+        """
+        if not self.capacity:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class ConcurrencyGovernor:
+    """AIMD limit on the number of calls in flight."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> float:
+        start = time.monotonic()
+        with self.cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self.cond.wait()
+            self.in_flight += 1
+        return time.monotonic() - start
+
+    def release(self, throttled: bool) -> None:
+        with self.cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1.0 / self.limit
+                )
+            self.cond.notify_all()
+
+
+class ModelLimiter:
+    """Buckets, concurrency governor and counters for one (provider, model)."""
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_concurrency: int = 8,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.governor = ConcurrencyGovernor(max_concurrency)
+        self.lock = threading.Lock()
+        self.counts = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "throttled": 0,
+            "retries": 0,
+            "tokens_budgeted": 0,
+            "wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def add(self, **deltas: float) -> None:
+        with self.lock:
+            for key, value in deltas.items():
+                self.counts[key] += value
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counts = dict(self.counts)
+        counts["in_flight"] = self.governor.in_flight
+        counts["concurrency_limit"] = round(self.governor.limit, 2)
+        return counts
+
+
+class RateLimiter:
+    """Registry of per-(provider, model) limiters shared by the process."""
+
+    def __init__(
+        self,
+        limits: Dict[str, Dict[str, Any]],
+        max_retries: int = THROTTLE_RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+        backoff_max: float = BACKOFF_MAX_SECONDS,
+    ):
+        self.limits = {k: dict(v) for k, v in limits.items()}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._limiters: Dict[Tuple[str, str], ModelLimiter] = {}
+        self._lock = threading.Lock()
+        # Own RNG so backoff jitter never perturbs seeded game RNGs.
+        self._jitter = random.Random()
+
+    def configure(self, provider: str, **limits: Any) -> None:
+        """Overrides limits (rpm, tpm, max_concurrency) for a provider.
+
+        Applies to models of that provider that have not been used yet.
+        """
+        with self._lock:
+            self.limits.setdefault(provider, {}).update(limits)
+
+    def _get(self, provider: str, model: str) -> ModelLimiter:
+        key = (provider, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limits = self.limits.get(provider, self.limits.get("default", {}))
+                limiter = ModelLimiter(**limits)
+                self._limiters[key] = limiter
+            return limiter
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        cap = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return self._jitter.uniform(0, cap)
+
+    def call(
+        self,
+        provider: str,
+        model: str,
+        fn: Callable[[], Any],
+        tokens: int = 0,
+    ) -> Any:
+        """Runs `fn` within the limits of (provider, model).
+
+        Throttling errors are retried with backoff up to `max_retries` times;
+        any other exception, or the last throttling error, is re-raised.
+        """
+        limiter = self._get(provider, model)
+        budget = tokens + OUTPUT_TOKEN_ESTIMATE
+        for attempt in range(self.max_retries + 1):
+            waited = limiter.requests.acquire(1)
+            waited += limiter.tokens.acquire(budget)
+            waited += limiter.governor.acquire()
+            limiter.add(calls=1, tokens_budgeted=budget, wait_seconds=waited)
+            throttled = False
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                if not throttled or attempt == self.max_retries:
+                    limiter.add(failed=1, throttled=int(throttled))
+                    raise
+            finally:
+                limiter.governor.release(throttled)
+            if not throttled:
+                limiter.add(succeeded=1)
+                return result
+            delay = self.backoff(attempt)
+            limiter.add(throttled=1, retries=1, backoff_seconds=delay)
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Live counters keyed by "provider/model"."""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            f"{provider}/{model}": limiter.stats()
+            for (provider, model), limiter in sorted(limiters.items())
+        }
+
+    def summary(self) -> str:
+        """One-line view of stats() for progress bars."""
+        return "; ".join(
+            f"{key}: {s['succeeded']} ok, {s['throttled']} throttled,"
+            f" limit {s['concurrency_limit']}"
+            for key, s in self.stats().items()
+        )
+
+
+LIMITER = RateLimiter(RATE_LIMITS)
@@ -0,0 +1,154 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import http
+from unittest import mock
+
+from absl.testing import absltest
+from werewolf import limiter
+
+
+class FakeClock:
+  """Stands in for the `time` module: sleeping advances the clock."""
+
+  def __init__(self):
+    self.now = 0.0
+    self.slept = []
+
+  def monotonic(self) -> float:
+    return self.now
+
+  def sleep(self, seconds: float) -> None:
+    self.slept.append(seconds)
+    self.now += seconds
+
+
+class RateLimitError(Exception):
+  """Named like the openai/anthropic SDK throttling error."""
+
+
+class StatusError(Exception):
+
+  def __init__(self, message, status_code=None, code=None):
+    super().__init__(message)
+    self.status_code = status_code
+    self.code = code
+
+
+class LimiterTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.clock = FakeClock()
+    self.enter_context(mock.patch.object(limiter, "time", self.clock))
+
+  def test_throttle_errors_are_matched_by_status_and_type_only(self):
+    self.assertTrue(limiter.is_throttle_error(RateLimitError("slow down")))
+    self.assertTrue(limiter.is_throttle_error(StatusError("x", status_code=429)))
+    self.assertTrue(limiter.is_throttle_error(StatusError("x", status_code=529)))
+    self.assertTrue(
+        limiter.is_throttle_error(
+            StatusError("x", code=http.HTTPStatus.TOO_MANY_REQUESTS)
+        )
+    )
+    self.assertFalse(
+        limiter.is_throttle_error(ValueError("connect to localhost:4290 failed"))
+    )
+    self.assertFalse(
+        limiter.is_throttle_error(ValueError("request 8429 used 1429 tokens"))
+    )
+    self.assertFalse(
+        limiter.is_throttle_error(StatusError("rate limit", status_code=500))
+    )
+
+  def test_token_bucket_refills_over_time(self):
+    bucket = limiter.TokenBucket(60)  # one token per second
+    self.assertEqual(bucket.acquire(60), 0.0)
+    self.assertEqual(bucket.acquire(1), 1.0)
+    self.clock.now += 30
+    self.assertEqual(bucket.acquire(30), 0.0)
+    # Larger than the bucket: waits for a full bucket, not forever.
+    self.assertEqual(bucket.acquire(600), 60.0)
+    self.assertEqual(limiter.TokenBucket(None).acquire(10**6), 0.0)
+
+  def test_concurrency_limit_halves_and_recovers(self):
+    governor = limiter.ConcurrencyGovernor(4)
+    governor.acquire()
+    governor.release(throttled=True)
+    self.assertEqual(governor.limit, 2.0)
+    governor.acquire()
+    governor.release(throttled=True)
+    governor.acquire()
+    governor.release(throttled=True)
+    self.assertEqual(governor.limit, 1.0)
+    limits = []
+    for _ in range(12):
+      governor.acquire()
+      governor.release(throttled=False)
+      limits.append(governor.limit)
+    self.assertEqual(limits[0], 2.0)
+    self.assertEqual(limits[1], 2.5)
+    self.assertEqual(limits, sorted(limits))
+    self.assertEqual(limits[-1], 4.0)
+    self.assertEqual(governor.in_flight, 0)
+
+  def test_throttled_calls_are_retried_up_to_the_limit(self):
+    rate_limiter = limiter.RateLimiter(
+        {"default": {}}, max_retries=2, backoff_base=1.0, backoff_max=3.0
+    )
+    attempts = []
+
+    def always_throttled():
+      attempts.append(self.clock.now)
+      raise RateLimitError("slow down")
+
+    with self.assertRaises(RateLimitError):
+      rate_limiter.call("p", "m", always_throttled)
+    self.assertLen(attempts, 3)
+    self.assertLen(self.clock.slept, 2)
+    for attempt, delay in enumerate(self.clock.slept):
+      self.assertBetween(delay, 0.0, min(3.0, 2.0**attempt))
+    stats = rate_limiter.stats()["p/m"]
+    self.assertEqual(
+        (stats["calls"], stats["retries"], stats["throttled"], stats["failed"]),
+        (3, 2, 3, 1),
+    )
+
+    outcomes = [RateLimitError("slow down"), None]
+
+    def throttled_once():
+      outcome = outcomes.pop(0)
+      if outcome:
+        raise outcome
+      return "ok"
+
+    self.assertEqual(rate_limiter.call("p", "n", throttled_once), "ok")
+    self.assertEqual(rate_limiter.stats()["p/n"]["retries"], 1)
+
+  def test_other_errors_are_not_retried(self):
+    rate_limiter = limiter.RateLimiter({"default": {}}, max_retries=3)
+    calls = []
+
+    def broken():
+      calls.append(1)
+      raise ValueError("upstream 429 bytes short")
+
+    with self.assertRaises(ValueError):
+      rate_limiter.call("p", "m", broken)
+    self.assertLen(calls, 1)
+    self.assertEqual(self.clock.slept, [])
+
+
+if __name__ == "__main__":
+  absltest.main()
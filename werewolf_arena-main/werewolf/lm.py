@@ -12,14 +12,47 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import dataclasses
+import functools
+import threading
 from typing import Any, Dict, List, Optional
 
 import jinja2
+import jinja2.meta
 from werewolf import utils
 from werewolf.utils import Deserializable
 from werewolf import apis
+from werewolf import config
 from werewolf.config import RETRIES
+from werewolf.limiter import estimate_tokens
+from werewolf.prompts import PREFIX
+from werewolf.usage import LATE_USAGE
+
+# Shared environment with jinja2.Template's default settings, so compiled
+# templates render exactly as before.
+_TEMPLATE_ENV = jinja2.Environment()
+_PREFIX_VARS = tuple(
+    sorted(jinja2.meta.find_undeclared_variables(_TEMPLATE_ENV.parse(PREFIX)))
+)
+_PREFIX_CACHE_SIZE = 256
+_prefix_cache: "collections.OrderedDict[tuple, str]" = collections.OrderedDict()
+_prefix_lock = threading.Lock()
+
+# Candidate samples run here rather than on the GameMaster's pool, whose
+# workers are the callers and would otherwise wait on themselves. Created on
+# first use so config.CANDIDATE_THREADS can be set after import.
+_candidate_pool: Optional[ThreadPoolExecutor] = None
+_candidate_pool_lock = threading.Lock()
+
+
+def _get_candidate_pool() -> ThreadPoolExecutor:
+    global _candidate_pool
+    with _candidate_pool_lock:
+        if _candidate_pool is None:
+            _candidate_pool = ThreadPoolExecutor(max_workers=config.CANDIDATE_THREADS)
+        return _candidate_pool
 
 
 @dataclasses.dataclass
@@ -27,14 +60,62 @@ class LmLog(Deserializable):
     prompt: str
     raw_resp: str
     result: Any
+    # Index of the winning sample when candidates are drawn concurrently.
+    candidate: Optional[int] = None
+    # Estimated prompt size in tokens (see limiter.estimate_tokens).
+    prompt_tokens: Optional[int] = None
+    # One usage.Usage dict per model call made for this action, retries
+    # included.
+    usage: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
 
     @classmethod
     def from_json(cls, data: Dict[Any, Any]):
         return cls(**data)
 
 
+@functools.lru_cache(maxsize=None)
+def compile_template(prompt_template: str) -> jinja2.Template:
+    """Compiles a prompt template once; later calls reuse the template."""
+    return _TEMPLATE_ENV.from_string(prompt_template)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _render_prefix(worldstate) -> str:
+    """Renders the shared PREFIX, reusing the text for identical inputs.
+
+    Without config.STABLE_PLAYER_ORDER every prompt lists the players in a new
+    order, so inputs almost never repeat and the cache is skipped.
+    """
+    if not config.STABLE_PLAYER_ORDER:
+        return compile_template(PREFIX).render(worldstate)
+    key = tuple(_freeze(worldstate.get(var)) for var in _PREFIX_VARS)
+    with _prefix_lock:
+        rendered = _prefix_cache.get(key)
+        if rendered is not None:
+            _prefix_cache.move_to_end(key)
+            return rendered
+    rendered = compile_template(PREFIX).render(worldstate)
+    with _prefix_lock:
+        _prefix_cache[key] = rendered
+        while len(_prefix_cache) > _PREFIX_CACHE_SIZE:
+            _prefix_cache.popitem(last=False)
+    return rendered
+
+
 def format_prompt(prompt_template, worldstate) -> str:
-    return jinja2.Template(prompt_template).render(worldstate)
+    # Action prompts all start with the rules/state/observations PREFIX, which
+    # stays the same across a player's actions until their view changes.
+    if prompt_template.startswith(PREFIX):
+        suffix = compile_template(prompt_template[len(PREFIX):])
+        return _render_prefix(worldstate) + suffix.render(worldstate)
+    return compile_template(prompt_template).render(worldstate)
 
 
 def generate(
@@ -45,6 +126,7 @@ def generate(
     temperature: float = 1.0,
     allowed_values: Optional[List[Any]] = None,
     result_key: Optional[str] = None,
+    num_candidates: Optional[int] = None,
 ) -> tuple[Any, LmLog]:
     """Generates text from the language model and parses the result.
 
@@ -59,17 +141,37 @@ def generate(
           values is obtained.
         result_key: An optional key to extract a specific value from the parsed
           result. If not provided, the entire parsed result is returned.
+        num_candidates: For constrained choices (allowed_values given), the
+          number of samples to request at once; the first valid one wins.
+          Defaults to config.NUM_CANDIDATES. 1 keeps the serial retry loop.
 
     Returns:
         A tuple containing the result (or None if unsuccessful) and the LmLog.
     """
 
     prompt = format_prompt(prompt_template, worldstate)
+    prompt_tokens = estimate_tokens(prompt)
+    if num_candidates is None:
+        num_candidates = config.NUM_CANDIDATES
+    if allowed_values is not None and num_candidates > 1:
+        result, log = _generate_candidates(
+            prompt,
+            response_schema,
+            model,
+            temperature,
+            allowed_values,
+            result_key,
+            num_candidates,
+        )
+        log.prompt_tokens = prompt_tokens
+        return result, log
+
     raw_responses = []
+    usage = []
     for _ in range(RETRIES):
         raw_resp = None
         try:
-            raw_resp = apis.generate(
+            raw_resp, call_usage = apis.generate_with_usage(
                 model=model,
                 prompt=prompt,
                 response_schema=response_schema,
@@ -77,8 +179,15 @@ def generate(
                 disable_recitation=True,
                 disable_safety_check=True,
             )
+            usage.append(call_usage.to_dict())
             result = utils.parse_json(raw_resp)
-            log = LmLog(prompt=prompt, raw_resp=raw_resp, result=result)
+            log = LmLog(
+                prompt=prompt,
+                raw_resp=raw_resp,
+                result=result,
+                prompt_tokens=prompt_tokens,
+                usage=usage,
+            )
 
             if result and result_key:
                 result = result.get(result_key)
@@ -92,5 +201,118 @@ def generate(
         raw_responses.append(raw_resp)
 
     return None, LmLog(
-        prompt=prompt, raw_resp="-------".join(raw_responses), result=None
+        prompt=prompt,
+        raw_resp="-------".join(raw_responses),
+        result=None,
+        prompt_tokens=prompt_tokens,
+        usage=usage,
+    )
+
+
+def _sample(
+    prompt: str,
+    response_schema: Dict[str, Any],
+    model: str,
+    temperature: float,
+    allowed_values: List[Any],
+    result_key: Optional[str],
+) -> tuple[bool, Any, LmLog | str | None, Optional[Dict[str, Any]]]:
+    """One constrained sample: (valid, result, log or raw response, usage)."""
+    raw_resp = None
+    call_usage = None
+    try:
+        raw_resp, call_usage = apis.generate_with_usage(
+            model=model,
+            prompt=prompt,
+            response_schema=response_schema,
+            temperature=temperature,
+            disable_recitation=True,
+            disable_safety_check=True,
+        )
+        call_usage = call_usage.to_dict()
+        result = utils.parse_json(raw_resp)
+        log = LmLog(prompt=prompt, raw_resp=raw_resp, result=result)
+        if result and result_key:
+            result = result.get(result_key)
+        if result in allowed_values:
+            return True, result, log, call_usage
+    except Exception as e:
+        print(f"Retrying due to Exception: {e}")
+    return False, None, raw_resp, call_usage
+
+
+def _record_late_usage(future) -> None:
+    if not future.cancelled():
+        call_usage = future.result()[3]
+        if call_usage is not None:
+            LATE_USAGE.add(call_usage)
+
+
+def _generate_candidates(
+    prompt: str,
+    response_schema: Dict[str, Any],
+    model: str,
+    temperature: float,
+    allowed_values: List[Any],
+    result_key: Optional[str],
+    num_candidates: int,
+) -> tuple[Any, LmLog]:
+    """Draws candidates concurrently and returns the first valid one.
+
+    Candidate i uses the temperature the serial loop would use on attempt i.
+    Batches are drawn until max(RETRIES, num_candidates) samples were tried.
+    The log's usage covers every sample finished when the winner is returned;
+    samples still at the model are not waited for and are counted in
+    usage.LATE_USAGE once they finish.
+    """
+    raw_responses = []
+    usage = []
+    attempts = max(RETRIES, num_candidates)
+    pool = _get_candidate_pool()
+    index = 0
+    while index < attempts:
+        futures = {}
+        for _ in range(min(num_candidates, attempts - index)):
+            futures[
+                pool.submit(
+                    _sample,
+                    prompt,
+                    response_schema,
+                    model,
+                    min(1.0, temperature + 0.2 * index),
+                    allowed_values,
+                    result_key,
+                )
+            ] = index
+            index += 1
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            ordered = sorted(done, key=futures.get)
+            for i, future in enumerate(ordered):
+                valid, result, log, call_usage = future.result()
+                if call_usage is not None:
+                    usage.append(call_usage)
+                if valid:
+                    # Other samples are ignored. Finished ones are logged with
+                    # the winner, queued ones are cancelled, and the log is
+                    # never touched after it is returned.
+                    for other in ordered[i + 1:]:
+                        other_usage = other.result()[3]
+                        if other_usage is not None:
+                            usage.append(other_usage)
+                    for other in pending:
+                        if not other.cancel():
+                            other.add_done_callback(_record_late_usage)
+                    log.candidate = futures[future]
+                    log.usage = usage
+                    return result, log
+                raw_responses.append(log)
+
+    return None, LmLog(
+        prompt=prompt,
+        raw_resp="-------".join(map(str, raw_responses)),
+        result=None,
+        usage=usage,
     )
@@ -0,0 +1,76 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from unittest import mock
+
+from absl.testing import absltest
+from werewolf import apis
+from werewolf import lm
+from werewolf import usage
+from werewolf.usage import Usage
+
+
+class CandidatesTest(absltest.TestCase):
+
+  def test_winner_is_returned_before_slow_candidates_finish(self):
+    slow_started = threading.Event()
+    release = threading.Event()
+    slow_done = threading.Event()
+    late = usage.LateUsage()
+
+    def fake_generate(model, prompt, temperature, **kwargs):
+      del prompt, kwargs
+      if temperature > 0.5:  # candidate 1: slow and wrong
+        slow_started.set()
+        release.wait(10)
+        slow_done.set()
+        return '{"vote": "Nobody"}', Usage("fake", model, 10, 7, 9.0)
+      slow_started.wait(10)  # both samples are at the "model"
+      return '{"vote": "Ann"}', Usage("fake", model, 10, 3, 0.1)
+
+    self.enter_context(
+        mock.patch.object(apis, "generate_with_usage", fake_generate)
+    )
+    self.enter_context(mock.patch.object(lm, "LATE_USAGE", late))
+    start = time.monotonic()
+    result, log = lm.generate(
+        "Vote for {{name}}",
+        {},
+        {"name": "Bob"},
+        model="fake-lm",
+        temperature=0.5,
+        allowed_values=["Ann", "Bob"],
+        result_key="vote",
+        num_candidates=2,
+    )
+    self.assertLess(time.monotonic() - start, 5)
+    self.assertFalse(slow_done.is_set())
+    self.assertEqual(result, "Ann")
+    self.assertEqual(log.candidate, 0)
+    self.assertEqual([record["output_tokens"] for record in log.usage], [3])
+
+    release.set()
+    for _ in range(100):
+      if late.summary()["total"]["calls"]:
+        break
+      time.sleep(0.05)
+    self.assertEqual(late.summary()["total"]["output_tokens"], 7)
+    # The returned log is not touched by the late sample.
+    self.assertLen(log.usage, 1)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -15,15 +15,30 @@
 import datetime
 import json
 import os
-from typing import List, Tuple
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
 
-from werewolf.model import RoundLog, State, to_dict
+from werewolf import prompt_store
+from werewolf import usage
+from werewolf.model import GameView, Round, RoundLog, State, to_dict, to_json
+from werewolf.prompt_store import PromptStore
 
+CHECKPOINT_FILE = "checkpoints.jsonl"
+USAGE_FILE = "usage.json"
+_READ_CHUNK = 1 << 20
 
-def log_directory() -> str:
+
+def log_directory(tag: Optional[str] = None) -> str:
+    """Returns a log directory for a new game.
+
+    Args:
+      tag: Appended to the session id so that games started within the same
+        second (e.g. parallel eval games) get distinct directories.
+    """
     pacific_timezone = datetime.timezone(datetime.timedelta(hours=-8))
     timestamp = datetime.datetime.now(pacific_timezone).strftime("%Y%m%d_%H%M%S")
     session_id = f"session_{timestamp}"
+    if tag:
+        session_id = f"{session_id}_{tag}"
     directory = f"{os.getcwd()}/logs/{session_id}"
     return directory
 
@@ -51,25 +66,41 @@ def load_game(directory: str) -> Tuple[State, List[RoundLog]]:
 
     state = State.from_json(partial_game_data)
 
-    with open(log_file, "r") as file:
-        logs = json.load(file)
+    # Logs saved with a prompt store reference prompts in prompts.json.
+    store = None
+    store_file = f"{directory}/{prompt_store.PROMPT_STORE_FILE}"
+    if os.path.exists(store_file):
+        store = prompt_store.load(store_file)
 
-    logs = [RoundLog.from_json(log) for log in logs]
+    with open(log_file, "r") as file:
+        logs = [
+            RoundLog.from_json(store.expand(log) if store else log)
+            for log in iter_json_array(file)
+        ]
 
     return (state, logs)
 
 
-def save_game(state: State, logs: List[RoundLog], directory: str):
+def save_game(
+    state: State,
+    logs: List[RoundLog],
+    directory: str,
+    checkpointer: Optional["Checkpointer"] = None,
+):
     """Save the current game state to a specified file.
 
     This function serializes the game state to JSON and writes it to the
     specified file. If an error message is provided, it adds the error
-    message to the current round of the game state before saving.
+    message to the current round of the game state before saving. A summary
+    of the model usage in the logs is written to usage.json.
 
     Args:
       state: Instance of the `State` class.
       logs: Logs of the  game.
       directory: where to save the game.
+      checkpointer: If given, round logs it already serialized are reused
+        instead of being encoded again, and its prompt store (if any) is
+        written to prompts.json.
     """
     os.makedirs(directory, exist_ok=True)
 
@@ -85,7 +116,264 @@ def save_game(state: State, logs: List[RoundLog], directory: str):
     log_file = f"{directory}/game_logs.json"
 
     with open(game_file, "w") as file:
-        json.dump(state.to_dict(), file, indent=4)
+        file.write(to_json(state))
 
     with open(log_file, "w") as file:
-        json.dump(to_dict(logs), file, indent=4)
+        if checkpointer is not None:
+            checkpointer.write_logs(logs, file)
+        else:
+            write_json_array((to_json(log) for log in logs), file)
+
+    if checkpointer is not None and checkpointer.prompt_store is not None:
+        store_file = f"{directory}/{prompt_store.PROMPT_STORE_FILE}"
+        with open(store_file, "w") as file:
+            json.dump(checkpointer.prompt_store.to_dict(), file)
+
+    with open(f"{directory}/{USAGE_FILE}", "w") as file:
+        json.dump(usage.summarize(logs), file, indent=2)
+
+
+def load_usage(directory: str) -> Dict[str, Any]:
+    """Returns the usage summary saved with a game, or {} if there is none."""
+    path = f"{directory}/{USAGE_FILE}"
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def write_json_array(fragments: Iterable[str], file: IO[str]) -> None:
+    """Writes already-encoded JSON values as one array, one per line."""
+    file.write("[")
+    for i, fragment in enumerate(fragments):
+        file.write(",\n" if i else "\n")
+        file.write(fragment)
+    file.write("\n]")
+
+
+def iter_json_array(file: IO[str]) -> Iterator[Any]:
+    """Yields the elements of a top-level JSON array of objects/arrays.
+
+    Reads the file in chunks and decodes one element at a time, so the whole
+    document is never held as a single parsed object.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(_READ_CHUNK).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array.")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Element is incomplete: read at least as much again.
+            chunk = file.read(max(_READ_CHUNK, len(buffer) - pos))
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield value
+        pos = end
+
+
+class Checkpointer:
+    """Append-only stream of per-round checkpoints in a game directory.
+
+    `checkpoints.jsonl` starts with a header holding the full state (and any
+    earlier round logs, for games resumed from an older save). Every completed
+    round appends one line with that round, the winner, each player's new
+    observations and other per-player fields, and the round log. A crash
+    loses at most the round in progress, and `load_checkpoints()` rebuilds
+    the game by replaying the lines.
+
+    With a `PromptStore`, LmLog prompts are written as `prompt_ref`s and each
+    line carries the prompt chunks first seen in it under "prompts".
+    """
+
+    def __init__(self, directory: str, prompt_store: Optional[PromptStore] = None):
+        self.directory = directory
+        self.path = os.path.join(directory, CHECKPOINT_FILE)
+        self.prompt_store = prompt_store
+        self._encode = prompt_store.encode if prompt_store else to_json
+        # Serialized round logs, reused for the final game_logs.json.
+        self._log_fragments: List[str] = []
+        self._observations_seen: Dict[str, int] = {}
+
+    def start(self, state: State, logs: List[RoundLog]) -> None:
+        """Writes the header for a new (or newly checkpointed) game."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._log_fragments = [self._encode(log) for log in logs]
+        header = (
+            '{"type": "header", "state": '
+            + to_json(state)
+            + ', "logs": ['
+            + ", ".join(self._log_fragments)
+            + "]"
+            + self._prompts_field()
+            + "}"
+        )
+        with open(self.path, "w") as file:
+            file.write(header + "\n")
+        self._mark_observations(state)
+
+    def resume(self, state: State, logs: List[RoundLog]) -> None:
+        """Continues the stream of a game loaded with load_checkpoints()."""
+        # With a store filled by load_checkpoints() every prompt is known
+        # already; otherwise (a stream written without one) the prompts are
+        # emitted with the next round.
+        _repair_last_line(self.path)
+        self._log_fragments = [self._encode(log) for log in logs]
+        self._mark_observations(state)
+
+    def _prompts_field(self) -> str:
+        if self.prompt_store is None:
+            return ""
+        return ', "prompts": ' + json.dumps(self.prompt_store.drain_new())
+
+    def _mark_observations(self, state: State) -> None:
+        self._observations_seen = {
+            name: len(player.observations)
+            for name, player in state.players.items()
+        }
+
+    def write_round(self, state: State, log: RoundLog, round_number: int) -> None:
+        """Appends the checkpoint for a completed round."""
+        players = {}
+        for name, player in state.players.items():
+            data = to_dict(player)
+            observations = data.pop("observations")
+            data["new_observations"] = observations[
+                self._observations_seen.get(name, 0):
+            ]
+            self._observations_seen[name] = len(observations)
+            players[name] = data
+        delta = {
+            "round": to_dict(state.rounds[round_number]),
+            "winner": state.winner,
+            "players": players,
+        }
+        log_json = self._encode(log)
+        line = (
+            f'{{"type": "round", "round": {round_number}, "state": '
+            + json.dumps(delta)
+            + ', "log": '
+            + log_json
+            + self._prompts_field()
+            + "}"
+        )
+        with open(self.path, "a") as file:
+            file.write(line + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self._log_fragments.append(log_json)
+
+    def write_logs(self, logs: List[RoundLog], file) -> None:
+        """Writes game_logs.json from the stored fragments.
+
+        Logs past the last checkpoint (e.g. a failed round) are encoded here.
+        """
+        fragments = self._log_fragments[: len(logs)]
+        fragments += [self._encode(log) for log in logs[len(fragments):]]
+        write_json_array(fragments, file)
+
+
+def _repair_last_line(path: str) -> None:
+    """Makes a checkpoint stream end on a complete line before appending.
+
+    A crash mid-write can leave a partial last line, which load_checkpoints()
+    skips. It is cut off here so the next round does not extend it into a
+    line that later loads reject; a complete last line missing only its
+    newline (which load_checkpoints() keeps) gets the newline.
+    """
+    with open(path, "rb+") as file:
+        end = file.seek(0, os.SEEK_END)
+        pos = end
+        tail = b""
+        while pos > 0:
+            step = min(_READ_CHUNK, pos)
+            pos -= step
+            file.seek(pos)
+            tail = file.read(step) + tail
+            cut = tail.rfind(b"\n")
+            if cut >= 0:
+                pos += cut + 1
+                tail = tail[cut + 1:]
+                break
+        if not tail:
+            return
+        try:
+            json.loads(tail)
+        except ValueError:
+            file.truncate(pos)
+        else:
+            file.seek(end)
+            file.write(b"\n")
+
+
+def load_checkpoints(
+    directory: str, prompt_store: Optional[PromptStore] = None
+) -> Tuple[State, List[RoundLog]]:
+    """Rebuilds a game from its checkpoint stream.
+
+    Returns the state and logs as of the last completed round. A partially
+    written last line (from a crash mid-write) is ignored.
+
+    Args:
+      directory: where the checkpoints are stored.
+      prompt_store: Filled with the prompts in the stream, so a Checkpointer
+        that continues the stream numbers new prompts consistently.
+    """
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    with open(path, "r") as file:
+        lines = file.read().splitlines()
+
+    records: List[Dict[str, Any]] = []
+    for i, line in enumerate(lines):
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            if i == len(lines) - 1:
+                break
+            raise
+
+    store = prompt_store if prompt_store is not None else PromptStore()
+    header = records[0]
+    store.update(header.get("prompts", {}))
+    state = State.from_json(header["state"])
+    logs = [
+        RoundLog.from_json(store.expand(log)) for log in header.get("logs", [])
+    ]
+    for player in state.players.values():
+        _apply_player_fields(player, {"gamestate": player.gamestate})
+
+    for record in records[1:]:
+        delta = record["state"]
+        state.rounds.append(Round.from_json(delta["round"]))
+        state.winner = delta.get("winner", "")
+        for name, fields in delta["players"].items():
+            player = state.players[name]
+            player.observations.extend(fields.get("new_observations", []))
+            _apply_player_fields(player, fields)
+        store.update(record.get("prompts", {}))
+        logs.append(RoundLog.from_json(store.expand(record["log"])))
+    store.drain_new()
+
+    return state, logs
+
+
+def _apply_player_fields(player, fields: Dict[str, Any]) -> None:
+    gamestate = fields.get("gamestate")
+    player.gamestate = (
+        GameView.from_json(gamestate) if isinstance(gamestate, dict) else gamestate
+    )
+    if "bidding_rationale" in fields:
+        player.bidding_rationale = fields["bidding_rationale"]
+    if "previously_unmasked" in fields:
+        player.previously_unmasked = fields["previously_unmasked"]
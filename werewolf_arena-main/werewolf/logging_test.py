@@ -0,0 +1,168 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+
+from absl.testing import absltest
+from werewolf import logging
+from werewolf import prompt_store
+from werewolf.lm import LmLog
+from werewolf.model import Doctor, Round, RoundLog, Seer, State, Villager, Werewolf
+
+
+def _new_state() -> State:
+  return State(
+      session_id="test",
+      seer=Seer(name="Sam"),
+      doctor=Doctor(name="Dana"),
+      villagers=[Villager(name="Vic")],
+      werewolves=[Werewolf(name="Wes")],
+      seed=7,
+  )
+
+
+def _play_round(
+    state: State, checkpointer: logging.Checkpointer, prompt: str = "Vote."
+) -> None:
+  round_ = Round()
+  round_.players = list(state.players)
+  round_.exiled = "Vic"
+  round_.success = True
+  state.rounds.append(round_)
+  state.players["Sam"].observations.append(f"Round {len(state.rounds)}.")
+  log = RoundLog()
+  log.eliminate = LmLog(prompt=prompt, raw_resp="{}", result={})
+  checkpointer.write_round(state, log, len(state.rounds) - 1)
+
+
+def _crash_mid_write(path: str) -> None:
+  with open(path, "a") as file:
+    file.write('{"type": "round", "round": 9, "sta')
+
+
+class CheckpointerTest(absltest.TestCase):
+
+  def test_resume_after_repeated_crashes(self):
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    state = _new_state()
+    checkpointer = logging.Checkpointer(directory)
+    checkpointer.start(state, [])
+    _play_round(state, checkpointer)
+    _crash_mid_write(checkpointer.path)
+
+    state, logs = logging.load_checkpoints(directory)
+    self.assertLen(state.rounds, 1)
+    checkpointer = logging.Checkpointer(directory)
+    checkpointer.resume(state, logs)
+    _play_round(state, checkpointer)
+    _crash_mid_write(checkpointer.path)
+
+    state, logs = logging.load_checkpoints(directory)
+    checkpointer = logging.Checkpointer(directory)
+    checkpointer.resume(state, logs)
+    _play_round(state, checkpointer)
+
+    state, logs = logging.load_checkpoints(directory)
+    self.assertLen(state.rounds, 3)
+    self.assertLen(logs, 3)
+    self.assertEqual(
+        state.players["Sam"].observations,
+        ["Round 1.", "Round 2.", "Round 3."],
+    )
+
+  def test_resume_keeps_a_complete_line_missing_its_newline(self):
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    state = _new_state()
+    checkpointer = logging.Checkpointer(directory)
+    checkpointer.start(state, [])
+    _play_round(state, checkpointer)
+    with open(checkpointer.path, "rb+") as file:
+      file.truncate(os.path.getsize(checkpointer.path) - 1)
+
+    state, logs = logging.load_checkpoints(directory)
+    checkpointer = logging.Checkpointer(directory)
+    checkpointer.resume(state, logs)
+    _play_round(state, checkpointer)
+
+    state, _ = logging.load_checkpoints(directory)
+    self.assertLen(state.rounds, 2)
+
+
+class PromptStoreTest(absltest.TestCase):
+
+  def test_put_get_round_trip(self):
+    store = prompt_store.PromptStore()
+    prompts = [
+        "Rules.\n\nState: day 1\nAlive: Sam\n\nVote.",
+        "Rules.\n\nState: day 2\nAlive: Sam\n\nVote.",
+        "",
+        "\n\n",
+        "Rules.\n\n\n\n\nVote.\n",
+        "\nRules.\n\n\n\nState: day 1\nAlive: Sam",
+    ]
+    refs = [store.put(prompt) for prompt in prompts]
+    for prompt, ref in zip(prompts, refs):
+      self.assertEqual(store.get(ref), prompt)
+    self.assertEqual(refs[1][0], refs[0][0])
+    self.assertEqual(refs[1][2], refs[0][2])
+
+    reloaded = prompt_store.PromptStore()
+    reloaded.update(store.to_dict())
+    for prompt, ref in zip(prompts, refs):
+      self.assertEqual(reloaded.get(ref), prompt)
+
+  def test_update_rejects_out_of_order_payloads(self):
+    store = prompt_store.PromptStore()
+    store.put("Rules.\n\nDay 1.")
+    first = store.drain_new()
+    store.put("Rules.\n\nDay 2.")
+    second = store.drain_new()
+
+    copy = prompt_store.PromptStore()
+    with self.assertRaises(ValueError):
+      copy.update(second)
+    copy.update(first)
+    with self.assertRaises(ValueError):
+      copy.update(first)
+    copy.update(second)
+    self.assertEqual(copy.to_dict(), store.to_dict())
+
+  def test_resumed_stream_continues_prompt_ids_after_torn_line(self):
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    state = _new_state()
+    store = prompt_store.PromptStore()
+    checkpointer = logging.Checkpointer(directory, store)
+    checkpointer.start(state, [])
+    _play_round(state, checkpointer, "Rules.\n\nDay 1.")
+    ids_before_crash = store.to_dict()
+    _crash_mid_write(checkpointer.path)
+
+    store = prompt_store.PromptStore()
+    state, logs = logging.load_checkpoints(directory, store)
+    self.assertEqual(store.to_dict(), ids_before_crash)
+    checkpointer = logging.Checkpointer(directory, store)
+    checkpointer.resume(state, logs)
+    _play_round(state, checkpointer, "Rules.\n\nDay 2.")
+    self.assertEqual(store.put("Rules.\n\nDay 2."), [0, 2])
+
+    _, logs = logging.load_checkpoints(directory)
+    self.assertEqual(
+        [log.eliminate.prompt for log in logs],
+        ["Rules.\n\nDay 1.", "Rules.\n\nDay 2."],
+    )
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -15,13 +15,18 @@
 import enum
 import json
 import random
+import re
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+from werewolf import config
 from werewolf.lm import LmLog, generate
+from werewolf.limiter import estimate_tokens
 from werewolf.prompts import ACTION_PROMPTS_AND_SCHEMAS
 from werewolf.utils import Deserializable
 from werewolf.config import  MAX_DEBATE_TURNS, NUM_PLAYERS
 
+BID_OPTIONS = ["0", "1", "2", "3", "4"]
+
 # Role names
 VILLAGER = "Villager"
 WEREWOLF = "Werewolf"
@@ -55,6 +60,102 @@ def group_and_format_observations(observations):
   return formatted_obs
 
 
+_FIRST_SENTENCE = re.compile(r"^(.*?[.!?])(?:\s|$)")
+
+
+def condense_observation(obs_text: str) -> str:
+  """Shortens an observation to its key fact for a condensed round.
+
+  Summaries keep their first sentence; other observations (announcements,
+  votes, night actions) are already one fact and are kept as they are.
+  """
+  if not obs_text.startswith("Summary: "):
+    return obs_text
+  match = _FIRST_SENTENCE.match(obs_text)
+  return match.group(1) if match else obs_text
+
+
+class ObservationFormatter:
+  """Incremental version of group_and_format_observations for one player.
+
+  Observations are only ever appended, so each call parses just the new
+  entries and re-formats only the rounds they touched. If the list is
+  replaced or shrinks (e.g. when resuming a game) it starts over.
+
+  With a token budget, rounds are taken newest first and kept verbatim while
+  they fit; from the first one that does not, that round and every older one
+  are condensed (see condense_observation). The `recent_rounds` latest rounds
+  are always verbatim. Condensed rounds are built once and cached, since a
+  round gets no new observations once the next one starts.
+  """
+
+  def __init__(self):
+    self._source: Optional[List[str]] = None
+    self._count = 0
+    self._grouped: Dict[int, List[str]] = {}
+    self._formatted: Dict[int, str] = {}
+    self._condensed: Dict[int, str] = {}
+    self._tokens: Dict[int, int] = {}
+
+  def format(
+      self,
+      observations: List[str],
+      budget: Optional[int] = None,
+      recent_rounds: int = 1,
+  ) -> List[str]:
+    if observations is not self._source or len(observations) < self._count:
+      self._source = observations
+      self._count = 0
+      self._grouped = {}
+      self._formatted = {}
+      self._condensed = {}
+      self._tokens = {}
+
+    touched = set()
+    for obs in observations[self._count:]:
+      round_num = int(obs.split(":", 1)[0].split()[1])
+      obs_text = obs.split(":", 1)[1].strip().replace('"', "")
+      self._grouped.setdefault(round_num, []).append(obs_text)
+      touched.add(round_num)
+    self._count = len(observations)
+
+    for round_num in touched:
+      formatted_round = f"Round {round_num}:\n"
+      formatted_round += "\n".join(
+          f"   - {obs}" for obs in self._grouped[round_num]
+      )
+      self._formatted[round_num] = formatted_round
+      self._tokens[round_num] = estimate_tokens(formatted_round)
+      self._condensed.pop(round_num, None)
+
+    rounds = sorted(self._formatted)
+    if budget is None:
+      return [self._formatted[r] for r in rounds]
+
+    result = []
+    spent = 0
+    condensing = False
+    for i, round_num in enumerate(reversed(rounds)):
+      if not condensing and i >= recent_rounds:
+        condensing = spent + self._tokens[round_num] > budget
+      if condensing:
+        result.append(self._condense(round_num))
+      else:
+        result.append(self._formatted[round_num])
+        spent += self._tokens[round_num]
+    return result[::-1]
+
+  def _condense(self, round_num: int) -> str:
+    condensed = self._condensed.get(round_num)
+    if condensed is None:
+      condensed = f"Round {round_num} (condensed):\n" + "\n".join(
+          f"   - {condense_observation(obs)}"
+          for obs in self._grouped[round_num]
+      )
+      self._condensed[round_num] = condensed
+    return condensed
+
+
 # JSON serializer that works for nested classes
 class JsonEncoder(json.JSONEncoder):
 
@@ -63,10 +164,47 @@ class JsonEncoder(json.JSONEncoder):
       return o.value
     if isinstance(o, set):
       return list(o)
-    return o.__dict__
+    # Underscore attributes are in-memory caches, not game state.
+    return {k: v for k, v in o.__dict__.items() if not k.startswith("_")}
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _json_key(key: Any) -> str:
+  """Converts a dict key the way json.dumps does."""
+  if isinstance(key, str):
+    return key
+  if key is True:
+    return "true"
+  if key is False:
+    return "false"
+  if key is None:
+    return "null"
+  if isinstance(key, enum.Enum):
+    key = key.value
+  if isinstance(key, float):
+    return float.__repr__(key)
+  return str(key)
+
 
 def to_dict(o: Any) -> Union[Dict[str, Any], List[Any], Any]:
-  return json.loads(JsonEncoder().encode(o))
+  """Returns the JSON-compatible form of `o` in one pass.
+
+  Equivalent to json.loads(JsonEncoder().encode(o)) without building and
+  re-parsing the intermediate string.
+  """
+  if isinstance(o, _JSON_SCALARS):
+    return o
+  if isinstance(o, dict):
+    return {_json_key(k): to_dict(v) for k, v in o.items()}
+  if isinstance(o, (list, tuple)):
+    return [to_dict(v) for v in o]
+  return to_dict(JsonEncoder().default(o))
+
+
+def to_json(o: Any) -> str:
+  """Encodes `o` directly to a compact JSON string (C encoder)."""
+  return JsonEncoder().encode(o)
 
 class GameView:
   """Represents the state of the game for each player."""
@@ -104,7 +242,13 @@ class GameView:
 
   @classmethod
   def from_json(cls, data: Dict[Any, Any]):
-    return cls(**data)
+    o = cls(
+        round_number=data["round_number"],
+        current_players=data["current_players"],
+        other_wolf=data.get("other_wolf", None),
+    )
+    o.debate = [tuple(turn) for turn in data.get("debate", [])]
+    return o
 
 
 class Player(Deserializable):
@@ -116,6 +260,7 @@ class Player(Deserializable):
       role: str,
       model: Optional[str] = None,
       personality: Optional[str] = "",
+      rng: Optional[random.Random] = None,
   ):
     self.name = name
     self.role = role
@@ -124,6 +269,10 @@ class Player(Deserializable):
     self.observations: List[str] = []
     self.bidding_rationale = ""
     self.gamestate: Optional[GameView] = None
+    self._observation_formatter = ObservationFormatter()
+    self._player_order: Optional[Tuple[Tuple[str, ...], List[str]]] = None
+    # Per-player RNG for option shuffles; the global module if not seeded.
+    self._rng = rng if rng is not None else random
 
   def initialize_game_view(
       self, round_number, current_players, other_wolf=None
@@ -145,18 +294,34 @@ class Player(Deserializable):
     """Adds the current game announcement to the player's observations."""
     self._add_observation(f"Moderator Announcement: {announcement}")
 
-  def _get_game_state(self) -> Dict[str, Any]:
-    """Gets the current game state from the player's perspective."""
+  def _get_game_state(self, action: Optional[str] = None) -> Dict[str, Any]:
+    """Gets the current game state from the player's perspective.
+
+    Args:
+      action: The action the state is for; selects its observation budget in
+        config.CONTEXT_BUDGETS.
+    """
     if not self.gamestate:
       raise ValueError(
           "GameView not initialized. Call initialize_game_view() first."
       )
 
-    remaining_players = [
-        f"{player} (You)" if player == self.name else player
-        for player in self.gamestate.current_players
-    ]
-    random.shuffle(remaining_players)
+    # Shuffled on every prompt so no player sits in a fixed list position
+    # (position bias). config.STABLE_PLAYER_ORDER keeps one order per roster
+    # instead, trading that mitigation for longer shared prompt prefixes.
+    roster = tuple(self.gamestate.current_players)
+    if (
+        not config.STABLE_PLAYER_ORDER
+        or self._player_order is None
+        or self._player_order[0] != roster
+    ):
+      order = [
+          f"{player} (You)" if player == self.name else player
+          for player in roster
+      ]
+      self._rng.shuffle(order)
+      self._player_order = (roster, order)
+    remaining_players = self._player_order[1]
     formatted_debate = [
         f"{author} (You): {dialogue}"
         if author == self.name
@@ -164,7 +329,11 @@ class Player(Deserializable):
         for author, dialogue in self.gamestate.debate
     ]
 
-    formatted_observations = group_and_format_observations(self.observations)
+    formatted_observations = self._observation_formatter.format(
+        self.observations,
+        budget=config.CONTEXT_BUDGETS.get(action),
+        recent_rounds=config.CONTEXT_RECENT_ROUNDS,
+    )
 
     return {
         "name": self.name,
@@ -184,9 +353,21 @@ class Player(Deserializable):
       self,
       action: str,
       options: Optional[List[str]] = None,
+      game_state: Optional[Dict[str, Any]] = None,
   ) -> tuple[Any | None, LmLog]:
-    """Helper function to generate player actions."""
-    game_state = self._get_game_state()
+    """Helper function to generate player actions.
+
+    Args:
+      action: Key into ACTION_PROMPTS_AND_SCHEMAS.
+      options: Allowed values for the result, if any.
+      game_state: A snapshot from _get_game_state() to use instead of the
+        current view, e.g. for calls that run after the view has moved on.
+    """
+    game_state = (
+        dict(game_state)
+        if game_state is not None
+        else self._get_game_state(action)
+    )
     if options:
       game_state["options"] = (", ").join(options)
     prompt_template, response_schema = ACTION_PROMPTS_AND_SCHEMAS[action]
@@ -210,8 +391,8 @@ class Player(Deserializable):
         result_key=result_key,
     )
 
-  def vote(self) -> tuple[str | None, LmLog]:
-    """Vote for a player."""
+  def vote_options(self) -> List[str]:
+    """Returns the players this player may vote for, in shuffled order."""
     if not self.gamestate:
       raise ValueError(
           "GameView not initialized. Call initialize_game_view() first."
@@ -221,22 +402,63 @@ class Player(Deserializable):
         for player in self.gamestate.current_players
         if player != self.name
     ]
-    random.shuffle(options)
-    vote, log = self._generate_action("vote", options)
-    if vote is not None and len(self.gamestate.debate) == MAX_DEBATE_TURNS:
+    self._rng.shuffle(options)
+    return options
+
+  def vote(
+      self,
+      game_state: Optional[Dict[str, Any]] = None,
+      options: Optional[List[str]] = None,
+  ) -> tuple[str | None, LmLog]:
+    """Vote for a player.
+
+    Args:
+      game_state: Optional snapshot of this player's view to vote from.
+      options: Optional output of vote_options() taken with the snapshot.
+    """
+    if not self.gamestate:
+      raise ValueError(
+          "GameView not initialized. Call initialize_game_view() first."
+      )
+    if options is None:
+      options = self.vote_options()
+    vote, log = self._generate_action("vote", options, game_state)
+    debate = (
+        game_state["debate"] if game_state is not None else self.gamestate.debate
+    )
+    if vote is not None and len(debate) == MAX_DEBATE_TURNS:
       self._add_observation(
           f"After the debate, I voted to remove {vote} from the game."
       )
     return vote, log
 
-  def bid(self) -> tuple[int | None, LmLog]:
-    """Place a bid."""
-    bid, log = self._generate_action("bid", options=["0", "1", "2", "3", "4"])
+  def bid_snapshot(self) -> Dict[str, Any]:
+    """Snapshot of this player's current view, for a bid placed later."""
+    state = self._get_game_state("bid")
+    state["options"] = ", ".join(BID_OPTIONS)
+    return state
+
+  def bid(
+      self, game_state: Optional[Dict[str, Any]] = None
+  ) -> tuple[int | None, LmLog]:
+    """Place a bid.
+
+    Args:
+      game_state: Optional snapshot (see bid_snapshot()) to bid from. The
+        bidding rationale is then left unchanged until the caller applies it
+        with adopt_bid(), since the bid runs while other prompts render.
+    """
+    bid, log = self._generate_action("bid", BID_OPTIONS, game_state)
     if bid is not None:
       bid = int(bid)
-      self.bidding_rationale = log.result.get("reasoning", "")
+      if game_state is None:
+        self.adopt_bid(log)
     return bid, log
 
+  def adopt_bid(self, log: LmLog) -> None:
+    """Takes a placed bid's reasoning as the player's bidding rationale."""
+    self.bidding_rationale = log.result.get("reasoning", "")
+
   def debate(self) -> tuple[str | None, LmLog]:
     """Engage in the debate."""
     result, log = self._generate_action("debate", [])
@@ -279,9 +501,10 @@ class Villager(Player):
       name: str,
       model: Optional[str] = None,
       personality: Optional[str] = None,
+      rng: Optional[random.Random] = None,
   ):
     super().__init__(
-        name=name, role=VILLAGER, model=model, personality=personality
+        name=name, role=VILLAGER, model=model, personality=personality, rng=rng
     )
 
   @classmethod
@@ -303,14 +526,15 @@ class Werewolf(Player):
       name: str,
       model: Optional[str] = None,
       personality: Optional[str] = None,
+      rng: Optional[random.Random] = None,
   ):
     super().__init__(
-        name=name, role=WEREWOLF, model=model, personality=personality
+        name=name, role=WEREWOLF, model=model, personality=personality, rng=rng
     )
 
-  def _get_game_state(self, **kwargs) -> Dict[str, Any]:
+  def _get_game_state(self, action: Optional[str] = None) -> Dict[str, Any]:
     """Gets the current game state, including werewolf-specific context."""
-    state = super()._get_game_state(**kwargs)
+    state = super()._get_game_state(action)
     state["werewolf_context"] = self._get_werewolf_context()
     return state
 
@@ -326,7 +550,7 @@ class Werewolf(Player):
         for player in self.gamestate.current_players
         if player != self.name and player != self.gamestate.other_wolf
     ]
-    random.shuffle(options)
+    self._rng.shuffle(options)
     eliminate, log = self._generate_action("remove", options)
     return eliminate, log
 
@@ -365,8 +589,11 @@ class Seer(Player):
       name: str,
       model: Optional[str] = None,
       personality: Optional[str] = None,
+      rng: Optional[random.Random] = None,
   ):
-    super().__init__(name=name, role=SEER, model=model, personality=personality)
+    super().__init__(
+        name=name, role=SEER, model=model, personality=personality, rng=rng
+    )
     self.previously_unmasked: Dict[str, str] = {}
 
   def unmask(self) -> tuple[str | None, LmLog]:
@@ -381,7 +608,7 @@ class Seer(Player):
         for player in self.gamestate.current_players
         if player != self.name and player not in self.previously_unmasked.keys()
     ]
-    random.shuffle(options)
+    self._rng.shuffle(options)
     return self._generate_action("investigate", options)
 
   def reveal_and_update(self, player, role):
@@ -410,9 +637,10 @@ class Doctor(Player):
       name: str,
       model: Optional[str] = None,
       personality: Optional[str] = None,
+      rng: Optional[random.Random] = None,
   ):
     super().__init__(
-        name=name, role=DOCTOR, model=model, personality=personality
+        name=name, role=DOCTOR, model=model, personality=personality, rng=rng
     )
 
   def save(self) -> tuple[str | None, LmLog]:
@@ -423,7 +651,7 @@ class Doctor(Player):
       )
 
     options = list(self.gamestate.current_players)
-    random.shuffle(options)
+    self._rng.shuffle(options)
     protected, log = self._generate_action("protect", options)
     if protected is not None:
       self._add_observation(f"During the night, I chose to protect {protected}")
@@ -503,6 +731,7 @@ class State(Deserializable):
     error_message: Contains an error message if the game failed during
       execution.
     winner: Villager or Werewolf
+    seed: Seed of the game's random number generator, if it was seeded.
 
   Methods:
     to_dict: Returns a dictionary representation of the game.
@@ -515,6 +744,7 @@ class State(Deserializable):
       doctor: Doctor,
       villagers: List[Villager],
       werewolves: List[Werewolf],
+      seed: Optional[int] = None,
   ):
     self.session_id: str = session_id
     self.seer: Seer = seer
@@ -530,6 +760,7 @@ class State(Deserializable):
     self.rounds: List[Round] = []
     self.error_message: str = ""
     self.winner: str = ""
+    self.seed: Optional[int] = seed
 
   def to_dict(self):
     return to_dict(self)
@@ -565,6 +796,7 @@ class State(Deserializable):
     o.rounds = rounds
     o.error_message = data.get("error_message", "")
     o.winner = data.get("winner", "")
+    o.seed = data.get("seed", None)
     return o
 
 
@@ -0,0 +1,107 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import random
+from unittest import mock
+
+from absl.testing import absltest
+from werewolf import config
+from werewolf import model
+from werewolf.lm import compile_template, format_prompt
+from werewolf.prompts import ACTION_PROMPTS_AND_SCHEMAS
+
+_PLAYERS = ["Sam", "Dana", "Vic", "Wes"]
+
+
+def _observations(rounds: int):
+  """Yields a few observations per round, including multi-sentence summaries."""
+  for round_num in range(rounds):
+    yield round_num, f'Moderator Announcement: "Vic" was removed in round {round_num}.'
+    yield round_num, f"Summary: Round {round_num} was tense. Wes pushed hard on Dana. I doubt him."
+    yield round_num, f"Wes voted for Dana, Dana voted for Wes ({round_num})."
+
+
+class ObservationFormatterTest(absltest.TestCase):
+
+  def test_no_budget_renders_byte_identical_prompts(self):
+    self.enter_context(
+        mock.patch.object(
+            config, "CONTEXT_BUDGETS", dict.fromkeys(config.CONTEXT_BUDGETS)
+        )
+    )
+    player = model.Villager(name="Sam", rng=random.Random(0))
+    for round_num, observation in _observations(4):
+      player.initialize_game_view(round_num, _PLAYERS)
+      player._add_observation(observation)
+      for action, (template, _) in ACTION_PROMPTS_AND_SCHEMAS.items():
+        state = player._get_game_state(action)
+        baseline = dict(
+            state,
+            observations=model.group_and_format_observations(
+                player.observations
+            ),
+        )
+        self.assertEqual(
+            format_prompt(template, state),
+            compile_template(template).render(baseline),
+        )
+
+  def test_recent_rounds_stay_verbatim_under_a_tiny_budget(self):
+    self.enter_context(mock.patch.object(config, "CONTEXT_RECENT_ROUNDS", 2))
+    self.enter_context(
+        mock.patch.dict(config.CONTEXT_BUDGETS, {"vote": 1})
+    )
+    player = model.Villager(name="Sam", rng=random.Random(0))
+    for round_num, observation in _observations(4):
+      player.initialize_game_view(round_num, _PLAYERS)
+      player._add_observation(observation)
+
+    verbatim = model.group_and_format_observations(player.observations)
+    observations = player._get_game_state("vote")["observations"]
+    self.assertEqual(observations[2:], verbatim[2:])
+    for round_num, condensed in enumerate(observations[:2]):
+      self.assertTrue(condensed.startswith(f"Round {round_num} (condensed):"))
+      self.assertIn(f"Summary: Round {round_num} was tense.\n", condensed)
+      self.assertNotIn("I doubt him", condensed)
+      self.assertIn(f"removed in round {round_num}.", condensed)
+    # Actions without a budget still see every round verbatim.
+    self.assertEqual(player._get_game_state("debate")["observations"], verbatim)
+
+  def test_condensed_rounds_are_computed_once(self):
+    condensed = collections.Counter()
+    condense = model.condense_observation
+
+    def counting_condense(obs_text):
+      condensed[obs_text] += 1
+      return condense(obs_text)
+
+    self.enter_context(
+        mock.patch.object(model, "condense_observation", counting_condense)
+    )
+    formatter = model.ObservationFormatter()
+    observations = []
+    for round_num, observation in _observations(5):
+      observations.append(f"Round {round_num}: {observation}")
+      formatter.format(observations, budget=1, recent_rounds=1)
+      formatter.format(observations, budget=1, recent_rounds=1)
+
+    # Rounds 0-3 were condensed, each observation exactly once, although
+    # every later call rendered them again.
+    self.assertLen(condensed, 12)
+    self.assertEqual(set(condensed.values()), {1})
+
+
+if __name__ == "__main__":
+  absltest.main()
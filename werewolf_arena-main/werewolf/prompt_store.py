@@ -0,0 +1,154 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed storage for the prompts in LmLogs.
+
+Prompts are split into paragraphs ("segments", separated by blank lines) and
+segments into lines ("chunks"). Each distinct chunk and segment is stored once,
+looked up by its content and numbered in the order it was first seen, and a
+logged prompt becomes the list of its segment ids:
+
+  prompts.json: {"chunks": [line, ...], "segments": [[chunk ids], ...]}
+  game_logs.json: {..., "prompt_ref": [segment ids], ...}
+
+Rules, game state and instructions repeat verbatim across calls and debate
+lines repeat across turns, so each is stored once per game.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from werewolf.lm import LmLog
+from werewolf.model import JsonEncoder
+
+PROMPT_STORE_FILE = "prompts.json"
+SEGMENT_SEPARATOR = "\n\n"
+CHUNK_SEPARATOR = "\n"
+
+
+class PromptStore:
+    """Deduplicating, append-only store for prompt text."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.segments: List[List[int]] = []
+        self._chunk_ids: Dict[str, int] = {}
+        self._segment_ids: Dict[str, int] = {}
+        self._segment_texts: List[str] = []
+        # Entries from these offsets on have not been drained yet.
+        self._drained_chunks = 0
+        self._drained_segments = 0
+
+    def put(self, prompt: str) -> List[int]:
+        """Stores `prompt` and returns its segment ids."""
+        refs = []
+        for segment in prompt.split(SEGMENT_SEPARATOR):
+            segment_id = self._segment_ids.get(segment)
+            if segment_id is None:
+                segment_id = self._add_segment(
+                    segment,
+                    [self._chunk_id(c) for c in segment.split(CHUNK_SEPARATOR)],
+                )
+            refs.append(segment_id)
+        return refs
+
+    def _chunk_id(self, chunk: str) -> int:
+        chunk_id = self._chunk_ids.get(chunk)
+        if chunk_id is None:
+            chunk_id = len(self.chunks)
+            self.chunks.append(chunk)
+            self._chunk_ids[chunk] = chunk_id
+        return chunk_id
+
+    def _add_segment(self, segment: str, chunk_ids: List[int]) -> int:
+        segment_id = len(self.segments)
+        self.segments.append(chunk_ids)
+        self._segment_texts.append(segment)
+        self._segment_ids.setdefault(segment, segment_id)
+        return segment_id
+
+    def get(self, refs: List[int]) -> str:
+        """Rebuilds the prompt stored under `refs`."""
+        return SEGMENT_SEPARATOR.join(self._segment_texts[s] for s in refs)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        """Appends a to_dict()/drain_new() payload.
+
+        Payloads must be applied in the order they were produced; "start"
+        offsets (present in drain_new() payloads) are checked against that.
+        """
+        chunk_start = data.get("chunk_start", len(self.chunks))
+        segment_start = data.get("segment_start", len(self.segments))
+        if (chunk_start, segment_start) != (len(self.chunks), len(self.segments)):
+            raise ValueError("Prompt store payload applied out of order.")
+        for chunk in data.get("chunks", []):
+            self._chunk_id(chunk)
+        for chunk_ids in data.get("segments", []):
+            segment = CHUNK_SEPARATOR.join(self.chunks[c] for c in chunk_ids)
+            self._add_segment(segment, chunk_ids)
+
+    def drain_new(self) -> Dict[str, Any]:
+        """Returns the entries added since the last drain."""
+        new = {
+            "chunk_start": self._drained_chunks,
+            "chunks": self.chunks[self._drained_chunks:],
+            "segment_start": self._drained_segments,
+            "segments": self.segments[self._drained_segments:],
+        }
+        self._drained_chunks = len(self.chunks)
+        self._drained_segments = len(self.segments)
+        return new
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"chunks": self.chunks, "segments": self.segments}
+
+    def encode(self, o: Any) -> str:
+        """JSON-encodes `o` with every LmLog prompt replaced by a prompt_ref."""
+        return _PromptRefEncoder(self).encode(o)
+
+    def expand(self, node: Any) -> Any:
+        """Replaces prompt_ref entries in decoded JSON with the prompt text."""
+        if isinstance(node, dict):
+            if "prompt_ref" in node:
+                node["prompt"] = self.get(node.pop("prompt_ref"))
+            for value in node.values():
+                self.expand(value)
+        elif isinstance(node, list):
+            for value in node:
+                self.expand(value)
+        return node
+
+
+class _PromptRefEncoder(JsonEncoder):
+
+    def __init__(self, store: PromptStore):
+        super().__init__()
+        self.store = store
+
+    def default(self, o):
+        if isinstance(o, LmLog):
+            data = dict(super().default(o))
+            prompt = data.pop("prompt", None)
+            if prompt is not None:
+                data["prompt_ref"] = self.store.put(prompt)
+            return data
+        return super().default(o)
+
+
+def load(path: str) -> PromptStore:
+    store = PromptStore()
+    with open(path, "r") as file:
+        store.update(json.load(file))
+    store.drain_new()
+    return store
@@ -12,19 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
 import random
 import traceback
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import itertools
 import pandas as pd
 import os
 import datetime
+import json
+import uuid
 
 from absl import flags
 import tqdm
 
+from werewolf import config
 from werewolf import logging
 from werewolf import game
+from werewolf import limiter
+from werewolf import fake_lm
+from werewolf import usage
 from werewolf.model import Doctor
 from werewolf.model import SEER
 from werewolf.model import Seer
@@ -33,6 +40,7 @@ from werewolf.model import Villager
 from werewolf.model import WEREWOLF
 from werewolf.model import Werewolf
 from werewolf.config import get_player_names
+from werewolf.prompt_store import PromptStore
 
 _RUN_GAME = flags.DEFINE_boolean("run", False, "Runs a single game.")
 _RESUME = flags.DEFINE_boolean("resume", False, "Resumes games.")
@@ -50,6 +58,55 @@ _ARENA = flags.DEFINE_boolean(
     "arena", False, "Only run games using different models for villagers and werewolves"
 )
 _THREADS = flags.DEFINE_integer("threads", 2, "Number of threads to run.")
+_SPECULATIVE_BIDS = flags.DEFINE_boolean(
+    "speculative_bids",
+    False,
+    "Request next-turn bids while the current speaker is talking.",
+)
+_PARALLEL_GAMES = flags.DEFINE_integer(
+    "parallel_games", 1, "Number of games to run concurrently (eval/resume)."
+)
+_SEED = flags.DEFINE_integer(
+    "seed",
+    None,
+    "Base seed; game i of a run uses seed + i. Drawn at random if unset.",
+)
+_CANDIDATES = flags.DEFINE_integer(
+    "candidates",
+    config.NUM_CANDIDATES,
+    "Samples requested at once for votes, bids and night actions; the first"
+    " valid one is used.",
+)
+_BACKGROUND_VOTES = flags.DEFINE_boolean(
+    "background_votes",
+    False,
+    "Run the per-turn synthetic votes concurrently with the debate.",
+)
+_CONTEXT_BUDGETS = flags.DEFINE_list(
+    "context_budgets",
+    [],
+    "Observation budgets in estimated tokens as action=tokens (e.g."
+    " bid=600,vote=1200, or all=800). Older rounds past the budget are"
+    " condensed.",
+)
+_FAKE_LATENCY_MS = flags.DEFINE_float(
+    "fake_latency_ms",
+    0.0,
+    "Simulated latency per call for the in-process `fake` model.",
+)
+_STABLE_PLAYER_ORDER = flags.DEFINE_boolean(
+    "stable_player_order",
+    config.STABLE_PLAYER_ORDER,
+    "Keep one shuffled order of remaining players per roster instead of"
+    " reshuffling per prompt: longer shared prompt prefixes, weaker"
+    " position-bias mitigation.",
+)
+_DEDUPE_PROMPTS = flags.DEFINE_boolean(
+    "dedupe_prompts",
+    True,
+    "Store each distinct prompt chunk once in prompts.json and reference it"
+    " from the logs.",
+)
 
 DEFAULT_WEREWOLF_MODELS = ["flash", "pro1.5"]
 DEFAULT_VILLAGER_MODELS = ["flash", "pro1.5"]
@@ -62,27 +119,70 @@ model_to_id = {
     "gpt4": "gpt-4-turbo-2024-04-09",
     "gpt4o": "gpt-4o-2024-05-13",
     "gpt3.5": "gpt-3.5-turbo-0125",
+    # OpenAI-compatible stand-in served by scripts/mock_model_server.py (set OPENAI_BASE_URL).
+    "mock": "gpt-mock",
+    # In-process backend from werewolf/fake_lm.py (see --fake_latency_ms).
+    "fake": "fake-lm",
 }
 
 
+def parse_context_budgets(entries: List[str]) -> dict[str, int]:
+    """Parses --context_budgets entries into config.CONTEXT_BUDGETS keys."""
+    budgets = {}
+    for entry in entries:
+        action, _, tokens = entry.partition("=")
+        actions = config.CONTEXT_BUDGETS if action == "all" else [action]
+        if action != "all" and action not in config.CONTEXT_BUDGETS:
+            raise ValueError(f"Unknown action in --context_budgets: {action}")
+        for name in actions:
+            budgets[name] = int(tokens)
+    return budgets
+
+
+def player_rng(seed: int, name: str, round_number: int = 0) -> random.Random:
+    """RNG for one player, independent of how other players use theirs."""
+    return random.Random(f"{seed}:{name}:{round_number}")
+
+
+def moderator_rng(seed: int, round_number: int = 0) -> random.Random:
+    """RNG for the GameMaster's own choices."""
+    return random.Random(f"{seed}:moderator:{round_number}")
+
+
 def initialize_players(
-    villager_model: str, werewolf_model: str
+    villager_model: str, werewolf_model: str, seed: Optional[int] = None
 ) -> Tuple[Seer, Doctor, List[Villager], List[Werewolf]]:
-    """Assigns roles to players and initializes their game view."""
+    """Assigns roles to players and initializes their game view.
+
+    If `seed` is given, names, roles and each player's choices are drawn from
+    RNGs derived from it; otherwise the global `random` module is used.
+    """
+
+    rng = random.Random(seed) if seed is not None else random
+    player_names = get_player_names(rng)
+    rng.shuffle(player_names)
 
-    player_names = get_player_names()
-    random.shuffle(player_names)
+    def _rng(name):
+        return player_rng(seed, name) if seed is not None else None
 
+    seer_name = player_names.pop()
     seer = Seer(
-        name=player_names.pop(),
+        name=seer_name,
         model=villager_model,
+        rng=_rng(seer_name),
         # personality="You are cunning.",
     )
-    doctor = Doctor(name=player_names.pop(), model=villager_model)
+    doctor_name = player_names.pop()
+    doctor = Doctor(name=doctor_name, model=villager_model, rng=_rng(doctor_name))
+    werewolf_names = [player_names.pop() for _ in range(2)]
     werewolves = [
-        Werewolf(name=player_names.pop(), model=werewolf_model) for _ in range(2)
+        Werewolf(name=name, model=werewolf_model, rng=_rng(name))
+        for name in werewolf_names
+    ]
+    villagers = [
+        Villager(name=name, model=villager_model, rng=_rng(name))
+        for name in player_names
     ]
-    villagers = [Villager(name=name, model=villager_model) for name in player_names]
 
     # Initialize game view for all players
     for player in [seer, doctor] + werewolves + villagers:
@@ -103,18 +203,41 @@ def initialize_players(
     return seer, doctor, villagers, werewolves
 
 
+def new_checkpointer(directory: str) -> logging.Checkpointer:
+    store = PromptStore() if _DEDUPE_PROMPTS.value else None
+    return logging.Checkpointer(directory, prompt_store=store)
+
+
 def resume_game(directory: str) -> bool:
-    state, logs = logging.load_game(directory)
+    checkpointer = new_checkpointer(directory)
+    from_checkpoints = os.path.exists(checkpointer.path)
+    if from_checkpoints:
+        # Checkpoints hold completed rounds only, with every player's view as
+        # it was at the end of the last one, so nothing needs rebuilding.
+        state, logs = logging.load_checkpoints(
+            directory, checkpointer.prompt_store
+        )
+    else:
+        state, logs = logging.load_game(directory)
 
-    # remove the failed round and resume from the beginning of that round.
-    last_round = state.rounds[-1]
-    if not last_round.success:
-        state.rounds.pop()
-        logs.pop()
+        # remove the failed round and resume from the beginning of that round.
+        last_round = state.rounds[-1]
+        if not last_round.success:
+            state.rounds.pop()
+            logs.pop()
     # Reset the error state
     state.error_message = ""
-
-    if not state.rounds:
+    # Games logged before seeding was added get a fresh seed.
+    if state.seed is None:
+        state.seed = random.SystemRandom().randrange(2**32)
+    # Re-seed per resumed round so a resume is reproducible on its own.
+    resume_round = len(state.rounds)
+    for p in state.players.values():
+        p._rng = player_rng(state.seed, p.name, resume_round)
+
+    if from_checkpoints:
+        checkpointer.resume(state, logs)
+    elif not state.rounds:
         werewolves = []
         for p in state.players.values():
             p.initialize_game_view(
@@ -168,13 +291,23 @@ def resume_game(directory: str) -> bool:
             werewolves[0].gamestate.other_wolf = werewolves[1].name
             werewolves[1].gamestate.other_wolf = werewolves[0].name
 
-    gm = game.GameMaster(state, num_threads=_THREADS.value)
+    if not from_checkpoints:
+        checkpointer.start(state, logs)
+
+    gm = game.GameMaster(
+        state,
+        num_threads=_THREADS.value,
+        speculative_bids=_SPECULATIVE_BIDS.value,
+        background_synthetic_votes=_BACKGROUND_VOTES.value,
+        rng=moderator_rng(state.seed, resume_round),
+        checkpointer=checkpointer,
+    )
     gm.logs = logs
     try:
         gm.run_game()
     except Exception as e:
         state.error_message = traceback.format_exc()
-    logging.save_game(state, gm.logs, directory)
+    logging.save_game(state, gm.logs, directory, checkpointer)
     return not state.error_message
 
 
@@ -182,18 +315,26 @@ def resume_games(directories: list[str]):
     successful_resumes = []
     failed_resumes = []
     invalid_resumes = []
-    for i in tqdm.tqdm(range(len(directories)), desc="Games"):
-        d = directories[i]
+
+    def _resume(d):
         try:
-            success = resume_game(d)
-            if success:
+            return resume_game(d), None
+        except Exception as e:
+            return False, e
+
+    with ThreadPoolExecutor(max_workers=_PARALLEL_GAMES.value) as executor:
+        outcomes = executor.map(_resume, directories)
+        for d, (success, error) in tqdm.tqdm(
+            zip(directories, outcomes), total=len(directories), desc="Games"
+        ):
+            if error is not None:
+                if "not found" in str(error):
+                    invalid_resumes.append(d)
+                print(f"Error encountered during resume: {error}")
+            elif success:
                 successful_resumes.append(d)
             else:
                 failed_resumes.append(d)
-        except Exception as e:
-            if "not found" in str(e):
-                invalid_resumes.append(d)
-            print(f"Error encountered during resume: {e}")
 
     print(
         f"Successful resumes: {successful_resumes}.\nFailed resumes:"
@@ -205,24 +346,46 @@ def resume_games(directories: list[str]):
 def run_game(
     werewolf_model: str,
     villager_model: str,
+    seed: Optional[int] = None,
 ) -> Tuple[str, str]:
     """Runs a single game of Werewolf.
 
+    Args:
+      werewolf_model: Model id for the werewolves.
+      villager_model: Model id for the villagers, seer and doctor.
+      seed: Seed for the game's RNGs. Drawn at random if None; it is stored
+        in the game state either way.
+
     Returns: (winner, log_dir)
     """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
     seer, doctor, villagers, werewolves = initialize_players(
-        villager_model, werewolf_model
+        villager_model, werewolf_model, seed=seed
+    )
+    # The random suffix keeps reruns of the same seed from sharing a directory.
+    log_directory = logging.log_directory(
+        tag=f"seed{seed}_{uuid.uuid4().hex[:6]}"
     )
-    session_id = "10"  # You might want to make this unique per game
     state = State(
         villagers=villagers,
         werewolves=werewolves,
         seer=seer,
         doctor=doctor,
-        session_id=session_id,
+        session_id=os.path.basename(log_directory),
+        seed=seed,
+    )
+    checkpointer = new_checkpointer(log_directory)
+    checkpointer.start(state, [])
+
+    gamemaster = game.GameMaster(
+        state,
+        num_threads=_THREADS.value,
+        speculative_bids=_SPECULATIVE_BIDS.value,
+        background_synthetic_votes=_BACKGROUND_VOTES.value,
+        rng=moderator_rng(seed),
+        checkpointer=checkpointer,
     )
-
-    gamemaster = game.GameMaster(state, num_threads=_THREADS.value)
     winner = None
     try:
         winner = gamemaster.run_game()
@@ -230,18 +393,24 @@ def run_game(
         state.error_message = traceback.format_exc()
         print(f"Error encountered during game: {e}")
 
-    log_directory = logging.log_directory()
-    logging.save_game(state, gamemaster.logs, log_directory)
+    logging.save_game(state, gamemaster.logs, log_directory, checkpointer)
     print(f"Game logs saved to: {log_directory}")
 
     return winner, log_directory
 
 
 def run() -> None:
+    config.NUM_CANDIDATES = _CANDIDATES.value
+    config.STABLE_PLAYER_ORDER = _STABLE_PLAYER_ORDER.value
+    config.CONTEXT_BUDGETS.update(parse_context_budgets(_CONTEXT_BUDGETS.value))
     villager_models = _VILLAGER_MODELS.value or DEFAULT_VILLAGER_MODELS
     werewolf_models = _WEREWOLF_MODELS.value or DEFAULT_WEREWOLF_MODELS
     v_ids = [model_to_id[m] for m in villager_models]
     w_ids = [model_to_id[m] for m in werewolf_models]
+    if any(m.startswith(fake_lm.MODEL_PREFIX) for m in v_ids + w_ids):
+        fake_lm.install(
+            seed=_SEED.value or 0, latency=_FAKE_LATENCY_MS.value / 1000
+        )
     model_combinations = list(itertools.product(v_ids, w_ids))
     if _RUN_GAME.value:
         villager_model, werewolf_model = model_combinations[0]
@@ -249,23 +418,44 @@ def run() -> None:
         run_game(
             werewolf_model=werewolf_model,
             villager_model=villager_model,
+            seed=_SEED.value,
         )
     elif _EVAL.value:
-        results = []
+        jobs = []
         for villager_model, werewolf_model in model_combinations:
             # only run games using different models in the arena mode
             if villager_model == werewolf_model and _ARENA.value:
                 continue
             print(
-                f"Running games with Villagers: {villager_model} and"
-                f" Werewolves:{werewolf_model}"
+                f"Queueing {_NUM_GAMES.value} games with Villagers:"
+                f" {villager_model} and Werewolves:{werewolf_model}"
             )
-            for _ in tqdm.tqdm(range(_NUM_GAMES.value), desc="Games"):
-                winner, log_dir = run_game(
-                    werewolf_model=werewolf_model,
-                    villager_model=villager_model,
-                )
-                results.append([villager_model, werewolf_model, winner, log_dir])
+            jobs.extend(
+                [(villager_model, werewolf_model)] * _NUM_GAMES.value
+            )
+
+        base_seed = _SEED.value
+        if base_seed is None:
+            base_seed = random.SystemRandom().randrange(2**32)
+
+        def _play(job):
+            index, (villager_model, werewolf_model) = job
+            winner, log_dir = run_game(
+                werewolf_model=werewolf_model,
+                villager_model=villager_model,
+                seed=base_seed + index,
+            )
+            return [villager_model, werewolf_model, winner, log_dir]
+
+        # Results keep job order regardless of which game finishes first.
+        results = []
+        with ThreadPoolExecutor(max_workers=_PARALLEL_GAMES.value) as executor:
+            progress = tqdm.tqdm(
+                executor.map(_play, enumerate(jobs)), total=len(jobs), desc="Games"
+            )
+            for result in progress:
+                results.append(result)
+                progress.set_postfix_str(limiter.LIMITER.summary())
 
         df = pd.DataFrame(
             results, columns=["VillagerModel", "WerewolfModel", "Winner", "Log"]
@@ -279,5 +469,26 @@ def run() -> None:
         df.to_csv(csv_file)
         print(f"Wrote eval results to {csv_file}")
 
+        games = [
+            {
+                "villager_model": villager_model,
+                "werewolf_model": werewolf_model,
+                "log": log_dir,
+                **logging.load_usage(log_dir),
+            }
+            for villager_model, werewolf_model, _, log_dir in results
+        ]
+        summary = usage.merge(games)
+        summary["late_candidates"] = usage.LATE_USAGE.summary()
+        summary["games"] = games
+        usage_file = f"{os.getcwd()}/logs/eval_results_{timestamp}_usage.json"
+        with open(usage_file, "w") as file:
+            json.dump(summary, file, indent=2)
+        print(f"Model usage: {summary['total']}")
+        print(f"Wrote usage summary to {usage_file}")
+
     elif _RESUME.value:
         resume_games(RESUME_DIRECTORIES)
+
+    print(f"Model call stats: {limiter.LIMITER.stats()}")
+    print(f"Late candidate usage: {usage.LATE_USAGE.summary()['total']}")
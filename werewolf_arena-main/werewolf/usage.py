@@ -0,0 +1,136 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-call token and latency records, and their per-game aggregates.
+
+`apis.generate_with_usage` returns a `Usage` for every model call; `lm.generate`
+stores them (as dicts) in `LmLog.usage`. `summarize()` totals the records of a
+game by action and by model, and `merge()` combines game summaries for an
+eval run.
+"""
+
+import dataclasses
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+_TOTAL_FIELDS = ("input_tokens", "output_tokens", "latency_seconds", "retries")
+
+
+@dataclasses.dataclass
+class Usage:
+    """Token counts and timing for one model call."""
+
+    provider: str
+    model: str
+    input_tokens: int
+    output_tokens: int
+    # Wall time of the call, including rate-limit waits and throttle retries.
+    latency_seconds: float
+    # Throttled attempts retried by the rate limiter.
+    retries: int = 0
+    # True when the provider reported no usage and the counts are estimates.
+    estimated: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+
+def action_logs(round_logs: Iterable[Any]) -> Iterator[Tuple[str, Any]]:
+    """Yields (action, LmLog) for every model call logged in a game."""
+    for log in round_logs:
+        for action in ("eliminate", "investigate", "protect"):
+            if getattr(log, action) is not None:
+                yield action, getattr(log, action)
+        for turn in log.bid:
+            for _, lm_log in turn:
+                yield "bid", lm_log
+        for _, lm_log in log.debate:
+            yield "debate", lm_log
+        for votes in log.votes:
+            for vote in votes:
+                yield "vote", vote.log
+        for _, lm_log in log.summaries:
+            yield "summarize", lm_log
+
+
+def _empty() -> Dict[str, Any]:
+    totals = {"calls": 0, "estimated_calls": 0}
+    totals.update({field: 0 for field in _TOTAL_FIELDS})
+    return totals
+
+
+def _add(totals: Dict[str, Any], other: Dict[str, Any]) -> None:
+    for key, value in other.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+def _record_totals(record: Dict[str, Any]) -> Dict[str, Any]:
+    totals = {field: record.get(field, 0) for field in _TOTAL_FIELDS}
+    totals["calls"] = 1
+    totals["estimated_calls"] = int(bool(record.get("estimated")))
+    return totals
+
+
+class LateUsage:
+    """Usage of model calls that finished after their action was logged.
+
+    Losing concurrent candidates (see lm._generate_candidates) can still be at
+    the model when the winner is returned. Their records are totalled here,
+    under a lock, rather than added to an LmLog that checkpoints and summaries
+    may already be reading; they count in run totals but in no game's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = _empty()
+        self._by_model: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        totals = _record_totals(record)
+        with self._lock:
+            _add(self._total, totals)
+            _add(self._by_model.setdefault(record["model"], _empty()), totals)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": dict(self._total),
+                "by_model": {k: dict(v) for k, v in self._by_model.items()},
+            }
+
+
+LATE_USAGE = LateUsage()
+
+
+def summarize(round_logs: Iterable[Any]) -> Dict[str, Any]:
+    """Totals the usage records of a game overall, by action and by model."""
+    summary = {"total": _empty(), "by_action": {}, "by_model": {}}
+    for action, lm_log in action_logs(round_logs):
+        for record in getattr(lm_log, "usage", None) or []:
+            totals = _record_totals(record)
+            _add(summary["total"], totals)
+            _add(summary["by_action"].setdefault(action, _empty()), totals)
+            _add(summary["by_model"].setdefault(record["model"], _empty()), totals)
+    return summary
+
+
+def merge(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combines summarize() results, e.g. for all games of an eval run."""
+    merged = {"total": _empty(), "by_action": {}, "by_model": {}}
+    for summary in summaries:
+        _add(merged["total"], summary.get("total", {}))
+        for group in ("by_action", "by_model"):
+            for key, totals in summary.get(group, {}).items():
+                _add(merged[group].setdefault(key, _empty()), totals)
+    return merged
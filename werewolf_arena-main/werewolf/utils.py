@@ -14,21 +14,118 @@
 
 """utility functions."""
 
+import collections
+import json
+import re
+import threading
 from typing import Any
 import yaml
 from abc import ABC
 from abc import abstractmethod
 import marko
 
+# Counts of which parse_json tier produced each result (see parse_stats()).
+_PARSE_TIERS = collections.Counter()
+_PARSE_TIERS_LOCK = threading.Lock()
+
+# Anything YAML would read differently from JSON sends the text down the
+# legacy path: tabs, characters YAML rejects or treats as line breaks, and
+# \uD800-\uDFFF escapes (JSON joins surrogate pairs, YAML does not).
+_JSON_FAST_PATH_UNSAFE = re.compile(
+    "[\t\x85\u2028\u2029"
+    "\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x84\x86-\x9f\ufffe\uffff"
+    "\ud800-\udfff]"
+    r"|\\u[dD][89a-fA-F]"
+)
+# YAML 1.1 (PyYAML) only reads a number as a float if it has a dot and a
+# signed exponent; JSON floats outside this form stay strings in YAML.
+_YAML_FLOAT = re.compile(r"^-?[0-9]+\.[0-9]*(?:[eE][-+][0-9]+)?$")
+_JSON_FENCE = re.compile(r"\A\n*```(?:json|JSON)\n(.*?)^```[ ]*$", re.M | re.S)
+
+
+class _NotYamlCompatible(ValueError):
+    pass
+
+
+def _parse_float(text: str) -> float:
+    if not _YAML_FLOAT.match(text):
+        raise _NotYamlCompatible(text)
+    return float(text)
+
+
+def _parse_constant(text: str):
+    raise _NotYamlCompatible(text)
+
+
+def _loads_yaml_compatible(text: str) -> dict[str, Any] | None:
+    """json.loads, but only for objects YAML would parse to the same value."""
+    if _JSON_FAST_PATH_UNSAFE.search(text):
+        return None
+    stripped = text.strip()
+    if not (stripped.startswith("{") and stripped.endswith("}")):
+        return None
+    try:
+        result = json.loads(
+            stripped, parse_float=_parse_float, parse_constant=_parse_constant
+        )
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) and result else None
+
+
+def _count_tier(tier: str) -> None:
+    with _PARSE_TIERS_LOCK:
+        _PARSE_TIERS[tier] += 1
+
+
+def parse_stats() -> dict[str, int]:
+    """How many parse_json calls each tier answered so far."""
+    with _PARSE_TIERS_LOCK:
+        return dict(_PARSE_TIERS)
+
 
 def parse_json(text: str) -> dict[str, Any] | None:
-    result_json = parse_json_markdown(text)
+    """Parses a model response, trying cheap parsers before Markdown/YAML.
+
+    The fast tiers only answer when the result is guaranteed to equal
+    parse_json_legacy(text); anything else takes the legacy path.
+    """
+    result_json = _loads_yaml_compatible(text)
+    if result_json is not None:
+        _count_tier("json")
+        return result_json
+
+    if "\r" not in text:
+        fence = _JSON_FENCE.match(text)
+        if fence:
+            result_json = _loads_yaml_compatible(fence.group(1))
+            if result_json is not None:
+                _count_tier("fenced")
+                return result_json
 
-    if not result_json:
-        result_json = parse_json_str(text)
+    try:
+        result_json, tier = _parse_json_legacy(text)
+    except Exception:
+        _count_tier("error")
+        raise
+    _count_tier(tier)
     return result_json
 
 
+def parse_json_legacy(text: str) -> dict[str, Any] | None:
+    """The original Markdown-then-YAML parser, kept for comparison."""
+    return _parse_json_legacy(text)[0]
+
+
+def _parse_json_legacy(text: str) -> tuple[dict[str, Any] | None, str]:
+    result_json = parse_json_markdown(text)
+    if result_json:
+        return result_json, "markdown"
+
+    result_json = parse_json_str(text)
+    return result_json, "yaml" if result_json else "failed"
+
+
 def parse_json_markdown(text: str) -> dict[str, Any] | None:
     ast = marko.parse(text)
 